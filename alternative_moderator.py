@@ -6,8 +6,11 @@ This provides a backup solution if Duc Haba's API is unavailable
 import requests
 import json
 import os
-from transformers import pipeline
 import logging
+import threading
+
+from result_cache import make_cache_key
+from single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +19,9 @@ class AlternativeTextModerator:
         self.hf_token = hf_token
         self.api_url = "https://api-inference.huggingface.co/models/unitary/toxic-bert"
         self.headers = {"Authorization": f"Bearer {hf_token}"} if hf_token else {}
+        self.flight = SingleFlight()
+        self._classifier = None
+        self._classifier_lock = threading.Lock()
         
     def analyze_text_hf_api(self, text):
         """Use HuggingFace Inference API for toxicity detection"""
@@ -70,17 +76,29 @@ class AlternativeTextModerator:
         except Exception as e:
             return False, f"HuggingFace API error: {str(e)}"
     
+    def local_classifier(self):
+        """Load the local transformers pipeline once and reuse it for every text"""
+        with self._classifier_lock:
+            if self._classifier is None:
+                # Imported lazily so the other backends work without transformers
+                from transformers import pipeline
+                
+                # This will download the model on first use
+                self._classifier = pipeline(
+                    "text-classification", 
+                    model="unitary/toxic-bert",
+                    device=-1  # Use CPU
+                )
+            return self._classifier
+    
     def analyze_text_local(self, text):
         """Use local transformers pipeline as final fallback"""
         try:
-            # This will download the model on first use
-            classifier = pipeline(
-                "text-classification", 
-                model="unitary/toxic-bert",
-                device=-1  # Use CPU
-            )
+            classifier = self.local_classifier()
             
-            results = classifier(text)
+            # One inference at a time, the model already uses every CPU core
+            with self._classifier_lock:
+                results = classifier(text)
             
             # Convert to our format
             analysis = {
@@ -113,6 +131,10 @@ class AlternativeTextModerator:
             return False, f"Local model error: {str(e)}"
     
     def analyze_text(self, text, safer=0.02):
+        """Try multiple methods to analyze text, sharing identical in-flight calls"""
+        return self.flight.do(make_cache_key(text, safer), self._analyze_text_uncoalesced, text, safer)
+    
+    def _analyze_text_uncoalesced(self, text, safer=0.02):
         """Try multiple methods to analyze text"""
         
         # Method 1: Try HuggingFace API first
@@ -1,86 +1,814 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, make_response, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import logging
 from datetime import datetime
 import json
+import math
 import time
-from collections import defaultdict
 import traceback
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from result_cache import ResultCache, make_cache_key, make_score_key
+from rethreshold import SaferModel, parse_analysis, chart_hash
+from persistent_cache import PersistentCache
+from chart_store import ChartStore, chart_payload
+from job_queue import JobQueue, JobRunner
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from client_pool import ClientPool, PoolExhausted
+from concurrency_limiter import AdaptiveLimiter, ConcurrencyLimitExceeded
+from hedging import Hedger
+from keep_warm import KeepWarm
+from direct_transport import DirectSpaceTransport, DirectTransportUnsupported
+from long_text import chunk_text, split_sentences, aggregate_analyses, worst_chunk
+from single_flight import SingleFlight
+from space_snapshot import SpaceSnapshot
+from upstream_space import UPSTREAM_SPACE
+from rate_limiter import create_rate_limiter
+from shared_rate_limit import SharedRateLimiter, create_rate_limit_store
+from quota_tokens import QuotaTokens, InvalidQuotaToken
+from quota_cost import CostModel, QuotaTiers, Budget, QuotaExceeded
+import calling_convention
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=[
+    'X-Quota-Token', 'X-Quota-Cost', 'X-RateLimit-Limit', 'X-RateLimit-Remaining', 'X-RateLimit-Reset', 'Retry-After'
+])
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage
-rate_limit_storage = defaultdict(list)
-RATE_LIMIT_REQUESTS = 20
-RATE_LIMIT_WINDOW = 3600
+# Rate limiting (a few numbers per client, idle clients are evicted)
+RATE_LIMIT_REQUESTS = int(os.environ.get('RATE_LIMIT_REQUESTS', 20))
+RATE_LIMIT_WINDOW = int(os.environ.get('RATE_LIMIT_WINDOW', 3600))
+RATE_LIMIT_ALGORITHM = os.environ.get('RATE_LIMIT_ALGORITHM', 'sliding_window')
+RATE_LIMIT_MAX_CLIENTS = int(os.environ.get('RATE_LIMIT_MAX_CLIENTS', 100000))
+
+# Shared backend so the limit holds across workers/instances: memory (per process), sqlite or redis
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_SQLITE_PATH = os.environ.get(
+    'RATE_LIMIT_SQLITE_PATH',
+    os.path.join(os.environ.get('RESULT_CACHE_DIR') or tempfile.gettempdir(), 'rate_limits.sqlite3')
+)
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://127.0.0.1:6379/0')
+RATE_LIMIT_LEASE = int(os.environ.get('RATE_LIMIT_LEASE', max(1, RATE_LIMIT_REQUESTS // 10)))
+
+def create_app_rate_limiter(limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW):
+    """Build the per-process or shared rate limiter from the RATE_LIMIT_* settings"""
+    if RATE_LIMIT_BACKEND == 'memory':
+        return create_rate_limiter(
+            RATE_LIMIT_ALGORITHM,
+            limit=limit,
+            window=window,
+            max_keys=RATE_LIMIT_MAX_CLIENTS
+        )
+    if RATE_LIMIT_ALGORITHM != 'sliding_window':
+        logger.warning(f"⚠️ Shared rate limiting only supports sliding_window, ignoring {RATE_LIMIT_ALGORITHM}")
+    store = create_rate_limit_store(RATE_LIMIT_BACKEND, sqlite_path=RATE_LIMIT_SQLITE_PATH, redis_url=RATE_LIMIT_REDIS_URL)
+    logger.info(f"🤝 Shared rate limiting via {RATE_LIMIT_BACKEND} (lease {RATE_LIMIT_LEASE})")
+    return SharedRateLimiter(
+        store,
+        limit=limit,
+        window=window,
+        lease_size=RATE_LIMIT_LEASE,
+        max_keys=RATE_LIMIT_MAX_CLIENTS
+    )
+
+# Requests are charged in cost units: 1 per fresh upstream call plus 1 per QUOTA_CHARS_PER_UNIT
+# characters, cache hits cost QUOTA_CACHE_HIT_COST (so RATE_LIMIT_REQUESTS short texts still fit)
+QUOTA_CHARS_PER_UNIT = int(os.environ.get('QUOTA_CHARS_PER_UNIT', 5000))
+QUOTA_CACHE_HIT_COST = float(os.environ.get('QUOTA_CACHE_HIT_COST', 0.1))
+cost_model = CostModel(chars_per_unit=QUOTA_CHARS_PER_UNIT, cache_hit_cost=QUOTA_CACHE_HIT_COST)
+
+# Per-API-key tiers, e.g. QUOTA_TIERS='{"pro": {"limit": 500, "window": 3600}}'
+# and API_KEYS='{"<sha256 hex of the key>": "pro"}'. Callers without a known key are anonymous
+API_KEY_HEADER = 'X-API-Key'
+quota_tiers = QuotaTiers.from_json(
+    os.environ.get('QUOTA_TIERS'),
+    os.environ.get('API_KEYS'),
+    'anonymous',
+    RATE_LIMIT_REQUESTS,
+    RATE_LIMIT_WINDOW
+)
+rate_limiters = {
+    tier: create_app_rate_limiter(settings['limit'], settings['window'])
+    for tier, settings in quota_tiers.tiers.items()
+}
+rate_limiter = rate_limiters['anonymous']
+
+# Stateless signed quota tokens, enabled by a secret shared by all instances (e.g. Lambda containers)
+RATE_LIMIT_TOKEN_SECRET = os.environ.get('RATE_LIMIT_TOKEN_SECRET')
+QUOTA_TOKEN_HEADER = 'X-Quota-Token'
+quota_tokens = QuotaTokens(
+    RATE_LIMIT_TOKEN_SECRET,
+    limit=quota_tiers.tiers[quota_tiers.default_tier]['limit'],
+    window=quota_tiers.tiers[quota_tiers.default_tier]['window']
+) if RATE_LIMIT_TOKEN_SECRET else None
+
+# Result cache (only hashes of the text are kept, never the text itself)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 3600))
+RESULT_CACHE_STRIPES = int(os.environ.get('RESULT_CACHE_STRIPES', 16))
+
+# Optional on-disk tier, enabled by setting RESULT_CACHE_DIR (e.g. /tmp on Lambda)
+RESULT_CACHE_DIR = os.environ.get('RESULT_CACHE_DIR')
+PERSISTENT_CACHE_MAX_BYTES = int(os.environ.get('PERSISTENT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+PERSISTENT_CACHE_TTL = int(os.environ.get('PERSISTENT_CACHE_TTL', 86400))
+
+def create_persistent_cache(filename='result_cache.sqlite3'):
+    """Open an on-disk cache tier if configured, otherwise return None"""
+    if not RESULT_CACHE_DIR:
+        return None
+    try:
+        cache = PersistentCache(
+            os.path.join(RESULT_CACHE_DIR, filename),
+            max_bytes=PERSISTENT_CACHE_MAX_BYTES,
+            ttl=PERSISTENT_CACHE_TTL
+        )
+        logger.info(f"💾 Persistent cache {filename} enabled in {RESULT_CACHE_DIR}")
+        return cache
+    except Exception as e:
+        logger.error(f"❌ Persistent result cache unavailable: {e}")
+        return None
+
+result_cache = ResultCache(
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    ttl=RESULT_CACHE_TTL,
+    stripes=RESULT_CACHE_STRIPES,
+    persistent=create_persistent_cache()
+)
+
+# Charts are returned inline by default. CHART_DELIVERY=url serves them by content
+# hash from /api/chart/<id> instead, which needs every worker to see the same store
+# (one process, or workers sharing RESULT_CACHE_DIR on one host), not Lambda
+CHART_DELIVERY = os.environ.get('CHART_DELIVERY', 'inline')
+CHART_STORE_MAX_BYTES = int(os.environ.get('CHART_STORE_MAX_BYTES', 64 * 1024 * 1024))
+CHART_STORE_TTL = int(os.environ.get('CHART_STORE_TTL', 86400))
+CHART_CACHE_MAX_AGE = 31536000
+chart_store = ChartStore(
+    max_bytes=CHART_STORE_MAX_BYTES,
+    ttl=CHART_STORE_TTL,
+    persistent=create_persistent_cache('chart_store.sqlite3')
+)
+
+# Identical concurrent requests share one upstream call
+upstream_flight = SingleFlight()
+
+# Learns how safer affects results so scores can be re-thresholded locally
+safer_model = SaferModel(
+    min_observations=int(os.environ.get('RETHRESHOLD_MIN_OBSERVATIONS', 20)),
+    min_pairs=int(os.environ.get('RETHRESHOLD_MIN_PAIRS', 3))
+)
+MAX_SAFER_VALUES = 20
+
+# Bounded worker pool shared by every fan-out path (batch, streaming, ...)
+UPSTREAM_MAX_WORKERS = int(os.environ.get('UPSTREAM_MAX_WORKERS', 8))
+upstream_executor = ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS, thread_name_prefix='upstream')
+
+MAX_TEXT_LENGTH = 5000
+
+# Long-text mode splits documents into overlapping chunks under the upstream limit
+LONG_TEXT_MAX_LENGTH = int(os.environ.get('LONG_TEXT_MAX_LENGTH', 100000))
+LONG_TEXT_CHUNK_CHARS = int(os.environ.get('LONG_TEXT_CHUNK_CHARS', 4500))
+LONG_TEXT_OVERLAP_CHARS = int(os.environ.get('LONG_TEXT_OVERLAP_CHARS', 300))
+
+# Incremental mode falls back to whole-text analysis above this many sentences
+INCREMENTAL_MAX_SENTENCES = int(os.environ.get('INCREMENTAL_MAX_SENTENCES', 50))
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 100))
+STREAM_MAX_IN_FLIGHT = int(os.environ.get('STREAM_MAX_IN_FLIGHT', UPSTREAM_MAX_WORKERS))
+STREAM_MAX_ITEMS = int(os.environ.get('STREAM_MAX_ITEMS', 10000))
+
+# Background moderation jobs (created lazily so imports stay side-effect free)
+JOBS_DIR = os.environ.get('JOBS_DIR', os.path.join(tempfile.gettempdir(), 'text-moderator-jobs'))
+JOB_INPUT_DIR = os.environ.get('JOB_INPUT_DIR')
+JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', 32))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 10))
+JOB_RETRY_BASE_SECONDS = float(os.environ.get('JOB_RETRY_BASE_SECONDS', 5))
+JOB_RETRY_MAX_SECONDS = float(os.environ.get('JOB_RETRY_MAX_SECONDS', 900))
+JOB_RESULTS_PAGE_SIZE = 1000
+job_runner = None
+job_runner_lock = threading.Lock()
+
+# Pool of upstream clients, each predict checks out its own client
+GRADIO_POOL_SIZE = int(os.environ.get('GRADIO_POOL_SIZE', 2))
+GRADIO_POOL_MAX_SIZE = int(os.environ.get('GRADIO_POOL_MAX_SIZE', 8))
+GRADIO_POOL_MAX_FAILURES = int(os.environ.get('GRADIO_POOL_MAX_FAILURES', 2))
+
+
+# Space config and API info are snapshotted on disk so new processes skip
+# discovery; sam build bundles a space_snapshot.json seed for cold Lambda containers
+SPACE_SNAPSHOT_PATH = os.environ.get(
+    'SPACE_SNAPSHOT_PATH',
+    os.path.join(RESULT_CACHE_DIR or tempfile.gettempdir(), 'space_snapshot.json')
+)
+SPACE_SNAPSHOT_SEED = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'space_snapshot.json')
+# At most one revalidation runs at a time, and none within this many seconds of the last
+SPACE_REVALIDATE_COOLDOWN = float(os.environ.get('SPACE_REVALIDATE_COOLDOWN', 300))
+
+def on_space_change():
+    """Drop clients and schemas built from an outdated Space snapshot"""
+    gradio_pool.invalidate()
+    if direct_transport is not None:
+        direct_transport.reset_schema()
+
+space_snapshot = SpaceSnapshot(
+    SPACE_SNAPSHOT_PATH,
+    UPSTREAM_SPACE,
+    seed_path=SPACE_SNAPSHOT_SEED,
+    on_change=on_space_change,
+    revalidate_cooldown=SPACE_REVALIDATE_COOLDOWN
+)
 
-# Global client variable
-gradio_client = None
+def create_gradio_client():
+    """Create a Gradio client using the EXACT documentation approach"""
+    try:
+        logger.info("🔗 Creating Duc Haba client...")
+        # Built from the on-disk snapshot when available (gradio_client is imported lazily)
+        client = space_snapshot.create_client()
+        logger.info("✅ Duc Haba client created successfully")
+        return client
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to create Duc Haba client: {e}")
+        raise e
+
+def gradio_transport_errors():
+    """Exceptions that mean a gradio client's connection is broken"""
+    errors = [OSError]
+    try:
+        import httpx
+        errors.append(httpx.TransportError)
+    except ImportError:
+        pass
+    try:
+        from websockets.exceptions import WebSocketException
+        errors.append(WebSocketException)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+# Deadlines, cancellations and upstream errors don't count against a pooled client
+gradio_pool = ClientPool(
+    create_gradio_client,
+    size=GRADIO_POOL_SIZE,
+    max_size=GRADIO_POOL_MAX_SIZE,
+    max_failures=GRADIO_POOL_MAX_FAILURES,
+    unhealthy_exceptions=gradio_transport_errors()
+)
+
+# Optional lean transport: UPSTREAM_TRANSPORT=direct skips gradio_client and
+# posts to the endpoint over a keep-alive connection (falls back if unsupported)
+UPSTREAM_TRANSPORT = os.environ.get('UPSTREAM_TRANSPORT', 'gradio')
+direct_transport = None
+if UPSTREAM_TRANSPORT == 'direct':
+    direct_transport = DirectSpaceTransport(UPSTREAM_SPACE, pool_size=GRADIO_POOL_MAX_SIZE)
+    direct_transport.seed_schema(space_snapshot.load())
+    space_snapshot.revalidate_async()
+
+# Circuit breaker: fail fast while the upstream is down instead of waiting out timeouts
+upstream_breaker = CircuitBreaker(
+    name="duc_haba",
+    window_seconds=int(os.environ.get('CIRCUIT_WINDOW_SECONDS', 30)),
+    min_requests=int(os.environ.get('CIRCUIT_MIN_REQUESTS', 10)),
+    error_rate=float(os.environ.get('CIRCUIT_ERROR_RATE', 0.5)),
+    slow_call_seconds=float(os.environ.get('CIRCUIT_SLOW_CALL_SECONDS', 10)),
+    slow_rate=float(os.environ.get('CIRCUIT_SLOW_RATE', 0.8)),
+    open_seconds=int(os.environ.get('CIRCUIT_OPEN_SECONDS', 30)),
+    half_open_probes=int(os.environ.get('CIRCUIT_HALF_OPEN_PROBES', 2)),
+    ignored_exceptions=(ConcurrencyLimitExceeded, calling_convention.UpstreamCancelled)
+)
+
+# Adaptive limit on concurrent upstream calls, shared by every request path
+upstream_limiter = AdaptiveLimiter(
+    initial_limit=int(os.environ.get('UPSTREAM_CONCURRENCY_INITIAL', 4)),
+    min_limit=int(os.environ.get('UPSTREAM_CONCURRENCY_MIN', 1)),
+    max_limit=int(os.environ.get('UPSTREAM_CONCURRENCY_MAX', GRADIO_POOL_MAX_SIZE)),
+    latency_tolerance=float(os.environ.get('UPSTREAM_LATENCY_TOLERANCE', 2.0)),
+    max_queue=int(os.environ.get('UPSTREAM_QUEUE_MAX', 64)),
+    queue_timeout=float(os.environ.get('UPSTREAM_QUEUE_TIMEOUT', 10))
+)
+
+# Every upstream call has a deadline, after which its Gradio job is cancelled
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
+
+# Optional hedging: UPSTREAM_HEDGING=1 starts a second call (on another pooled
+# client) when the first is slower than the observed HEDGE_PERCENTILE latency
+UPSTREAM_HEDGING = os.environ.get('UPSTREAM_HEDGING', '0') == '1'
+hedger = None
+if UPSTREAM_HEDGING:
+    hedger = Hedger(
+        ThreadPoolExecutor(max_workers=UPSTREAM_MAX_WORKERS * 2, thread_name_prefix='hedge'),
+        percentile=float(os.environ.get('HEDGE_PERCENTILE', 0.95)),
+        max_hedge_ratio=float(os.environ.get('HEDGE_MAX_RATIO', 0.1))
+    )
+
+def predict_upstream(text, safer_value, deadline, cancel=None, probe=False):
+    """Make one upstream call and return its result, raising on failure"""
+    # No free pooled client is a local wait, not an upstream latency or failure
+    with upstream_limiter.slot(
+        timeout=max(0.0, deadline - time.time()),
+        neutral=(calling_convention.UpstreamCancelled, PoolExhausted)
+    ):
+        return send_upstream(text, safer_value, deadline, cancel, probe)
+
+def send_upstream(text, safer_value, deadline, cancel=None, probe=False):
+    """Send one call over the direct transport or a pooled gradio client
 
-def get_gradio_client():
-    """Get or create Gradio client using the EXACT documentation approach"""
-    global gradio_client
+    Only the call itself is timed for keep_warm, not limiter or pool waits.
+    """
+    global direct_transport
     
-    if gradio_client is None:
+    if direct_transport is not None:
         try:
-            # Import here to avoid issues in Lambda cold start
-            from gradio_client import Client
-            
-            logger.info("🔗 Creating Duc Haba client...")
-            gradio_client = Client("duchaba/Friendly_Text_Moderation")
-            logger.info("✅ Duc Haba client created successfully")
-            
-        except Exception as e:
-            logger.error(f"❌ Failed to create Duc Haba client: {e}")
-            gradio_client = None
-            raise e
+            started = time.time()
+            result = direct_transport.predict(text, safer_value, timeout=max(0.001, deadline - time.time()))
+            keep_warm.record(time.time() - started, started, probe=probe)
+            return result
+        except DirectTransportUnsupported as e:
+            logger.warning(f"⚠️ Direct transport unsupported, using gradio_client: {e}")
+            direct_transport = None
     
-    return gradio_client
+    # A failing client is reported to the pool, other requests keep theirs
+    with gradio_pool.client(timeout=max(0.0, deadline - time.time())) as client:
+        try:
+            # One call per request, the signature is resolved once per client
+            started = time.time()
+            result = calling_convention.predict(
+                client, text, safer_value,
+                timeout=max(0.001, deadline - time.time()),
+                cancel=cancel
+            )
+            keep_warm.record(time.time() - started, started, probe=probe)
+            return result
+        except Exception as e:
+            if calling_convention.is_schema_change(e):
+                logger.warning("⚠️ Upstream schema changed, re-probing the calling convention")
+                calling_convention.forget_convention(client)
+                space_snapshot.revalidate_async()
+            raise
+
+def keep_warm_probe():
+    """Send one cheap upstream call, skipping the caches"""
+    predict_upstream("Hello!!", 0.02, time.time() + UPSTREAM_TIMEOUT_SECONDS, probe=True)
+
+# Keeps the Space awake between real requests; KEEP_WARM=1 runs a background
+# scheduler, on Lambda a scheduled event calls keep_warm.maybe_probe()
+KEEP_WARM = os.environ.get('KEEP_WARM', '0') == '1'
+keep_warm = KeepWarm(
+    keep_warm_probe,
+    initial_interval=int(os.environ.get('KEEP_WARM_INTERVAL', 300)),
+    min_interval=int(os.environ.get('KEEP_WARM_MIN_INTERVAL', 60)),
+    max_interval=int(os.environ.get('KEEP_WARM_MAX_INTERVAL', 3600)),
+    cold_min_seconds=float(os.environ.get('COLD_START_SECONDS', 3.0))
+)
 
-def call_duc_haba_api(text, safer_value=0.02):
+def call_duc_haba_api(text, safer_value=0.02, deadline=None):
     """Call Duc Haba's API using the EXACT documentation method"""
+    started = time.time()
+    if deadline is None:
+        deadline = started + UPSTREAM_TIMEOUT_SECONDS
     try:
-        client = get_gradio_client()
-        
-        # Use the EXACT method from documentation
-        result = client.predict(
-            msg=text,
-            safer=safer_value,
-            api_name="/fetch_toxicity_level"
-        )
-        
+        if hedger is not None:
+            result = upstream_breaker.call(
+                hedger.run, lambda cancel: predict_upstream(text, safer_value, deadline, cancel)
+            )
+        else:
+            result = upstream_breaker.call(predict_upstream, text, safer_value, deadline)
         logger.info("✅ API call successful")
         return True, result
         
+    except CircuitOpenError as e:
+        logger.warning(f"⚡ API call rejected: {e}")
+        return False, str(e)
     except Exception as e:
         logger.error(f"❌ API call failed: {e}")
-        # Reset client on failure
-        global gradio_client
-        gradio_client = None
         return False, str(e)
 
-def check_rate_limit(client_ip):
-    """Check if client has exceeded rate limit"""
-    now = time.time()
+def record_scores(text, safer_value, result):
+    """Feed a real upstream result to the safer model and cache its raw scores"""
+    analysis = parse_analysis(result[1]) if len(result) > 1 else None
+    if not analysis:
+        return
     
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
+    score_key = make_score_key(text)
+    entry = {
+        "safer": float(safer_value),
+        "analysis": analysis,
+        "chart": result[0] if len(result) > 0 else None,
+        "chart_hash": chart_hash(result[0] if len(result) > 0 else None)
+    }
     
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
+    safer_model.observe(analysis, safer_value)
+    previous = result_cache.get(score_key, count=False)
+    if previous is not None and previous["safer"] != entry["safer"]:
+        safer_model.observe_pair(
+            (previous["safer"], previous["analysis"], previous["chart_hash"]),
+            (entry["safer"], entry["analysis"], entry["chart_hash"])
+        )
+    result_cache.set(score_key, entry)
+
+def derive_from_scores(text, safer_value, include_chart=True):
+    """Re-threshold cached raw scores for a new safer value, or return None"""
+    entry = result_cache.get(make_score_key(text), count=False)
+    if entry is None or not safer_model.can_derive(include_chart=include_chart):
+        return None
+    derived = safer_model.derive(entry["analysis"], safer_value)
+    return [entry["chart"], json.dumps(derived)]
+
+def analyze_with_cache(text, safer_value=0.02, bypass_cache=False, include_chart=True, deadline=None):
+    """Call Duc Haba's API through the result cache, returns (success, result, cached)"""
+    key = make_cache_key(text, safer_value)
+    
+    if bypass_cache:
+        result_cache.record_bypass()
+    else:
+        cached = result_cache.get(key)
+        if cached is not None:
+            return True, cached, True
+        
+        derived = derive_from_scores(text, safer_value, include_chart)
+        if derived is not None:
+            return True, derived, True
+    
+    def fetch():
+        success, result = call_duc_haba_api(text, safer_value, deadline)
+        # Only successful results are cached, failures should be retried
+        if success:
+            result_cache.set(key, result)
+            record_scores(text, safer_value, result)
+        return success, result
+    
+    success, result = upstream_flight.do(key, fetch)
+    return success, result, False
+
+def threshold_decisions(text, analysis, safer_values):
+    """Flag decisions for several safer values, locally when the model allows it
+
+    Returns (mode, decisions, stats) where stats counts the upstream lookups
+    made and how many of them were answered from the cache.
+    """
+    if analysis and safer_model.can_derive(include_chart=False):
+        return "local", safer_model.flags_for(analysis, safer_values), {"calls": 0, "cached": 0}
+    
+    # Fall back to real upstream calls (still cached and coalesced), in parallel under one deadline
+    deadline = time.time() + UPSTREAM_TIMEOUT_SECONDS
+    unique = list(dict.fromkeys(float(safer) for safer in safer_values))
+    futures = {
+        safer: upstream_executor.submit(analyze_with_cache, text, safer, False, False, deadline)
+        for safer in unique
+    }
+    wait(futures.values(), timeout=max(0.0, deadline - time.time()))
+    
+    outcomes = {}
+    for safer, future in futures.items():
+        if not future.done():
+            future.cancel()
+            outcomes[safer] = (False, "Deadline exceeded", False)
+        else:
+            outcomes[safer] = future.result()
+    
+    decisions = []
+    for safer in safer_values:
+        success, result, cached = outcomes[float(safer)]
+        parsed = parse_analysis(result[1]) if success and len(result) > 1 else None
+        if parsed is None:
+            decisions.append({"safer": float(safer), "error": result if not success else "Unparseable result"})
+            continue
+        entry = {key: value for key, value in parsed.items() if isinstance(value, bool)}
+        entry["safer"] = float(safer)
+        decisions.append(entry)
     
-    rate_limit_storage[client_ip].append(now)
+    # Failed lookups are charged like cache hits, only answered ones count as calls
+    answered = [outcome for outcome in outcomes.values() if outcome[0]]
+    stats = {
+        "calls": len(outcomes),
+        "cached": len(outcomes) - sum(1 for outcome in answered if not outcome[2])
+    }
+    return "upstream", decisions, stats
+
+def validate_text(text, max_length=MAX_TEXT_LENGTH):
+    """Return an error message for unusable text, or None if it can be analyzed"""
+    if not text:
+        return "Text cannot be empty"
+    if len(text) > max_length:
+        return f"Text too long. Maximum {max_length} characters allowed."
+    return None
+
+def analyze_spans(text, spans, safer_value=0.02, bypass_cache=False, include_chart=False):
+    """Analyze text[start:end] for every span in parallel, identical spans share one call
+
+    Returns (success, chunk_analyses or error message, charts, stats) where
+    charts maps each span to its chart and stats counts unique spans and how
+    many of them were answered from the cache.
+    """
+    futures = {}
+    span_keys = []
+    for start, end in spans:
+        chunk = text[start:end]
+        key = make_cache_key(chunk, safer_value)
+        if key not in futures:
+            futures[key] = upstream_executor.submit(analyze_with_cache, chunk, safer_value, bypass_cache, include_chart)
+        span_keys.append(key)
+    
+    chunk_analyses = []
+    charts = {}
+    for span, key in zip(spans, span_keys):
+        success, result, cached = futures[key].result()
+        if not success:
+            return False, result, None, None
+        chunk_analyses.append((span, parse_analysis(result[1]) if len(result) > 1 else None))
+        charts[span] = result[0] if len(result) > 0 else None
+    
+    cached_count = sum(1 for future in futures.values() if future.result()[2])
+    return True, chunk_analyses, charts, {"unique": len(futures), "cached": cached_count}
+
+def document_results(chunk_analyses, charts, safer_value, include_chart=True):
+    """Combine per-span analyses into the 'results' part of a response
+
+    Each score is the maximum over spans and the chart is the one of the
+    highest-scoring span, so both approximate a whole-text analysis.
+    Returns (results, offending), or (None, []) if no span could be parsed.
+    """
+    analysis, offending = aggregate_analyses(chunk_analyses, float(safer_value))
+    if analysis is None:
+        return None, []
+    worst_span, _ = worst_chunk(chunk_analyses)
+    return format_results((charts.get(worst_span), analysis), include_chart), offending
+
+def analyze_long_text(text, safer_value=0.02, bypass_cache=False, include_chart=True):
+    """Analyze a long document chunk by chunk, returns (success, results, cached)
+
+    Chunks are analyzed in parallel and identical chunks (signatures, quoted
+    replies) share one cached upstream call. The chart is delivered like for
+    short texts and shows the highest-scoring chunk.
+    """
+    spans = chunk_text(text, LONG_TEXT_CHUNK_CHARS, LONG_TEXT_OVERLAP_CHARS)
+    success, chunk_analyses, charts, stats = analyze_spans(text, spans, safer_value, bypass_cache, include_chart)
+    if not success:
+        return False, chunk_analyses, False
+    
+    results, offending = document_results(chunk_analyses, charts, safer_value, include_chart)
+    if results is None:
+        return False, "Could not parse JSON output from Duc Haba's API", False
+    
+    results["chunks"] = {
+        "count": len(spans),
+        "unique": stats["unique"],
+        "cached": stats["cached"],
+        "offending": offending
+    }
+    return True, results, stats["cached"] == stats["unique"]
+
+def plan_incremental(text, safer_value):
+    """Split an edited draft into sentences and pick the changed ones
+
+    A sentence counts as changed when it has no cached result. Returns
+    (spans, changed spans), identical sentences are listed once in changed.
+    """
+    spans = split_sentences(text)
+    changed = []
+    seen = set()
+    for start, end in spans:
+        sentence = text[start:end]
+        if sentence in seen:
+            continue
+        seen.add(sentence)
+        if result_cache.get(make_cache_key(sentence, safer_value), count=False) is None:
+            changed.append((start, end))
+    return spans, changed
+
+def analyze_incremental(text, safer_value, spans, include_chart=True):
+    """Analyze an edited draft sentence by sentence, returns (success, results, cached)
+
+    Unchanged sentences are answered from the cache, so only new or edited
+    sentences reach the upstream. The document result is aggregated from the
+    sentence scores like in long-text mode, an approximation of what a
+    whole-text analysis would return.
+    """
+    success, sentence_analyses, charts, stats = analyze_spans(text, spans, safer_value, False, include_chart)
+    if not success:
+        return False, sentence_analyses, False
+    
+    results, offending = document_results(sentence_analyses, charts, safer_value, include_chart)
+    if results is None:
+        return False, "Could not parse JSON output from Duc Haba's API", False
+    
+    results["sentences"] = {
+        "count": len(spans),
+        "unique": stats["unique"],
+        "cached": stats["cached"],
+        "analyzed": stats["unique"] - stats["cached"],
+        "offending": offending
+    }
+    return True, results, stats["cached"] == stats["unique"]
+
+def format_results(result, include_chart=True):
+    """Turn an upstream (chart, json) result into the 'results' part of a response"""
+    chart_data = result[0] if len(result) > 0 and include_chart else None
+    chart_id = chart_store.put(chart_data) if CHART_DELIVERY == 'url' else None
+    json_output = result[1] if len(result) > 1 else None
+    
+    # Try to parse JSON output if it's a string
+    parsed_json = None
+    if json_output:
+        try:
+            parsed_json = json.loads(json_output) if isinstance(json_output, str) else json_output
+        except json.JSONDecodeError:
+            parsed_json = {
+                "raw_output": json_output,
+                "parse_error": "Could not parse JSON output from Duc Haba's API"
+            }
+    
+    if CHART_DELIVERY == 'url':
+        return {
+            "chart_url": f"/api/chart/{chart_id}" if chart_id else None,
+            "analysis": parsed_json
+        }
+    return {
+        "chart_data": chart_data,
+        "analysis": parsed_json
+    }
+
+def analyze_item(text, safer_value=0.02, include_chart=True, bypass_cache=False):
+    """Analyze one item for the bulk endpoints, returns a JSON-ready dict"""
+    try:
+        success, result, cached = analyze_with_cache(text, safer_value, bypass_cache, include_chart)
+        if not success:
+            # Upstream failures are transient, background jobs retry them later
+            return {"success": False, "error": "Duc Haba's API call failed.", "details": result, "retryable": True}
+        return {"success": True, "cached": cached, "results": format_results(result, include_chart)}
+    except Exception as e:
+        logger.error(f"❌ Item analysis failed: {e}")
+        return {"success": False, "error": "Failed to process results from Duc Haba's API.", "details": str(e)}
+
+def parse_batch_item(index, item, default_safer):
+    """Normalize one batch item to (id, text, safer, error)"""
+    if isinstance(item, str):
+        item = {"text": item}
+    if not isinstance(item, dict) or not isinstance(item.get('text'), str):
+        return index, None, None, "Each item must be a string or an object with a 'text' field"
+    item_id = item.get('id', index)
+    safer_value = item.get('safer', default_safer)
+    if not isinstance(safer_value, (int, float)) or isinstance(safer_value, bool):
+        return item_id, None, None, "'safer' must be a number"
+    text = item['text'].strip()
+    return item_id, text, safer_value, validate_text(text)
+
+def get_job_runner():
+    """Open the job queue and start its background worker on first use"""
+    global job_runner
+    
+    with job_runner_lock:
+        if job_runner is None:
+            queue = JobQueue(
+                os.path.join(JOBS_DIR, 'jobs.sqlite3'),
+                max_attempts=JOB_MAX_ATTEMPTS,
+                retry_base=JOB_RETRY_BASE_SECONDS,
+                retry_max=JOB_RETRY_MAX_SECONDS
+            )
+            job_runner = JobRunner(queue, analyze_item, upstream_executor, chunk_size=JOB_CHUNK_SIZE)
+            logger.info(f"🗂️ Job queue opened in {JOBS_DIR}")
+        job_runner.start()
+    return job_runner
+
+def parse_jsonl_items(lines, default_safer=0.02):
+    """Lazily turn JSONL lines into (id, text, safer, error) tuples"""
+    index = 0
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield parse_batch_item(index, json.loads(line), default_safer)
+        except ValueError:
+            yield index, None, None, "Invalid JSON line"
+        index += 1
+
+def item_cost(text, result):
+    """Actual cost of an analyze_item() result, failed items only pay the minimum"""
+    if not result.get("success"):
+        return cost_model.cache_hit_cost
+    return cost_model.cost(len(text), cached_calls=1 if result.get("cached") else 0)
+
+def metered_items(items, budget):
+    """Pay for each valid (id, text, safer, error) item from budget as it passes through"""
+    for item in items:
+        text, error = item[1], item[3]
+        if not error and not budget.spend(cost_model.cost(len(text))):
+            raise QuotaExceeded(f"The job needs more than the remaining {budget.total:g} quota units.")
+        yield item
+
+def check_rate_limit(client_ip, cost=1):
+    """Charge cost quota units to the caller, returns False if the budget is exhausted
+
+    The charge is remembered for this request so settle_quota() can correct
+    it once the actual cost is known, and the remaining budget is reported in
+    the X-RateLimit-* response headers.
+    """
+    tier, key = quota_tiers.resolve(request.headers.get(API_KEY_HEADER))
+    limiter = rate_limiters[tier]
+    # Anonymous callers may carry their budget in a signed token instead
+    use_tokens = quota_tokens is not None and key is None
+    quota = g.quota = {
+        "client_ip": client_ip, "tier": tier, "key": key or client_ip, "limiter": limiter,
+        "limit": limiter.limit, "window": None, "requested": cost, "charged": 0.0, "cost": 0.0,
+        "tokens": use_tokens, "from_token": False
+    }
+    
+    token = request.headers.get(QUOTA_TOKEN_HEADER) if use_tokens else None
+    if token:
+        try:
+            decision = quota_tokens.spend(token, client_ip, cost)
+        except InvalidQuotaToken as e:
+            # Lost, replayed or foreign tokens fall back to this instance's limiter
+            logger.warning(f"⚠️ Rejected quota token: {e}")
+        else:
+            quota.update(from_token=True, window=decision.window, remaining=decision.remaining,
+                         reset=decision.reset, retry_after=decision.retry_after)
+            if decision.allowed:
+                # Mirrored in the limiter, so it knows this instance's real usage when a token goes missing
+                limiter.hit(quota["key"], cost)
+                quota["charged"] = quota["cost"] = cost
+            return decision.allowed
+    
+    result = limiter.hit(quota["key"], cost)
+    quota.update(remaining=result.remaining, reset=result.reset, retry_after=result.retry_after)
+    if not result.allowed:
+        return False
+    quota["charged"] = quota["cost"] = cost
+    return True
+
+def reserve_quota(client_ip):
+    """Charge the caller's whole remaining budget, for requests whose cost is only known at the end"""
+    if not check_rate_limit(client_ip, cost=cost_model.cache_hit_cost):
+        return False
+    quota = g.quota
+    extra = math.floor(quota["remaining"] * 100) / 100
+    # A token's budget is authoritative, the limiter only mirrors it
+    if extra > 0 and (quota["limiter"].hit(quota["key"], extra).allowed or quota["from_token"]):
+        quota["charged"] = quota["cost"] = round(quota["charged"] + extra, 2)
+        quota["remaining"] = round(quota["remaining"] - extra, 2)
     return True
 
+def settle_quota(actual_cost):
+    """Correct the up-front charge to the request's actual cost
+
+    Refunds go back to the caller's limiter (and token). Extra charges are
+    best effort, the work has already been done by then.
+    """
+    quota = g.get('quota')
+    if not quota or not quota["charged"]:
+        return
+    delta = round(actual_cost - quota["charged"], 2)
+    if delta:
+        if delta < 0:
+            quota["limiter"].refund(quota["key"], -delta)
+        else:
+            quota["limiter"].hit(quota["key"], delta)
+        quota["remaining"] = max(0.0, round(quota["remaining"] - delta, 2))
+    quota["charged"] = quota["cost"] = actual_cost
+
+def issue_quota_token(quota):
+    """Signed token carrying the caller's remaining budget, if the caller uses tokens"""
+    if not quota["tokens"]:
+        return None
+    return quota_tokens.issue(quota["client_ip"], quota["remaining"], quota["window"])
+
+def rate_limit_message():
+    """Explain why the caller was rate limited"""
+    quota = g.get('quota')
+    if quota and quota["requested"] > quota["limit"]:
+        return f"This request costs {quota['requested']:g} quota units, more than the {quota['limit']:g} available per window."
+    return "Rate limit exceeded. Please wait before making more requests."
+
+def rate_limit_retry_after():
+    """Seconds until the rejected caller may try again"""
+    quota = g.get('quota')
+    return math.ceil(quota["retry_after"]) if quota else RATE_LIMIT_WINDOW
+
+@app.after_request
+def attach_quota_headers(response):
+    """Report the caller's quota (and a replacement quota token) in response headers"""
+    quota = g.get('quota')
+    if quota is None:
+        return response
+    response.headers['X-RateLimit-Limit'] = f"{quota['limit']:g}"
+    response.headers['X-RateLimit-Remaining'] = f"{max(0.0, quota['remaining']):g}"
+    response.headers['X-RateLimit-Reset'] = str(math.ceil(quota['reset']))
+    response.headers['X-Quota-Cost'] = f"{quota['cost']:g}"
+    if response.status_code == 429 and 0 < quota['retry_after'] and quota['requested'] <= quota['limit']:
+        response.headers['Retry-After'] = str(math.ceil(quota['retry_after']))
+    # Streamed bodies are still being produced, their token goes out as the last line instead
+    if not response.is_streamed:
+        token = issue_quota_token(quota)
+        if token:
+            response.headers[QUOTA_TOKEN_HEADER] = token
+    return response
+
 @app.route('/')
 def index():
     """Serve the main page"""
@@ -98,6 +826,7 @@ def health_check():
             "timestamp": datetime.now().isoformat(),
             "duc_haba_api_status": "working" if success else "error",
             "duc_haba_test": "API test successful" if success else result,
+            "circuit_state": upstream_breaker.stats()["state"],
             "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
         })
         
@@ -129,6 +858,48 @@ def test_connection():
             "timestamp": datetime.now().isoformat()
         }), 500
 
+@app.route('/api/metrics')
+def metrics():
+    """Runtime counters for caching and upstream usage"""
+    return jsonify({
+        "timestamp": datetime.now().isoformat(),
+        "result_cache": result_cache.stats(),
+        "single_flight": upstream_flight.stats(),
+        "safer_model": safer_model.stats(),
+        "chart_store": chart_store.stats(),
+        "gradio_pool": gradio_pool.stats(),
+        "circuit_breaker": upstream_breaker.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "rate_limiter_tiers": {tier: limiter.stats() for tier, limiter in rate_limiters.items() if limiter is not rate_limiter},
+        "quota_tokens": quota_tokens.stats() if quota_tokens else None,
+        "hedging": hedger.stats() if hedger else None,
+        "concurrency_limiter": upstream_limiter.stats(),
+        "keep_warm": keep_warm.stats(),
+        "space_snapshot": space_snapshot.stats(),
+        "calling_convention_probes": calling_convention.probes,
+        "direct_transport": direct_transport.stats() if direct_transport else None
+    })
+
+@app.route('/api/chart/<chart_id>')
+def get_chart(chart_id):
+    """Serve a stored chart by content hash with long-lived caching headers"""
+    etag = f'"{chart_id}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = make_response('', 304)
+    else:
+        chart_data = chart_store.get(chart_id)
+        if chart_data is None:
+            return jsonify({
+                "error": "Chart not found. It may have expired, please analyze the text again."
+            }), 404
+        body, mimetype = chart_payload(chart_data)
+        response = make_response(body)
+        response.mimetype = mimetype
+    
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = f'public, max-age={CHART_CACHE_MAX_AGE}, immutable'
+    return response
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_text():
     """Analyze text using ONLY Duc Haba's API"""
@@ -136,13 +907,6 @@ def analyze_text():
         # Get client IP for rate limiting
         client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
         
-        # Check rate limit
-        if not check_rate_limit(client_ip):
-            return jsonify({
-                "error": "Rate limit exceeded. Please wait before making more requests.",
-                "retry_after": RATE_LIMIT_WINDOW
-            }), 429
-        
         # Get request data
         data = request.get_json()
         
@@ -152,67 +916,134 @@ def analyze_text():
             }), 400
         
         text_to_analyze = data['text'].strip()
+        long_text = bool(data.get('long_text', False))
+        incremental = bool(data.get('incremental', False))
         
-        if not text_to_analyze:
+        text_error = validate_text(text_to_analyze, LONG_TEXT_MAX_LENGTH if long_text else MAX_TEXT_LENGTH)
+        if text_error:
             return jsonify({
-                "error": "Text cannot be empty"
+                "error": text_error
             }), 400
         
-        if len(text_to_analyze) > 5000:
+        # Get safer value from request or use default
+        safer_value = data.get('safer', 0.02)
+        if not isinstance(safer_value, (int, float)) or isinstance(safer_value, bool):
             return jsonify({
-                "error": "Text too long. Maximum 5000 characters allowed."
+                "error": "'safer' must be a number"
             }), 400
+        bypass_cache = bool(data.get('bypass_cache', False))
+        include_chart = data.get('include_chart', True) is not False
         
-        # Get safer value from request or use default
-        safer_value = data.get('safer', 0.02)
+        # Optional multi-threshold mode
+        safer_values = data.get('safer_values')
+        if safer_values is not None:
+            if (not isinstance(safer_values, list) or len(safer_values) > MAX_SAFER_VALUES
+                    or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in safer_values)):
+                return jsonify({
+                    "error": f"'safer_values' must be a list of at most {MAX_SAFER_VALUES} numbers"
+                }), 400
+            if long_text or incremental:
+                return jsonify({
+                    "error": "'safer_values' can't be combined with 'long_text' or 'incremental'"
+                }), 400
+        
+        # Long-text mode combines per-chunk analyses, incremental mode per-sentence ones
+        mode = None
+        calls = 1
+        cached_calls = 0
+        if long_text and len(text_to_analyze) > MAX_TEXT_LENGTH:
+            mode = 'long_text'
+            calls = len(chunk_text(text_to_analyze, LONG_TEXT_CHUNK_CHARS, LONG_TEXT_OVERLAP_CHARS))
+        elif incremental and not bypass_cache:
+            spans, changed = plan_incremental(text_to_analyze, safer_value)
+            if 1 < len(spans) <= INCREMENTAL_MAX_SENTENCES:
+                mode = 'incremental'
+                calls = len(spans)
+                cached_calls = len(spans) - len(changed)
+        estimate = cost_model.cost(len(text_to_analyze), calls, cached_calls)
+        if safer_values and not safer_model.can_derive(include_chart=False):
+            # Each threshold may need its own upstream call
+            estimate += cost_model.cost(len(text_to_analyze), len(set(safer_values)))
+        
+        # Check rate limit, charging the cost of an uncached analysis up front
+        if not check_rate_limit(client_ip, estimate):
+            return jsonify({
+                "error": rate_limit_message(),
+                "retry_after": rate_limit_retry_after()
+            }), 429
         
         # Log request WITHOUT the actual text content for privacy
         logger.info(f"Analysis request from {client_ip[:10]}*** - text length: {len(text_to_analyze)}")
         
         # Call Duc Haba's API
         logger.info("📡 Calling Duc Haba's API...")
-        success, result = call_duc_haba_api(text_to_analyze, safer_value)
+        combined = None
+        if mode == 'long_text':
+            combined = analyze_long_text(text_to_analyze, safer_value, bypass_cache, include_chart)
+        elif mode == 'incremental':
+            combined = analyze_incremental(text_to_analyze, safer_value, spans, include_chart)
+        
+        if combined is not None:
+            success, results, cached = combined
+            if success:
+                # Only chunks or sentences that missed the cache are charged in full
+                stats = results["chunks"] if mode == 'long_text' else results["sentences"]
+                settle_quota(cost_model.cost(len(text_to_analyze), stats["unique"], stats["cached"]))
+                return jsonify({
+                    "success": True,
+                    "timestamp": datetime.now().isoformat(),
+                    "api_used": "duchaba/Friendly_Text_Moderation",
+                    "endpoint_used": "/fetch_toxicity_level",
+                    "cached": cached,
+                    "results": results,
+                    "privacy_note": "Your text was analyzed but not stored or logged.",
+                    "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
+                })
+            result = results
+        else:
+            success, result, cached = analyze_with_cache(text_to_analyze, safer_value, bypass_cache, include_chart)
+            if success:
+                settle_quota(cost_model.cost(len(text_to_analyze), cached_calls=1 if cached else 0))
         
         if not success:
+            # Failed upstream calls only cost the minimum
+            settle_quota(cost_model.cache_hit_cost)
             return jsonify({
                 "error": "Duc Haba's API call failed.",
                 "details": result,
                 "suggestion": "Please try again. The API may be temporarily busy.",
+                "retry_after": upstream_breaker.retry_after(),
                 "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
             }), 503
         
         # Parse the results
         try:
-            chart_data = result[0] if len(result) > 0 else None
-            json_output = result[1] if len(result) > 1 else None
-            
-            # Try to parse JSON output if it's a string
-            parsed_json = None
-            if json_output:
-                try:
-                    parsed_json = json.loads(json_output) if isinstance(json_output, str) else json_output
-                except json.JSONDecodeError:
-                    parsed_json = {
-                        "raw_output": json_output,
-                        "parse_error": "Could not parse JSON output from Duc Haba's API"
-                    }
+            results = format_results(result, include_chart)
+            parsed_json = results["analysis"]
             
             # Log successful analysis
-            logger.info(f"✅ Duc Haba analysis completed for {client_ip[:10]}*** - length: {len(text_to_analyze)}")
+            logger.info(f"✅ Duc Haba analysis completed for {client_ip[:10]}*** - length: {len(text_to_analyze)} - cached: {cached}")
             
-            # Return results
-            return jsonify({
+            response = {
                 "success": True,
                 "timestamp": datetime.now().isoformat(),
                 "api_used": "duchaba/Friendly_Text_Moderation",
                 "endpoint_used": "/fetch_toxicity_level",
-                "results": {
-                    "chart_data": chart_data,
-                    "analysis": parsed_json
-                },
+                "cached": cached,
+                "results": results,
                 "privacy_note": "Your text was analyzed but not stored or logged.",
                 "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
-            })
+            }
+            
+            if safer_values is not None:
+                threshold_mode, decisions, stats = threshold_decisions(text_to_analyze, parsed_json, safer_values)
+                response["threshold_mode"] = threshold_mode
+                response["thresholds"] = decisions
+                if stats["calls"]:
+                    settle_quota(g.quota["cost"] + cost_model.cost(len(text_to_analyze), stats["calls"], stats["cached"]))
+            
+            # Return results
+            return jsonify(response)
             
         except Exception as parse_error:
             logger.error(f"Error parsing API response: {parse_error}")
@@ -230,6 +1061,291 @@ def analyze_text():
             "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
         }), 500
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """Analyze a list of texts with deduplication and concurrent upstream fan-out"""
+    try:
+        client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+        
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else None
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                "error": "Request body must contain a non-empty 'items' list"
+            }), 400
+        
+        if len(items) > BATCH_MAX_ITEMS:
+            return jsonify({
+                "error": f"Too many items. Maximum {BATCH_MAX_ITEMS} items per batch."
+            }), 400
+        
+        default_safer = data.get('safer', 0.02)
+        include_chart = data.get('include_chart', True) is not False
+        bypass_cache = bool(data.get('bypass_cache', False))
+        parsed_items = [parse_batch_item(index, item, default_safer) for index, item in enumerate(items)]
+        
+        # Identical (text, safer) pairs within the batch share one upstream call (and one charge)
+        unique_texts = {}
+        for item_id, text, safer_value, error in parsed_items:
+            if not error:
+                unique_texts.setdefault(make_cache_key(text, safer_value), (text, safer_value))
+        
+        estimate = sum(cost_model.cost(len(text)) for text, safer_value in unique_texts.values())
+        if not check_rate_limit(client_ip, max(estimate, cost_model.cache_hit_cost)):
+            return jsonify({
+                "error": rate_limit_message(),
+                "retry_after": rate_limit_retry_after()
+            }), 429
+        
+        futures = {
+            key: upstream_executor.submit(analyze_item, text, safer_value, include_chart, bypass_cache)
+            for key, (text, safer_value) in unique_texts.items()
+        }
+        
+        logger.info(f"Batch request from {client_ip[:10]}*** - items: {len(items)}, unique: {len(futures)}")
+        
+        # Results are returned in input order
+        results = []
+        for item_id, text, safer_value, error in parsed_items:
+            if error:
+                results.append({"id": item_id, "success": False, "error": error})
+                continue
+            item_result = dict(futures[make_cache_key(text, safer_value)].result())
+            item_result["id"] = item_id
+            results.append(item_result)
+        
+        actual = sum(item_cost(unique_texts[key][0], future.result()) for key, future in futures.items())
+        settle_quota(max(actual, cost_model.cache_hit_cost))
+        
+        return jsonify({
+            "success": True,
+            "timestamp": datetime.now().isoformat(),
+            "api_used": "duchaba/Friendly_Text_Moderation",
+            "endpoint_used": "/fetch_toxicity_level",
+            "count": len(results),
+            "unique_items": len(futures),
+            "failed": sum(1 for item in results if not item["success"]),
+            "items": results,
+            "privacy_note": "Your text was analyzed but not stored or logged.",
+            "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
+        })
+        
+    except Exception as e:
+        logger.error(f"❌ Unexpected error in batch endpoint: {traceback.format_exc()}")
+        return jsonify({
+            "error": "An unexpected error occurred.",
+            "suggestion": "Please try again.",
+            "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
+        }), 500
+
+def stream_results(lines, default_safer=0.02, include_chart=True, budget=None):
+    """Analyze NDJSON lines and yield one result line per item as it completes
+
+    At most STREAM_MAX_IN_FLIGHT items are in progress at a time and input is
+    only read when a slot frees up, so memory stays flat for any input size.
+    Each item is paid from budget (if given), the stream stops once it runs out.
+    """
+    in_flight = {}
+    index = 0
+    
+    def emit(item):
+        return json.dumps(item) + "\n"
+    
+    def finish(future):
+        item_index, item_id, text, estimate = in_flight.pop(future)
+        result = future.result()
+        if budget is not None:
+            budget.adjust(estimate, item_cost(text, result))
+        return emit(dict(result, index=item_index, id=item_id))
+    
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        if index >= STREAM_MAX_ITEMS:
+            yield emit({"index": index, "success": False, "error": f"Too many items. Maximum {STREAM_MAX_ITEMS} items per stream."})
+            break
+        
+        try:
+            item = json.loads(line)
+            item_id, text, safer_value, error = parse_batch_item(index, item, default_safer)
+        except ValueError:
+            item_id, error = index, "Invalid JSON line"
+        
+        if error:
+            yield emit({"index": index, "id": item_id, "success": False, "error": error})
+        else:
+            estimate = cost_model.cost(len(text))
+            if budget is not None and not budget.spend(estimate):
+                yield emit({"index": index, "id": item_id, "success": False, "error": "Rate limit exceeded. Please wait before making more requests."})
+                break
+            future = upstream_executor.submit(analyze_item, text, safer_value, include_chart)
+            in_flight[future] = (index, item_id, text, estimate)
+        index += 1
+        
+        # Backpressure: wait for a free slot before reading more input
+        while len(in_flight) >= STREAM_MAX_IN_FLIGHT:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield finish(future)
+    
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield finish(future)
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """Analyze newline-delimited JSON items and stream NDJSON results as they complete"""
+    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+    
+    try:
+        default_safer = float(request.args.get('safer', 0.02))
+    except ValueError:
+        return jsonify({
+            "error": "'safer' query parameter must be a number"
+        }), 400
+    include_chart = request.args.get('include_chart', 'true').lower() != 'false'
+    
+    # The item count isn't known up front, so reserve the remaining budget and refund the rest at the end
+    if not reserve_quota(client_ip):
+        return jsonify({
+            "error": rate_limit_message(),
+            "retry_after": rate_limit_retry_after()
+        }), 429
+    
+    logger.info(f"Streaming analysis request from {client_ip[:10]}***")
+    
+    lines = iter(request.stream.readline, b'')
+    
+    def metered_results():
+        budget = Budget(g.quota["charged"])
+        try:
+            yield from stream_results(lines, default_safer, include_chart, budget)
+        finally:
+            settle_quota(max(budget.spent, cost_model.cache_hit_cost))
+        # Token callers get their replacement token as the last line
+        token = issue_quota_token(g.quota)
+        if token:
+            yield json.dumps({"quota": {"remaining": g.quota["remaining"], "token": token}}) + "\n"
+    
+    return Response(
+        stream_with_context(metered_results()),
+        mimetype='application/x-ndjson',
+        headers={'X-Content-Type-Options': 'nosniff', 'Cache-Control': 'no-cache'}
+    )
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Queue a JSONL payload (or a file in JOB_INPUT_DIR) for background analysis"""
+    client_ip = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+    
+    # Items are paid for as they are queued, a job that doesn't fit the budget is rejected whole
+    if not reserve_quota(client_ip):
+        return jsonify({
+            "error": rate_limit_message(),
+            "retry_after": rate_limit_retry_after()
+        }), 429
+    budget = Budget(g.quota["charged"])
+    # Every exit, early 400s included, gives back what the job didn't use
+    actual_cost = cost_model.cache_hit_cost
+    
+    try:
+        if request.mimetype == 'application/json':
+            data = request.get_json(silent=True) or {}
+            default_safer = data.get('safer', 0.02)
+            include_chart = data.get('include_chart', False) is True
+            
+            if isinstance(data.get('items'), list):
+                items = (parse_batch_item(index, item, default_safer) for index, item in enumerate(data['items']))
+                job_id = get_job_runner().queue.create_job(metered_items(items, budget), default_safer, include_chart)
+            elif isinstance(data.get('file'), str):
+                if not JOB_INPUT_DIR:
+                    return jsonify({
+                        "error": "File references are disabled. Set JOB_INPUT_DIR to enable them."
+                    }), 400
+                root = os.path.realpath(JOB_INPUT_DIR)
+                path = os.path.realpath(os.path.join(root, data['file']))
+                if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+                    return jsonify({
+                        "error": "File not found in JOB_INPUT_DIR"
+                    }), 400
+                with open(path, 'r', encoding='utf-8') as f:
+                    job_id = get_job_runner().queue.create_job(metered_items(parse_jsonl_items(f, default_safer), budget), default_safer, include_chart)
+            else:
+                return jsonify({
+                    "error": "Send JSONL, or a JSON object with an 'items' list or a 'file' reference"
+                }), 400
+        else:
+            # Raw JSONL body, options come from the query string
+            default_safer = float(request.args.get('safer', 0.02))
+            include_chart = request.args.get('include_chart', 'false').lower() == 'true'
+            lines = (line.decode('utf-8') for line in iter(request.stream.readline, b''))
+            job_id = get_job_runner().queue.create_job(metered_items(parse_jsonl_items(lines, default_safer), budget), default_safer, include_chart)
+        
+        actual_cost = max(budget.spent, cost_model.cache_hit_cost)
+        job_runner.notify()
+        job = job_runner.queue.get_job(job_id)
+        logger.info(f"Job {job_id} queued by {client_ip[:10]}*** - items: {job['total']}")
+        
+        return jsonify({
+            "success": True,
+            "job_id": job_id,
+            "total": job["total"],
+            "status_url": f"/api/jobs/{job_id}",
+            "results_url": f"/api/jobs/{job_id}/results",
+            "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
+        }), 202
+        
+    except QuotaExceeded as e:
+        return jsonify({
+            "error": f"Rate limit exceeded. {e}",
+            "retry_after": rate_limit_retry_after()
+        }), 429
+    except ValueError as e:
+        return jsonify({
+            "error": f"Invalid job request: {e}"
+        }), 400
+    except Exception as e:
+        logger.error(f"❌ Unexpected error creating job: {traceback.format_exc()}")
+        return jsonify({
+            "error": "An unexpected error occurred.",
+            "suggestion": "Please try again."
+        }), 500
+    finally:
+        settle_quota(actual_cost)
+
+@app.route('/api/jobs/<job_id>')
+def job_status(job_id):
+    """Report job progress, throughput and ETA"""
+    job = get_job_runner().queue.get_job(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    job["results_url"] = f"/api/jobs/{job_id}/results"
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/results')
+def job_results(job_id):
+    """Download processed job results as NDJSON, one page at a time"""
+    queue = get_job_runner().queue
+    if queue.get_job(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    try:
+        offset = max(0, int(request.args.get('offset', 0)))
+        limit = min(JOB_RESULTS_PAGE_SIZE, max(1, int(request.args.get('limit', JOB_RESULTS_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({"error": "'offset' and 'limit' must be integers"}), 400
+    
+    rows = queue.get_results(job_id, offset, limit)
+    body = "".join(json.dumps(dict(result, index=seq)) + "\n" for seq, result in rows)
+    response = Response(body, mimetype='application/x-ndjson')
+    # Pages stop before items still waiting for a retry, poll again from here
+    response.headers['X-Next-Offset'] = str(rows[-1][0] + 1 if rows else offset)
+    return response
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8000))
     debug = os.environ.get('FLASK_ENV') == 'development'
@@ -237,4 +1353,13 @@ if __name__ == '__main__':
     logger.info(f"🎓 CLASS PROJECT: Text Moderator using ONLY Duc Haba's API")
     logger.info(f"🚀 Starting Flask server on port {port}")
     
+    # Resume any background jobs left over from a previous run
+    get_job_runner()
+    
+    # Create upstream clients before the first request arrives
+    gradio_pool.prewarm()
+    
+    if KEEP_WARM:
+        keep_warm.start()
+    
     app.run(host='0.0.0.0', port=port, debug=debug)
@@ -6,9 +6,11 @@ import logging
 from datetime import datetime
 import json
 import time
-from collections import defaultdict
 import traceback
 
+import calling_convention
+from rate_limiter import create_rate_limiter
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend-backend communication
@@ -17,10 +19,12 @@ CORS(app)  # Enable CORS for frontend-backend communication
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage (in production, use Redis or database)
-rate_limit_storage = defaultdict(list)
+# Rate limiting
 RATE_LIMIT_REQUESTS = 20  # requests per time window
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+rate_limiter = create_rate_limiter('sliding_window', limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW)
+
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
 
 # Initialize Gradio client for Duc Haba's API
 gradio_client = None
@@ -52,11 +56,7 @@ def test_api_with_sample():
     
     try:
         logger.info("🧪 Testing API with sample message...")
-        result = gradio_client.predict(
-            msg="Hello world, this is a test.",
-            safer=0.02,
-            api_name="/fetch_toxicity_level"
-        )
+        result = calling_convention.predict(gradio_client, "Hello world, this is a test.", 0.02, timeout=UPSTREAM_TIMEOUT_SECONDS)
         logger.info("✅ API test successful")
         return True, result
     except Exception as e:
@@ -69,21 +69,7 @@ initialize_api_client()
 
 def check_rate_limit(client_ip):
     """Check if client has exceeded rate limit"""
-    now = time.time()
-    
-    # Clean old entries
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check if limit exceeded
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
-    
-    # Add current request
-    rate_limit_storage[client_ip].append(now)
-    return True
+    return rate_limiter.hit(client_ip).allowed
 
 @app.route('/')
 def index():
@@ -196,11 +182,7 @@ def analyze_text():
         # Call Duc Haba's API with enhanced error handling
         try:
             logger.info("📡 Making API call...")
-            result = gradio_client.predict(
-                msg=text_to_analyze,
-                safer=safer_value,
-                api_name="/fetch_toxicity_level"
-            )
+            result = calling_convention.predict(gradio_client, text_to_analyze, safer_value, timeout=UPSTREAM_TIMEOUT_SECONDS)
             logger.info("✅ API call completed successfully")
             
         except Exception as api_error:
@@ -1,14 +1,18 @@
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
-from gradio_client import Client
 import os
 import logging
 from datetime import datetime
 import json
+import tempfile
 import time
-from collections import defaultdict
 import traceback
 
+from space_snapshot import SpaceSnapshot
+import calling_convention
+from rate_limiter import create_rate_limiter
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend-backend communication
@@ -17,10 +21,12 @@ CORS(app)  # Enable CORS for frontend-backend communication
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage (in production, use Redis or database)
-rate_limit_storage = defaultdict(list)
+# Rate limiting
 RATE_LIMIT_REQUESTS = 20  # requests per time window
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+rate_limiter = create_rate_limiter('sliding_window', limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW)
+
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
 
 # STRICT COMPLIANCE: Only use Duc Haba's API
 # Initialize Gradio client for Duc Haba's API ONLY
@@ -29,6 +35,15 @@ api_error_message = None
 connection_attempts = 0
 last_connection_attempt = 0
 
+# Fail fast during upstream outages instead of waiting out every timeout
+upstream_breaker = CircuitBreaker(name="duc_haba")
+
+# Snapshot of the Space config so reconnects and restarts skip discovery
+space_snapshot = SpaceSnapshot(
+    os.environ.get('SPACE_SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'space_snapshot.json')),
+    "duchaba/Friendly_Text_Moderation"
+)
+
 def initialize_duc_haba_client():
     """Initialize ONLY Duc Haba's API client - Class Project Compliance"""
     global gradio_client, api_error_message, connection_attempts, last_connection_attempt
@@ -43,8 +58,8 @@ def initialize_duc_haba_client():
     
     try:
         logger.info(f"🔗 Connecting to duchaba/Friendly_Text_Moderation (attempt {connection_attempts})...")
-        gradio_client = Client("duchaba/Friendly_Text_Moderation")
-        logger.info("✅ Successfully connected to Duc Haba's API")
+        gradio_client = space_snapshot.create_client()
+        logger.info(f"✅ Successfully connected to Duc Haba's API ({calling_convention.convention_for(gradio_client)} call)")
         api_error_message = None
         connection_attempts = 0  # Reset on success
         return True
@@ -56,123 +71,60 @@ def initialize_duc_haba_client():
         return False
 
 def test_duc_haba_api():
-    """Test Duc Haba's API with multiple parameter approaches"""
-    global gradio_client
-    
+    """Test Duc Haba's API with the resolved calling convention"""
     if not gradio_client:
         return False, "Client not initialized"
     
-    try:
-        logger.info("🧪 Testing Duc Haba's API with multiple approaches...")
-        
-        # Try approach 1: Positional arguments (most reliable)
-        try:
-            result = gradio_client.predict(
-                "Hello!!",  # First parameter (text)
-                0.02,       # Second parameter (safer value)
-                api_name="/fetch_toxicity_level"
-            )
-            logger.info("✅ Duc Haba API test successful (positional args)")
-            return True, result
-        except Exception as e1:
-            logger.warning(f"Positional args failed: {e1}")
-        
-        # Try approach 2: Named parameters as documented
-        try:
-            result = gradio_client.predict(
-                msg="Hello!!",
-                safer=0.02,
-                api_name="/fetch_toxicity_level"
-            )
-            logger.info("✅ Duc Haba API test successful (named args)")
-            return True, result
-        except Exception as e2:
-            logger.warning(f"Named args failed: {e2}")
-        
-        # Try approach 3: Alternative parameter names
-        try:
-            result = gradio_client.predict(
-                text="Hello!!",
-                safer=0.02,
-                api_name="/fetch_toxicity_level"
-            )
-            logger.info("✅ Duc Haba API test successful (alternative names)")
-            return True, result
-        except Exception as e3:
-            logger.warning(f"Alternative names failed: {e3}")
-        
-        return False, f"All approaches failed: {e1}, {e2}, {e3}"
-        
-    except Exception as e:
-        error_msg = str(e)
-        logger.error(f"❌ Duc Haba API test failed: {error_msg}")
-        return False, error_msg
+    logger.info("🧪 Testing Duc Haba's API...")
+    success, result = call_duc_haba_api("Hello!!", 0.02)
+    if success:
+        logger.info("✅ Duc Haba API test successful")
+    else:
+        logger.error(f"❌ Duc Haba API test failed: {result}")
+    return success, result
 
 def call_duc_haba_api(text, safer_value=0.02):
-    """Call Duc Haba's API with multiple fallback approaches"""
+    """Call Duc Haba's API once, re-probing the signature only if the schema changed"""
     global gradio_client
     
     if not gradio_client:
         return False, "Client not initialized"
     
-    # Try approach 1: Positional arguments (most reliable)
-    try:
-        result = gradio_client.predict(
-            text,        # First parameter
-            safer_value, # Second parameter
-            api_name="/fetch_toxicity_level"
-        )
-        logger.info("✅ API call successful (positional)")
-        return True, result
-    except Exception as e1:
-        logger.warning(f"Positional call failed: {e1}")
-    
-    # Try approach 2: Named parameters
     try:
-        result = gradio_client.predict(
-            msg=text,
-            safer=safer_value,
-            api_name="/fetch_toxicity_level"
+        result = upstream_breaker.call(
+            calling_convention.predict, gradio_client, text, safer_value, timeout=UPSTREAM_TIMEOUT_SECONDS
         )
-        logger.info("✅ API call successful (named)")
+        logger.info("✅ API call successful")
         return True, result
-    except Exception as e2:
-        logger.warning(f"Named call failed: {e2}")
+    except CircuitOpenError as e:
+        logger.warning(f"⚡ API call rejected: {e}")
+        return False, str(e)
+    except Exception as e:
+        if not calling_convention.is_schema_change(e):
+            logger.error(f"❌ API call failed: {e}")
+            return False, str(e)
+        logger.warning(f"⚠️ Upstream schema changed, re-probing: {e}")
     
-    # Try approach 3: Alternative names
+    # Refresh the snapshot, rebuild the client and resolve the convention again
+    calling_convention.forget_convention(gradio_client)
+    space_snapshot.revalidate()
     try:
-        result = gradio_client.predict(
-            text=text,
-            safer=safer_value,
-            api_name="/fetch_toxicity_level"
+        gradio_client = space_snapshot.create_client()
+        result = upstream_breaker.call(
+            calling_convention.predict, gradio_client, text, safer_value, timeout=UPSTREAM_TIMEOUT_SECONDS
         )
-        logger.info("✅ API call successful (alternative)")
+        logger.info("✅ API call successful after re-probe")
         return True, result
-    except Exception as e3:
-        logger.warning(f"Alternative call failed: {e3}")
-    
-    return False, f"All approaches failed: {e1}, {e2}, {e3}"
+    except Exception as e:
+        logger.error(f"❌ API call failed after re-probe: {e}")
+        return False, str(e)
 
 # Try to initialize the API on startup
 initialize_duc_haba_client()
 
 def check_rate_limit(client_ip):
     """Check if client has exceeded rate limit"""
-    now = time.time()
-    
-    # Clean old entries
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check if limit exceeded
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
-    
-    # Add current request
-    rate_limit_storage[client_ip].append(now)
-    return True
+    return rate_limiter.hit(client_ip).allowed
 
 @app.route('/')
 def index():
@@ -205,6 +157,7 @@ def health_check():
         "duc_haba_error": api_error_message,
         "duc_haba_test": duc_haba_test_result,
         "connection_attempts": connection_attempts,
+        "circuit_breaker": upstream_breaker.stats(),
         "compliance_note": "CLASS PROJECT: Only using duchaba/Friendly_Text_Moderation API"
     })
 
@@ -6,9 +6,11 @@ import logging
 from datetime import datetime
 import json
 import time
-from collections import defaultdict
 import traceback
 
+import calling_convention
+from rate_limiter import create_rate_limiter
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend-backend communication
@@ -17,10 +19,12 @@ CORS(app)  # Enable CORS for frontend-backend communication
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage (in production, use Redis or database)
-rate_limit_storage = defaultdict(list)
+# Rate limiting
 RATE_LIMIT_REQUESTS = 20  # requests per time window
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+rate_limiter = create_rate_limiter('sliding_window', limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW)
+
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
 
 # STRICT COMPLIANCE: Only use Duc Haba's API
 # Initialize Gradio client for Duc Haba's API ONLY
@@ -65,11 +69,7 @@ def test_duc_haba_api():
     try:
         logger.info("🧪 Testing Duc Haba's API with documented example...")
         # Use the exact example from the documentation
-        result = gradio_client.predict(
-            msg="Hello!!",
-            safer=0.02,
-            api_name="/fetch_toxicity_level"
-        )
+        result = calling_convention.predict(gradio_client, "Hello!!", 0.02, timeout=UPSTREAM_TIMEOUT_SECONDS)
         logger.info("✅ Duc Haba API test successful")
         return True, result
     except Exception as e:
@@ -82,21 +82,7 @@ initialize_duc_haba_client()
 
 def check_rate_limit(client_ip):
     """Check if client has exceeded rate limit"""
-    now = time.time()
-    
-    # Clean old entries
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check if limit exceeded
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
-    
-    # Add current request
-    rate_limit_storage[client_ip].append(now)
-    return True
+    return rate_limiter.hit(client_ip).allowed
 
 @app.route('/')
 def index():
@@ -218,11 +204,7 @@ def analyze_text():
         # Call Duc Haba's API using the documented endpoint
         try:
             logger.info("📡 Calling Duc Haba's /fetch_toxicity_level endpoint...")
-            result = gradio_client.predict(
-                msg=text_to_analyze,
-                safer=safer_value,
-                api_name="/fetch_toxicity_level"
-            )
+            result = calling_convention.predict(gradio_client, text_to_analyze, safer_value, timeout=UPSTREAM_TIMEOUT_SECONDS)
             logger.info("✅ Duc Haba API call completed successfully")
             
         except Exception as api_error:
@@ -5,9 +5,11 @@ import logging
 from datetime import datetime
 import json
 import time
-from collections import defaultdict
 import traceback
 
+import calling_convention
+from rate_limiter import create_rate_limiter
+
 # Initialize Flask app
 app = Flask(__name__)
 CORS(app)
@@ -16,10 +18,12 @@ CORS(app)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage
-rate_limit_storage = defaultdict(list)
+# Rate limiting
 RATE_LIMIT_REQUESTS = 20
 RATE_LIMIT_WINDOW = 3600
+rate_limiter = create_rate_limiter('sliding_window', limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW)
+
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
 
 # Global client variable
 gradio_client = None
@@ -50,11 +54,7 @@ def call_duc_haba_api(text, safer_value=0.02):
         client = get_gradio_client()
         
         # Use the EXACT method from documentation
-        result = client.predict(
-            msg=text,
-            safer=safer_value,
-            api_name="/fetch_toxicity_level"
-        )
+        result = calling_convention.predict(client, text, safer_value, timeout=UPSTREAM_TIMEOUT_SECONDS)
         
         logger.info("✅ API call successful")
         return True, result
@@ -68,18 +68,7 @@ def call_duc_haba_api(text, safer_value=0.02):
 
 def check_rate_limit(client_ip):
     """Check if client has exceeded rate limit"""
-    now = time.time()
-    
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
-    
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
-    
-    rate_limit_storage[client_ip].append(now)
-    return True
+    return rate_limiter.hit(client_ip).allowed
 
 @app.route('/')
 def index():
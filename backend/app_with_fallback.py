@@ -6,11 +6,13 @@ import logging
 from datetime import datetime
 import json
 import time
-from collections import defaultdict
 import traceback
 
 # Import our alternative moderator
 from alternative_moderator import AlternativeTextModerator
+from circuit_breaker import CircuitBreaker
+import calling_convention
+from rate_limiter import create_rate_limiter
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -20,15 +22,20 @@ CORS(app)  # Enable CORS for frontend-backend communication
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Rate limiting storage (in production, use Redis or database)
-rate_limit_storage = defaultdict(list)
+# Rate limiting
 RATE_LIMIT_REQUESTS = 20  # requests per time window
 RATE_LIMIT_WINDOW = 3600  # 1 hour in seconds
+rate_limiter = create_rate_limiter('sliding_window', limit=RATE_LIMIT_REQUESTS, window=RATE_LIMIT_WINDOW)
+
+UPSTREAM_TIMEOUT_SECONDS = float(os.environ.get('UPSTREAM_TIMEOUT_SECONDS', 30))
 
 # Initialize Gradio client for Duc Haba's API
 gradio_client = None
 api_error_message = None
 
+# While Duc Haba's API is failing, requests go straight to the fallback
+primary_breaker = CircuitBreaker(name="duc_haba")
+
 # Initialize alternative moderator
 hf_token = os.getenv('HUGGINGFACE_TOKEN')
 alternative_moderator = AlternativeTextModerator(hf_token)
@@ -60,11 +67,7 @@ def test_api_with_sample():
     
     try:
         logger.info("🧪 Testing API with sample message...")
-        result = gradio_client.predict(
-            msg="Hello world, this is a test.",
-            safer=0.02,
-            api_name="/fetch_toxicity_level"
-        )
+        result = calling_convention.predict(gradio_client, "Hello world, this is a test.", 0.02, timeout=UPSTREAM_TIMEOUT_SECONDS)
         logger.info("✅ API test successful")
         return True, result
     except Exception as e:
@@ -77,21 +80,7 @@ initialize_api_client()
 
 def check_rate_limit(client_ip):
     """Check if client has exceeded rate limit"""
-    now = time.time()
-    
-    # Clean old entries
-    rate_limit_storage[client_ip] = [
-        timestamp for timestamp in rate_limit_storage[client_ip] 
-        if now - timestamp < RATE_LIMIT_WINDOW
-    ]
-    
-    # Check if limit exceeded
-    if len(rate_limit_storage[client_ip]) >= RATE_LIMIT_REQUESTS:
-        return False
-    
-    # Add current request
-    rate_limit_storage[client_ip].append(now)
-    return True
+    return rate_limiter.hit(client_ip).allowed
 
 @app.route('/')
 def index():
@@ -231,10 +220,10 @@ def analyze_text():
         if gradio_client:
             try:
                 logger.info("📡 Trying primary API (Duc Haba)...")
-                result = gradio_client.predict(
-                    msg=text_to_analyze,
-                    safer=safer_value,
-                    api_name="/fetch_toxicity_level"
+                result = primary_breaker.call(
+                    calling_convention.predict,
+                    gradio_client, text_to_analyze, safer_value,
+                    timeout=UPSTREAM_TIMEOUT_SECONDS
                 )
                 
                 # Parse the results
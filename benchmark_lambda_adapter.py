@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Per-invocation overhead of lambda_wsgi against the old test_client handler
+
+Replays API Gateway events (REST API v1 and HTTP API v2) through both paths
+in-process, using requests that never reach the upstream Space:
+    python benchmark_lambda_adapter.py --invocations 2000
+"""
+
+import argparse
+import json
+import logging
+import time
+
+from app import app
+from lambda_wsgi import handle_event
+
+
+def legacy_handler(event):
+    """The test_client based API Gateway handling previously in lambda_function"""
+    method = event['httpMethod']
+    path = event.get('path', '/')
+    headers = event.get('headers', {})
+    query_params = event.get('queryStringParameters') or {}
+    body = event.get('body', '')
+
+    with app.test_client() as client:
+        query_string = '&'.join([f"{k}={v}" for k, v in query_params.items()]) if query_params else ''
+        if method == 'GET':
+            response = client.get(path, query_string=query_string, headers=headers)
+        elif method == 'POST':
+            content_type = headers.get('content-type', 'application/json')
+            if 'application/json' in content_type:
+                response = client.post(path, json=json.loads(body) if body else {}, headers=headers)
+            else:
+                response = client.post(path, data=body, headers=headers)
+        else:
+            response = client.open(path, method=method, data=body, headers=headers)
+        return {
+            'statusCode': response.status_code,
+            'headers': {'Content-Type': response.content_type, 'Access-Control-Allow-Origin': '*'},
+            'body': response.get_data(as_text=True)
+        }
+
+
+def rest_event(method, path, body=None, query=None):
+    headers = {'content-type': 'application/json', 'x-forwarded-for': '203.0.113.7', 'host': 'example.execute-api.amazonaws.com'}
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': headers,
+        'multiValueHeaders': {name: [value] for name, value in headers.items()},
+        'queryStringParameters': query,
+        'multiValueQueryStringParameters': {name: [value] for name, value in query.items()} if query else None,
+        'requestContext': {'identity': {'sourceIp': '203.0.113.7'}},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+def http_api_event(method, path, body=None, query=None):
+    return {
+        'version': '2.0',
+        'rawPath': path,
+        'rawQueryString': '&'.join(f"{k}={v}" for k, v in (query or {}).items()),
+        'headers': {'content-type': 'application/json', 'x-forwarded-for': '203.0.113.7', 'host': 'example.execute-api.amazonaws.com'},
+        'requestContext': {'http': {'method': method, 'path': path, 'sourceIp': '203.0.113.7'}},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+SCENARIOS = [
+    ("GET  /", 'GET', '/', None),
+    ("GET  /api/chart (404)", 'GET', '/api/chart/missing', None),
+    ("POST /api/analyze 1 KB", 'POST', '/api/analyze', json.dumps({"text": "", "padding": "x" * 1000})),
+    ("POST /api/analyze 200 KB", 'POST', '/api/analyze', json.dumps({"text": "word " * 40000})),
+]
+
+
+def time_invocations(handler, event, invocations):
+    """Average microseconds per invocation, and the last response"""
+    response = handler(event)
+    started = time.perf_counter()
+    for _ in range(invocations):
+        response = handler(event)
+    return (time.perf_counter() - started) / invocations * 1e6, response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--invocations", type=int, default=2000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(f"⏱️ {args.invocations} invocations per scenario")
+    for label, method, path, body in SCENARIOS:
+        legacy_us, legacy = time_invocations(legacy_handler, rest_event(method, path, body), args.invocations)
+        rest_us, rest = time_invocations(lambda e: handle_event(app, e), rest_event(method, path, body), args.invocations)
+        v2_us, v2 = time_invocations(lambda e: handle_event(app, e), http_api_event(method, path, body), args.invocations)
+        assert legacy['statusCode'] == rest['statusCode'] == v2['statusCode'], label
+        print(
+            f"   {label:<26} status {rest['statusCode']}  test_client {legacy_us:8.1f} µs"
+            f"  adapter v1 {rest_us:8.1f} µs  v2 {v2_us:8.1f} µs  ({legacy_us / rest_us:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
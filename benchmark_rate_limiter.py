@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for rate_limiter.RateLimiter
+
+Per-call cost and memory at increasing numbers of distinct clients, against
+the old list-of-timestamps check_rate_limit:
+    python benchmark_rate_limiter.py --clients 1000 100000 1000000 --calls 200000
+Add --shared to also time the SQLite and Redis-protocol backends with and without leasing.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+from rate_limiter import ALGORITHMS, create_rate_limiter
+from redis_standin import RedisStandin
+from shared_rate_limit import SharedRateLimiter, create_rate_limit_store
+
+
+def legacy_limiter(limit, window):
+    """The per-IP timestamp list check previously copied into every app"""
+    storage = defaultdict(list)
+
+    def check(client_ip):
+        now = time.time()
+        storage[client_ip] = [t for t in storage[client_ip] if now - t < window]
+        if len(storage[client_ip]) >= limit:
+            return False
+        storage[client_ip].append(now)
+        return True
+
+    return check, storage
+
+
+def time_calls(check, keys, calls):
+    """Average nanoseconds per call over calls random picks from keys"""
+    picks = [random.choice(keys) for _ in range(calls)]
+    started = time.perf_counter()
+    for key in picks:
+        check(key)
+    return (time.perf_counter() - started) / calls * 1e9
+
+
+def bench_limiter(algorithm, clients, calls, limit, window, max_keys):
+    keys = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{i}" for i in range(clients)]
+    tracemalloc.start()
+    limiter = create_rate_limiter(algorithm, limit, window, max_keys=max_keys)
+    for key in keys:
+        limiter.hit(key)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    ns = time_calls(limiter.hit, keys, calls)
+    stats = limiter.stats()
+    print(
+        f"   {algorithm:<15} {clients:>9,} clients  {ns:7.0f} ns/call"
+        f"  tracked {stats['tracked_keys']:>9,}  memory {memory / 1e6:7.1f} MB"
+        f"  evicted {stats['evicted_keys']:,}"
+    )
+
+
+def bench_shared(calls, limit, window, leases):
+    """Per-call cost of the shared backends (1000 clients, high limit so calls are allowed)"""
+    keys = [f"client-{i}" for i in range(1000)]
+    server = RedisStandin(("127.0.0.1", 0)).start()
+    sqlite_dir = tempfile.mkdtemp()
+    for backend in ("sqlite", "redis"):
+        for lease in leases:
+            store = create_rate_limit_store(
+                backend, sqlite_path=os.path.join(sqlite_dir, f"bench-{lease}.sqlite3"), redis_url=server.url
+            )
+            limiter = SharedRateLimiter(store, limit=limit, window=window, lease_size=lease)
+            ns = time_calls(limiter.hit, keys, calls)
+            stats = limiter.stats()
+            print(
+                f"   {backend:<7} lease {lease:<4} {ns / 1000:8.1f} us/call"
+                f"  store calls {stats['store_calls']:>7,}  local decisions {stats['local_decision_rate']:.0%}"
+            )
+    server.shutdown()
+
+
+def bench_legacy_depth(depths, calls, window):
+    """Legacy cost grows with the number of requests a client has in the window"""
+    for depth in depths:
+        check, storage = legacy_limiter(depth + 1, window)
+        storage["client"] = [time.time()] * depth
+        ns = time_calls(lambda key: (check(key), storage[key].pop()), ["client"], calls)
+        print(f"   legacy          {depth:>9,} requests in window  {ns:7.0f} ns/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the per-client rate limiter")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--calls", type=int, default=200000, help="Timed calls per run (default 200000)")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--window", type=int, default=3600)
+    parser.add_argument("--max-keys", type=int, default=100000, help="Hard cap on tracked clients (default 100000)")
+    parser.add_argument("--shared", action="store_true", help="Also benchmark the shared SQLite/Redis backends")
+    args = parser.parse_args()
+
+    print(f"\n📊 RateLimiter (limit {args.limit}/{args.window}s, max_keys {args.max_keys:,})")
+    for algorithm in ALGORITHMS:
+        for clients in args.clients:
+            bench_limiter(algorithm, clients, args.calls, args.limit, args.window, args.max_keys)
+
+    if args.shared:
+        print("\n📊 SharedRateLimiter (1,000 clients)")
+        bench_shared(min(args.calls, 20000), 1000000, args.window, [1, 10, 100])
+
+    print("\n📊 Legacy timestamp lists")
+    bench_legacy_depth([20, 1000, 10000], min(args.calls, 20000), args.window)
+    check, storage = legacy_limiter(args.limit, args.window)
+    tracemalloc.start()
+    for i in range(max(args.clients)):
+        check(f"client-{i}")
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"   legacy          {max(args.clients):>9,} clients  memory {memory / 1e6:7.1f} MB (never evicted)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark upstream transports against a Space (real or a local mock)
+
+Compares gradio_client.Client.predict with the direct keep-alive transport:
+    python benchmark_transport.py --space http://127.0.0.1:7860 --requests 200 --concurrency 8
+"""
+
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from direct_transport import DirectSpaceTransport
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def run(name, setup, call, requests_count, concurrency):
+    """Time setup once, then requests_count calls at the given concurrency"""
+    started = time.perf_counter()
+    setup()
+    setup_time = time.perf_counter() - started
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal errors
+        t = time.perf_counter()
+        try:
+            call(f"Benchmark message number {i}. Have a nice day!")
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - t)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests_count)))
+    elapsed = time.perf_counter() - started
+
+    print(f"\n📊 {name}")
+    print(f"   setup (client creation / schema discovery): {setup_time * 1000:.1f} ms")
+    print(f"   throughput: {len(latencies) / elapsed:.1f} req/s  errors: {errors}")
+    if latencies:
+        print(
+            f"   latency ms: mean {statistics.mean(latencies) * 1000:.1f}"
+            f"  p50 {percentile(latencies, 0.5) * 1000:.1f}"
+            f"  p95 {percentile(latencies, 0.95) * 1000:.1f}"
+            f"  p99 {percentile(latencies, 0.99) * 1000:.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark upstream transports")
+    parser.add_argument("--space", default="duchaba/Friendly_Text_Moderation", help="Space id or URL (e.g. a local mock)")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--transports", default="gradio,direct", help="Comma-separated: gradio, direct")
+    args = parser.parse_args()
+
+    transports = args.transports.split(",")
+    print(f"🏁 {args.requests} requests at concurrency {args.concurrency} against {args.space}")
+
+    if "gradio" in transports:
+        state = {}
+
+        def setup_gradio():
+            from gradio_client import Client
+            state["client"] = Client(args.space)
+
+        def call_gradio(text):
+            return state["client"].predict(msg=text, safer=0.02, api_name="/fetch_toxicity_level")
+
+        run("gradio_client", setup_gradio, call_gradio, args.requests, args.concurrency)
+
+    if "direct" in transports:
+        transport = DirectSpaceTransport(args.space, pool_size=args.concurrency)
+        run("direct keep-alive", transport.schema, lambda text: transport.predict(text, 0.02), args.requests, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Resolve how to call /fetch_toxicity_level once per client
+The documented call is predict(msg=..., safer=...), but older gradio_client
+releases only take positional arguments and some Space revisions name the
+first input text. The convention is read from the client's API info (no
+network call, it was fetched or snapshotted when the client was created)
+and memoized, so every request makes exactly one upstream call.
+"""
+
+import inspect
+import logging
+import threading
+import time
+import weakref
+from concurrent.futures import wait
+
+logger = logging.getLogger(__name__)
+
+API_NAME = "/fetch_toxicity_level"
+
+# Fragments of the errors gradio_client raises when the call doesn't match the endpoint
+SCHEMA_ERROR_MARKERS = ("api_name", "fn_index", "argument", "parameter", "keyword")
+
+# How often a waiting call checks whether it has been cancelled
+CANCEL_POLL_SECONDS = 0.05
+
+_conventions = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+probes = 0
+
+
+class UpstreamTimeout(Exception):
+    """Raised when an upstream call misses its deadline"""
+
+
+class UpstreamCancelled(Exception):
+    """Raised when an in-flight upstream call is cancelled (e.g. a lost hedge)"""
+
+
+def _accepts_keywords(client):
+    try:
+        parameters = inspect.signature(client.predict).parameters.values()
+    except (TypeError, ValueError):
+        return True
+    return any(p.kind == inspect.Parameter.VAR_KEYWORD for p in parameters)
+
+
+def resolve_convention(client, api_name=API_NAME):
+    """Return 'positional', 'msg' or 'text' for this client and endpoint"""
+    global probes
+    with _lock:
+        probes += 1
+    if not _accepts_keywords(client):
+        return "positional"
+    try:
+        info = client.view_api(print_info=False, return_format="dict")
+        parameters = info["named_endpoints"][api_name]["parameters"]
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read the API info, using the documented call: {e}")
+        return "msg"
+    names = [p.get("parameter_name") or p.get("label") for p in parameters]
+    if "msg" in names:
+        return "msg"
+    if "text" in names:
+        return "text"
+    return "positional"
+
+
+def convention_for(client):
+    """Return the memoized convention for client, resolving it on first use"""
+    with _lock:
+        convention = _conventions.get(client)
+    if convention is None:
+        convention = resolve_convention(client)
+        with _lock:
+            _conventions[client] = convention
+        logger.info(f"🧭 Using {convention} calling convention for {API_NAME}")
+    return convention
+
+
+def forget_convention(client):
+    """Drop the memoized convention so the next call re-probes"""
+    with _lock:
+        _conventions.pop(client, None)
+
+
+def is_schema_change(error):
+    """True if an upstream error means the call no longer matches the endpoint"""
+    if isinstance(error, TypeError):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in SCHEMA_ERROR_MARKERS)
+
+
+def _call(method, text, safer_value, convention):
+    if convention == "positional":
+        return method(text, safer_value, api_name=API_NAME)
+    if convention == "text":
+        return method(text=text, safer=safer_value, api_name=API_NAME)
+    return method(msg=text, safer=safer_value, api_name=API_NAME)
+
+
+def predict(client, text, safer_value, convention=None, timeout=None, cancel=None):
+    """Make exactly one upstream call using the client's convention
+
+    With a timeout (seconds) or a cancel Event the call is submitted as a
+    Gradio job and waited on; when the deadline passes or cancel is set the
+    job is cancelled, which also removes it from the Space's queue. Clients
+    without submit() are called directly.
+    """
+    convention = convention or convention_for(client)
+    if (timeout is None and cancel is None) or not hasattr(client, "submit"):
+        return _call(client.predict, text, safer_value, convention)
+
+    job = _call(client.submit, text, safer_value, convention)
+    deadline = time.time() + timeout if timeout is not None else None
+    while True:
+        remaining = deadline - time.time() if deadline is not None else CANCEL_POLL_SECONDS
+        if remaining <= 0:
+            job.cancel()
+            raise UpstreamTimeout(f"Upstream call exceeded {timeout:g}s and was cancelled")
+        if cancel is not None and cancel.is_set():
+            job.cancel()
+            raise UpstreamCancelled("Upstream call cancelled")
+        done, _ = wait([job], timeout=min(remaining, CANCEL_POLL_SECONDS))
+        if done:
+            return job.result()
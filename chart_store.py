@@ -0,0 +1,55 @@
+"""
+Content-addressed store for Duc Haba chart payloads
+Charts are served out-of-band from /api/chart/<hash> so analyze responses
+(and cache hits) don't carry the whole image inline
+"""
+
+import base64
+import binascii
+import json
+import re
+
+from rethreshold import chart_hash
+from result_cache import ResultCache
+
+DATA_URL_PATTERN = re.compile(r"^data:(?P<mimetype>[\w.+-]+/[\w.+-]+);base64,(?P<data>.*)$", re.DOTALL)
+CHART_ID_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def chart_payload(chart_data):
+    """Turn a chart into (body bytes, mimetype) suitable for an HTTP response"""
+    plot = chart_data.get("plot") if isinstance(chart_data, dict) else None
+    if isinstance(plot, str):
+        match = DATA_URL_PATTERN.match(plot)
+        if match:
+            try:
+                return base64.b64decode(match.group("data"), validate=False), match.group("mimetype")
+            except (binascii.Error, ValueError):
+                pass
+    return json.dumps(chart_data, default=str).encode("utf-8"), "application/json"
+
+
+class ChartStore:
+    """Bounded chart store keyed by the SHA-256 of the chart payload"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttl=86400, persistent=None):
+        self._cache = ResultCache(max_bytes=max_bytes, ttl=ttl, persistent=persistent)
+
+    def put(self, chart_data):
+        """Store a chart and return its content hash (None if there is no chart)"""
+        if not chart_data:
+            return None
+        chart_id = chart_hash(chart_data)
+        if self._cache.get(chart_id, count=False) is None:
+            self._cache.set(chart_id, chart_data)
+        return chart_id
+
+    def get(self, chart_id):
+        """Return the chart stored under chart_id, or None"""
+        if not CHART_ID_PATTERN.match(chart_id or ""):
+            return None
+        return self._cache.get(chart_id)
+
+    def stats(self):
+        """Return store counters for metrics"""
+        return self._cache.stats()
@@ -0,0 +1,181 @@
+"""
+Circuit breaker for upstream calls
+While the upstream is failing (or answering too slowly) the circuit opens
+and calls are rejected immediately instead of each waiting for a timeout.
+After a cool-down a limited number of probe calls are let through; if they
+succeed the circuit closes again, otherwise it re-opens.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit is open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker over a rolling window of outcomes"""
+
+    def __init__(
+        self,
+        name="upstream",
+        window_seconds=30,
+        min_requests=10,
+        error_rate=0.5,
+        slow_call_seconds=10.0,
+        slow_rate=0.8,
+        open_seconds=30,
+        half_open_probes=2,
+        ignored_exceptions=(),
+        clock=time.time,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        # Local errors (e.g. load shedding) that say nothing about upstream health
+        self.ignored_exceptions = ignored_exceptions
+        self.clock = clock
+        self._lock = threading.Lock()
+        # One [second, calls, failures, slow] bucket per second of the window
+        self._buckets = deque()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.transitions = {}
+        self.rejected = 0
+        self.last_transition_at = None
+
+    def _transition(self, state, now):
+        key = f"{self._state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        self.last_transition_at = now
+        logger.warning(f"⚡ {self.name} circuit {key}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = now
+        if state == HALF_OPEN:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._buckets.clear()
+
+    def _window_totals(self, now):
+        horizon = int(now) - self.window_seconds
+        while self._buckets and self._buckets[0][0] <= horizon:
+            self._buckets.popleft()
+        calls = failures = slow = 0
+        for _, bucket_calls, bucket_failures, bucket_slow in self._buckets:
+            calls += bucket_calls
+            failures += bucket_failures
+            slow += bucket_slow
+        return calls, failures, slow
+
+    def allow(self):
+        """Return True if a call may proceed (and reserve a probe when half-open)"""
+        now = self.clock()
+        with self._lock:
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, now)
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success, latency):
+        """Record the outcome of a call that allow() let through"""
+        now = self.clock()
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if not success or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED, now)
+                return
+            if self._state == OPEN:
+                # A call that started before the circuit opened
+                return
+
+            second = int(now)
+            if not self._buckets or self._buckets[-1][0] != second:
+                self._buckets.append([second, 0, 0, 0])
+            bucket = self._buckets[-1]
+            bucket[1] += 1
+            bucket[2] += 0 if success else 1
+            bucket[3] += 1 if slow else 0
+
+            calls, failures, slow_calls = self._window_totals(now)
+            if calls >= self.min_requests and (
+                failures / calls >= self.error_rate or slow_calls / calls >= self.slow_rate
+            ):
+                self._transition(OPEN, now)
+
+    def release(self):
+        """Give back a call that allow() let through without recording an outcome"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed, or None if calls are allowed now"""
+        with self._lock:
+            if self._state != OPEN:
+                return None
+            return max(0.0, self.open_seconds - (self.clock() - self._opened_at))
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker, raising CircuitOpenError when rejected"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after() or 0.0)
+        started = self.clock()
+        try:
+            result = fn(*args, **kwargs)
+        except self.ignored_exceptions:
+            self.release()
+            raise
+        except BaseException:
+            self.record(False, self.clock() - started)
+            raise
+        self.record(True, self.clock() - started)
+        return result
+
+    def stats(self):
+        """Return breaker state and counters for metrics"""
+        now = self.clock()
+        with self._lock:
+            calls, failures, slow = self._window_totals(now)
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "window_slow_calls": slow,
+                "error_rate": round(failures / calls, 4) if calls else 0.0,
+                "rejected": self.rejected,
+                "transitions": dict(self.transitions),
+                "last_transition_at": self.last_transition_at,
+            }
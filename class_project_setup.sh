@@ -31,7 +31,7 @@ echo "===================================="
 echo "✅ Diagnostics complete!"
 echo ""
 echo "🚀 To run your strictly compliant app:"
-echo "   python backend/app_duc_haba_only.py"
+echo "   python -m backend.app_duc_haba_only"
 echo ""
 echo "🌐 Then visit: http://localhost:8000"
 echo ""
@@ -50,7 +50,7 @@ echo "================================================="
 echo "✅ Setup complete!"
 echo ""
 echo "🚀 To run your strictly compliant app:"
-echo "   $PYTHON_CMD backend/app_duc_haba_only.py"
+echo "   $PYTHON_CMD -m backend.app_duc_haba_only"
 echo ""
 echo "🌐 Then visit: http://localhost:8000"
 echo ""
@@ -0,0 +1,168 @@
+"""
+Thread-safe pool of upstream Gradio clients
+Each predict checks out its own client, so one request's failure never
+tears the client out from under other in-flight requests. Clients that keep
+failing are evicted and replaced individually.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Raised when no client became available within the acquire timeout"""
+
+
+class _PooledClient:
+    def __init__(self, client, generation=0):
+        self.client = client
+        self.generation = generation
+        self.failures = 0
+        self.created_at = time.time()
+
+
+class ClientPool:
+    """Bounded pool of clients created by factory()"""
+
+    def __init__(self, factory, size=2, max_size=8, max_failures=2, acquire_timeout=30, unhealthy_exceptions=(OSError,)):
+        self.factory = factory
+        self.size = size
+        self.max_size = max(size, max_size)
+        self.max_failures = max_failures
+        self.acquire_timeout = acquire_timeout
+        # Only these (transport/connection errors) count against a client,
+        # timeouts, cancellations and upstream errors say nothing about it
+        self.unhealthy_exceptions = unhealthy_exceptions
+        self._idle = deque()
+        self._live = 0
+        self._cond = threading.Condition()
+        self.created = 0
+        self.evicted = 0
+        self.create_errors = 0
+        self.waits = 0
+        self.generation = 0
+        self.retired = 0
+
+    def _create(self):
+        """Create one client, the caller must already have reserved a slot"""
+        generation = self.generation
+        try:
+            pooled = _PooledClient(self.factory(), generation)
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self.create_errors += 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return pooled
+
+    def prewarm(self):
+        """Create clients up to the configured size ahead of the first request"""
+        while True:
+            with self._cond:
+                if self._live >= self.size:
+                    return
+                self._live += 1
+            try:
+                pooled = self._create()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not pre-create upstream client: {e}")
+                return
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Check out a client, creating one if the pool has room"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+        with self._cond:
+            while not self._idle and self._live >= self.max_size:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise PoolExhausted(f"No upstream client available after {timeout:g}s")
+                self.waits += 1
+                self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop()
+            self._live += 1
+        return self._create()
+
+    def release(self, pooled, healthy=True):
+        """Return a client to the pool, evicting it after repeated failures
+
+        healthy=None returns it without counting the call either way.
+        """
+        replace = False
+        with self._cond:
+            if pooled.generation != self.generation:
+                # Created before invalidate(), drop it instead of reusing it
+                self._live -= 1
+                self.retired += 1
+                replace = self._live < self.size
+            elif healthy or healthy is None:
+                if healthy:
+                    pooled.failures = 0
+                self._idle.append(pooled)
+            else:
+                pooled.failures += 1
+                if pooled.failures >= self.max_failures:
+                    self._live -= 1
+                    self.evicted += 1
+                    replace = self._live < self.size
+                    logger.warning("♻️ Evicting unhealthy upstream client")
+                else:
+                    self._idle.append(pooled)
+            self._cond.notify()
+        if replace:
+            threading.Thread(target=self.prewarm, name="client-pool-replace", daemon=True).start()
+
+    def invalidate(self):
+        """Retire every client created so far, e.g. after the upstream config changed"""
+        with self._cond:
+            self.generation += 1
+            stale = len(self._idle)
+            self._idle.clear()
+            self._live -= stale
+            self.retired += stale
+            self._cond.notify_all()
+        logger.info(f"♻️ Retired {stale} idle upstream clients, in-use clients retire on release")
+        threading.Thread(target=self.prewarm, name="client-pool-replace", daemon=True).start()
+
+    @contextmanager
+    def client(self, timeout=None):
+        """Context manager that checks a client out and reports its health"""
+        pooled = self.acquire(timeout)
+        try:
+            yield pooled.client
+        except self.unhealthy_exceptions:
+            self.release(pooled, healthy=False)
+            raise
+        except BaseException:
+            self.release(pooled, healthy=None)
+            raise
+        self.release(pooled, healthy=True)
+
+    def stats(self):
+        """Return pool counters for metrics"""
+        with self._cond:
+            return {
+                "size": self.size,
+                "max_size": self.max_size,
+                "live": self._live,
+                "idle": len(self._idle),
+                "in_use": self._live - len(self._idle),
+                "created": self.created,
+                "evicted": self.evicted,
+                "create_errors": self.create_errors,
+                "waits": self.waits,
+                "generation": self.generation,
+                "retired": self.retired,
+            }
@@ -0,0 +1,149 @@
+"""
+Adaptive (AIMD) limit on concurrent upstream calls
+The Space has its own queue, and pushing more concurrent predicts than it
+can serve only makes every call slower. The in-flight limit grows by about
+one per window of healthy calls and is halved on errors or latency spikes.
+A spike is a fast moving average of latency rising well above a slow one,
+so ordinary spread around a steady latency doesn't count as congestion.
+Calls over the limit wait in a bounded local queue and are shed when the
+queue is full or the wait times out.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a call is shed instead of waiting for a slot"""
+
+
+class AdaptiveLimiter:
+    """Additive-increase/multiplicative-decrease concurrency limiter"""
+
+    def __init__(
+        self,
+        initial_limit=4,
+        min_limit=1,
+        max_limit=16,
+        backoff=0.5,
+        latency_tolerance=2.0,
+        max_queue=64,
+        queue_timeout=10.0,
+        fast_weight=0.3,
+        slow_weight=0.02,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.fast_weight = fast_weight
+        self.slow_weight = slow_weight
+        self._limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self._in_flight = 0
+        self._queued = 0
+        self._cond = threading.Condition()
+        # Slow moving average of latency (the baseline) and a fast one (current latency)
+        self._baseline = None
+        self._smoothed = None
+        self._last_decrease = 0.0
+        self.shed = 0
+        self.queue_timeouts = 0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self):
+        return max(self.min_limit, int(self._limit))
+
+    def acquire(self, timeout=None):
+        """Take an in-flight slot, waiting in the local queue if necessary"""
+        timeout = self.queue_timeout if timeout is None else min(timeout, self.queue_timeout)
+        deadline = time.time() + timeout
+        with self._cond:
+            if self._in_flight < self.limit:
+                self._in_flight += 1
+                return
+            if self._queued >= self.max_queue:
+                self.shed += 1
+                raise ConcurrencyLimitExceeded(f"Upstream queue full ({self.max_queue} waiting)")
+            self._queued += 1
+            try:
+                while self._in_flight >= self.limit:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.queue_timeouts += 1
+                        raise ConcurrencyLimitExceeded(f"No upstream slot within {timeout:g}s")
+                    self._cond.wait(remaining)
+                self._in_flight += 1
+            finally:
+                self._queued -= 1
+
+    @staticmethod
+    def _average(current, latency, weight):
+        return latency if current is None else (1 - weight) * current + weight * latency
+
+    def release(self, latency, success=True):
+        """Free a slot and adapt the limit (success=None leaves it unchanged)"""
+        now = time.time()
+        with self._cond:
+            self._in_flight -= 1
+            if success is not None:
+                if success:
+                    self._baseline = self._average(self._baseline, latency, self.slow_weight)
+                    self._smoothed = self._average(self._smoothed, latency, self.fast_weight)
+                spike = success and self._smoothed > self.latency_tolerance * self._baseline
+                if not success or spike:
+                    # At most one cut per latency period, a burst of failures is one congestion event
+                    if now - self._last_decrease > (self._smoothed or latency):
+                        old = self.limit
+                        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+                        self._last_decrease = now
+                        self.decreases += 1
+                        if self.limit != old:
+                            logger.warning(f"📉 Upstream concurrency limit {old} -> {self.limit}")
+                elif self._in_flight + 1 >= self.limit and self._limit < self.max_limit:
+                    # Only grow while the current limit is actually being used
+                    self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+                    self.increases += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, timeout=None, neutral=()):
+        """Hold a slot for the duration of one upstream call
+
+        Exceptions listed in neutral (e.g. a cancelled hedge) don't count as
+        failures.
+        """
+        self.acquire(timeout)
+        started = time.time()
+        try:
+            yield
+        except neutral:
+            self.release(time.time() - started, None)
+            raise
+        except BaseException:
+            self.release(time.time() - started, False)
+            raise
+        self.release(time.time() - started, True)
+
+    def stats(self):
+        """Return the current limit, queue depth and counters for metrics"""
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "max_queue": self.max_queue,
+                "shed": self.shed,
+                "queue_timeouts": self.queue_timeouts,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "baseline_latency_ms": round(self._baseline * 1000, 1) if self._baseline is not None else None,
+                "smoothed_latency_ms": round(self._smoothed * 1000, 1) if self._smoothed is not None else None,
+            }
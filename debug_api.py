@@ -9,13 +9,15 @@ from gradio_client import Client
 import requests
 import json
 
+from upstream_space import UPSTREAM_SPACE
+
 def test_gradio_client():
     """Test the Gradio client connection"""
     print("🔍 Testing Gradio Client Connection...")
     
     try:
         # Try to initialize the client
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         print("✅ Successfully connected to duchaba/Friendly_Text_Moderation")
         
         # Test with a simple message
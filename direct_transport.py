@@ -0,0 +1,137 @@
+"""
+Lean HTTP transport to the Duc Haba Space
+Talks to the /fetch_toxicity_level endpoint directly over a pooled
+keep-alive connection instead of going through gradio_client.Client, which
+fetches the Space config and API info on every (re)connect. The endpoint
+schema is discovered once and reused, so a warm request is one round trip.
+Results have the same (chart, json) shape that client.predict returns.
+"""
+
+import logging
+import re
+import threading
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class DirectTransportError(Exception):
+    """Raised when the Space rejects or fails a direct call"""
+
+
+class DirectTransportUnsupported(DirectTransportError):
+    """Raised when the Space doesn't accept direct calls (e.g. queue-only endpoints)"""
+
+
+def space_url(space_id):
+    """Map a Space id like 'duchaba/Friendly_Text_Moderation' to its hf.space URL"""
+    if space_id.startswith("http://") or space_id.startswith("https://"):
+        return space_id.rstrip("/")
+    subdomain = re.sub(r"[^a-z0-9]+", "-", space_id.lower()).strip("-")
+    return f"https://{subdomain}.hf.space"
+
+
+class DirectSpaceTransport:
+    """Call one Gradio endpoint with plain HTTP and a cached schema"""
+
+    def __init__(self, space, api_name="/fetch_toxicity_level", timeout=30, pool_size=8, schema=None):
+        self.base_url = space_url(space)
+        self.api_name = api_name
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._schema = schema
+        self._schema_lock = threading.Lock()
+        self.discoveries = 0
+
+    def fetch_config(self):
+        """Fetch the raw Space config (one round trip)"""
+        response = self.session.get(f"{self.base_url}/config", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def schema_from_config(self, config):
+        """Extract what a direct call needs from a Space config"""
+        wanted = self.api_name.lstrip("/")
+        for index, dependency in enumerate(config.get("dependencies", [])):
+            if dependency.get("api_name") == wanted:
+                return {
+                    "fn_index": dependency.get("id", index),
+                    "api_name": self.api_name,
+                    "inputs": dependency.get("inputs", []),
+                    "outputs": dependency.get("outputs", []),
+                    "queue": dependency.get("queue", config.get("enable_queue")),
+                    "gradio_version": config.get("version"),
+                }
+        raise DirectTransportUnsupported(f"Endpoint {self.api_name} not found in Space config")
+
+    def schema(self, refresh=False):
+        """Return the cached endpoint schema, discovering it on first use"""
+        with self._schema_lock:
+            if self._schema is None or refresh:
+                self._schema = self.schema_from_config(self.fetch_config())
+                self.discoveries += 1
+                logger.info(f"🧭 Discovered {self.api_name} schema (fn_index {self._schema['fn_index']})")
+            return self._schema
+
+    def seed_schema(self, snapshot):
+        """Use the config from a Space snapshot instead of discovering it"""
+        if not snapshot:
+            return False
+        try:
+            schema = self.schema_from_config(snapshot.get("config") or {})
+        except DirectTransportUnsupported:
+            return False
+        with self._schema_lock:
+            self._schema = schema
+        return True
+
+    def reset_schema(self):
+        """Forget the schema so the next call rediscovers it"""
+        with self._schema_lock:
+            self._schema = None
+
+    def predict(self, text, safer_value=0.02, timeout=None):
+        """Run the endpoint and return a (chart, json) tuple like client.predict"""
+        schema = self.schema()
+        payload = {
+            "data": [text, safer_value],
+            "fn_index": schema["fn_index"],
+            "session_hash": uuid.uuid4().hex[:11],
+        }
+        try:
+            response = self.session.post(f"{self.base_url}/run/predict", json=payload, timeout=timeout or self.timeout)
+        except requests.RequestException as e:
+            raise DirectTransportError(f"Direct call failed: {e}") from e
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if not isinstance(body, dict):
+            body = {}
+
+        error = body.get("error") or body.get("detail")
+        if response.status_code in (404, 405) or (error and "queue" in str(error).lower()):
+            raise DirectTransportUnsupported(f"Space does not accept direct calls: {error or response.status_code}")
+        if response.status_code == 422 or (error and "fn_index" in str(error)):
+            # The Space was redeployed with a different layout, rediscover next time
+            self.reset_schema()
+            raise DirectTransportError(f"Endpoint schema changed: {error or response.status_code}")
+        if response.status_code != 200 or error or "data" not in body:
+            raise DirectTransportError(f"Space returned {response.status_code}: {error or response.text[:200]}")
+
+        return tuple(body["data"])
+
+    def stats(self):
+        """Return transport counters for metrics"""
+        return {
+            "base_url": self.base_url,
+            "schema_discoveries": self.discoveries,
+            "schema_cached": self._schema is not None,
+        }
@@ -9,6 +9,8 @@ import traceback
 import time
 from gradio_client import Client
 
+from upstream_space import UPSTREAM_SPACE
+
 def load_environment():
     """Load environment variables from .env file"""
     env_path = '/Users/evehwang/GitHub/text-moderator-app/.env'
@@ -30,7 +32,7 @@ def test_gradio_client_connection():
     
     try:
         print("📡 Connecting to duchaba/Friendly_Text_Moderation...")
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         print("✅ Client created successfully!")
         
         # Test the /fetch_toxicity_level endpoint as documented
@@ -74,7 +76,7 @@ def test_toxic_tweets_endpoint():
     print("\n🔍 Testing /fetch_toxic_tweets endpoint...")
     
     try:
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         
         result = client.predict(
             api_name="/fetch_toxic_tweets"
@@ -103,7 +105,7 @@ def test_different_inputs():
     ]
     
     try:
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         
         for msg, description in test_messages:
             print(f"\n📝 Testing: '{msg}' ({description})")
@@ -212,7 +214,7 @@ def main():
     print("✅ Diagnostic complete!")
     
     if success:
-        print("🎯 Your app should work! Try running: python backend/app.py")
+        print("🎯 Your app should work! Try running: python -m backend.app")
     else:
         print("⚠️ Fix the connection issues above before running your app")
 
@@ -0,0 +1,110 @@
+"""
+Hedged upstream requests
+If a call hasn't returned by the observed p95 latency, a second identical
+call is started and whichever succeeds first wins; the other one is
+cancelled. Hedges are capped at a fraction of all requests so a slow
+upstream isn't hit with double the load.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+
+class Hedger:
+    """Run attempt(cancel_event) with an optional delayed second attempt"""
+
+    def __init__(self, executor, percentile=0.95, min_samples=20, max_hedge_ratio=0.1, min_delay=0.05, window=500):
+        self.executor = executor
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_delay = min_delay
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedge_losses = 0
+        self.budget_denied = 0
+
+    def delay(self):
+        """Current hedge delay (the latency percentile), or None while still learning"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return max(self.min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))])
+
+    def _record(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _take_budget(self):
+        """Allow a hedge while hedges stay under max_hedge_ratio of requests"""
+        with self._lock:
+            if self.hedged + 1 > self.max_hedge_ratio * self.requests:
+                self.budget_denied += 1
+                return False
+            self.hedged += 1
+            return True
+
+    def run(self, attempt):
+        """Return the first successful result of one or two attempts"""
+        with self._lock:
+            self.requests += 1
+        started = time.time()
+        delay = self.delay()
+        if delay is None:
+            result = attempt(threading.Event())
+            self._record(time.time() - started)
+            return result
+
+        primary_cancel = threading.Event()
+        primary = self.executor.submit(attempt, primary_cancel)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._take_budget():
+            result = primary.result()
+            self._record(time.time() - started)
+            return result
+
+        logger.info(f"🪁 Hedging upstream call after {delay * 1000:.0f} ms")
+        hedge_cancel = threading.Event()
+        hedge = self.executor.submit(attempt, hedge_cancel)
+        cancels = {primary: primary_cancel, hedge: hedge_cancel}
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for other in pending:
+                    cancels[other].set()
+                with self._lock:
+                    if future is hedge:
+                        self.hedge_wins += 1
+                    else:
+                        self.hedge_losses += 1
+                self._record(time.time() - started)
+                return future.result()
+        raise error
+
+    def stats(self):
+        """Return hedging counters for metrics"""
+        delay = self.delay()
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "hedged": self.hedged,
+                "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "hedge_losses": self.hedge_losses,
+                "budget_denied": self.budget_denied,
+                "delay_ms": round(delay * 1000, 1) if delay is not None else None,
+            }
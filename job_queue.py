@@ -0,0 +1,378 @@
+"""
+Durable moderation job queue backed by SQLite
+Jobs are lists of items analyzed in the background. Results are
+checkpointed per chunk, so a restarted process resumes where it stopped.
+Item text is only kept until the item has been analyzed. Items that fail
+for transient reasons (upstream outage, timeouts) stay pending and are
+retried with exponential backoff before they are given up on.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 500
+
+# Items are spooled here while a payload is read, so slow uploads never hold the write lock
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Jobs still loading after this long were abandoned by a crashed process
+LOADING_TIMEOUT = 3600
+
+
+class JobQueue:
+    """SQLite-backed storage for jobs, their items and results"""
+
+    def __init__(self, path, max_attempts=10, retry_base=5.0, retry_max=900.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        conn = self._connection()
+        with self._write_lock:
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " safer REAL NOT NULL,"
+                " include_chart INTEGER NOT NULL,"
+                " total INTEGER NOT NULL DEFAULT 0,"
+                " completed INTEGER NOT NULL DEFAULT 0,"
+                " failed INTEGER NOT NULL DEFAULT 0,"
+                " created_at REAL NOT NULL,"
+                " started_at REAL,"
+                " finished_at REAL);"
+                "CREATE TABLE IF NOT EXISTS job_items ("
+                " job_id TEXT NOT NULL,"
+                " seq INTEGER NOT NULL,"
+                " item_id TEXT,"
+                " text TEXT,"
+                " safer REAL,"
+                " status TEXT NOT NULL,"
+                " result TEXT,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " retry_at REAL,"
+                " PRIMARY KEY (job_id, seq));"
+                "CREATE INDEX IF NOT EXISTS job_items_pending ON job_items (job_id, status, seq);"
+            )
+            # Queues created before retries existed
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(job_items)")}
+            if "attempts" not in columns:
+                conn.execute("ALTER TABLE job_items ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+                conn.execute("ALTER TABLE job_items ADD COLUMN retry_at REAL")
+            self._delete_jobs(conn, [
+                row[0] for row in conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'loading' AND created_at < ?",
+                    (time.time() - LOADING_TIMEOUT,)
+                )
+            ])
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def create_job(self, items, safer=0.02, include_chart=False):
+        """Store a new job from an iterable of (item_id, text, safer, error) tuples
+
+        The items (often a streamed request body) are read into a spool file
+        first, then inserted in short per-batch transactions, so checkpoints
+        and other submissions never wait on a slow upload. Items that already
+        carry an error are stored as failed right away. Nothing is stored if
+        reading the items raises.
+        """
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES, mode="w+", encoding="utf-8") as spool:
+            for item_id, text, item_safer, error in items:
+                spool.write(json.dumps([item_id, text, item_safer, error]) + "\n")
+            spool.seek(0)
+            return self._load_job(spool, safer, include_chart)
+
+    def _load_job(self, spool, safer, include_chart):
+        job_id = uuid.uuid4().hex
+        conn = self._connection()
+        total = failed = 0
+        # The job stays 'loading' (invisible to workers) until every item is in
+        with self._write_lock:
+            conn.execute(
+                "INSERT INTO jobs (id, status, safer, include_chart, created_at) VALUES (?, 'loading', ?, ?, ?)",
+                (job_id, float(safer), int(bool(include_chart)), time.time())
+            )
+        try:
+            batch = []
+            for line in spool:
+                item_id, text, item_safer, error = json.loads(line)
+                if error:
+                    result = json.dumps({"id": item_id, "success": False, "error": error})
+                    batch.append((job_id, total, str(item_id), None, None, "failed", result))
+                    failed += 1
+                else:
+                    batch.append((job_id, total, str(item_id), text, item_safer, "pending", None))
+                total += 1
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    self._insert_items(conn, batch)
+                    batch = []
+            self._insert_items(conn, batch)
+            status = "queued" if total > failed else "finished"
+            with self._write_lock:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, total = ?, failed = ?, finished_at = ? WHERE id = ?",
+                    (status, total, failed, time.time() if status == "finished" else None, job_id)
+                )
+        except Exception:
+            with self._write_lock:
+                self._delete_jobs(conn, [job_id])
+            raise
+        return job_id
+
+    @staticmethod
+    def _delete_jobs(conn, job_ids):
+        for job_id in job_ids:
+            conn.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _insert_items(self, conn, batch):
+        if batch:
+            with self._write_lock:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    conn.executemany(
+                        "INSERT INTO job_items (job_id, seq, item_id, text, safer, status, result)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        batch
+                    )
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+    def next_chunk(self, limit):
+        """Return (job, items) for the oldest job with items due, or (None, [])
+
+        Items waiting out a retry backoff are skipped; a job only finishes
+        once none of its items are pending any more.
+        """
+        conn = self._connection()
+        now = time.time()
+        jobs = conn.execute(
+            "SELECT id, safer, include_chart, started_at FROM jobs"
+            " WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+        for job_id, safer, include_chart, started_at in jobs:
+            items = conn.execute(
+                "SELECT seq, item_id, text, safer FROM job_items"
+                " WHERE job_id = ? AND status = 'pending' AND (retry_at IS NULL OR retry_at <= ?)"
+                " ORDER BY seq LIMIT ?",
+                (job_id, now, limit)
+            ).fetchall()
+            if items:
+                if started_at is None:
+                    with self._write_lock:
+                        conn.execute(
+                            "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (now, job_id)
+                        )
+                return {"id": job_id, "safer": safer, "include_chart": bool(include_chart)}, items
+            waiting = conn.execute(
+                "SELECT 1 FROM job_items WHERE job_id = ? AND status = 'pending' LIMIT 1", (job_id,)
+            ).fetchone()
+            if waiting is None:
+                with self._write_lock:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'finished', finished_at = ? WHERE id = ?", (now, job_id)
+                    )
+        return None, []
+
+    def retry_delay(self, attempts):
+        """Backoff before the next try of an item that has failed attempts times"""
+        return min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+
+    def checkpoint(self, job_id, results):
+        """Persist a chunk of (seq, result dict) pairs in one transaction
+
+        Failures marked "retryable" stay pending with a backoff until the
+        item has been tried max_attempts times.
+        """
+        conn = self._connection()
+        completed = failed = 0
+        now = time.time()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for seq, result in results:
+                    status = "done" if result.get("success") else "failed"
+                    if status == "failed" and result.get("retryable"):
+                        # Only rows still below the attempt limit are put back, the rest fail below
+                        retried = conn.execute(
+                            "UPDATE job_items SET attempts = attempts + 1,"
+                            " retry_at = ? + MIN(?, ? * (1 << attempts))"
+                            " WHERE job_id = ? AND seq = ? AND status = 'pending' AND attempts + 1 < ?",
+                            (now, self.retry_max, self.retry_base, job_id, seq, self.max_attempts)
+                        ).rowcount
+                        if retried:
+                            continue
+                    # Only count rows that were still pending (another worker may have won)
+                    updated = conn.execute(
+                        "UPDATE job_items SET status = ?, result = ?, text = NULL, attempts = attempts + 1"
+                        " WHERE job_id = ? AND seq = ? AND status = 'pending'",
+                        (status, json.dumps(result), job_id, seq)
+                    ).rowcount
+                    if updated and status == "done":
+                        completed += 1
+                    elif updated:
+                        failed += 1
+                conn.execute(
+                    "UPDATE jobs SET completed = completed + ?, failed = failed + ? WHERE id = ?",
+                    (completed, failed, job_id)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_job(self, job_id):
+        """Return job progress as a dict, or None if the job doesn't exist"""
+        row = self._connection().execute(
+            "SELECT id, status, total, completed, failed, created_at, started_at, finished_at"
+            " FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job_id, status, total, completed, failed, created_at, started_at, finished_at = row
+        retrying = self._connection().execute(
+            "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status = 'pending' AND attempts > 0", (job_id,)
+        ).fetchone()[0]
+        processed = completed + failed
+        elapsed = ((finished_at or time.time()) - started_at) if started_at else 0
+        throughput = processed / elapsed if elapsed > 0 else 0.0
+        remaining = total - processed
+        if not remaining:
+            eta = 0
+        elif throughput:
+            eta = round(remaining / throughput, 1)
+        else:
+            eta = None
+        return {
+            "id": job_id,
+            "status": status,
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "retrying": retrying,
+            "remaining": remaining,
+            "progress": round(processed / total, 4) if total else 1.0,
+            "throughput_per_second": round(throughput, 3),
+            "eta_seconds": eta,
+            "created_at": created_at,
+            "started_at": started_at,
+            "finished_at": finished_at,
+        }
+
+    def get_results(self, job_id, offset=0, limit=1000):
+        """Return processed results with seq >= offset, in input order
+
+        A page stops before the first item still pending (e.g. waiting for a
+        retry), so paging on from the last returned seq never skips it.
+        """
+        conn = self._connection()
+        first_pending = conn.execute(
+            "SELECT MIN(seq) FROM job_items WHERE job_id = ? AND seq >= ? AND status = 'pending'",
+            (job_id, offset)
+        ).fetchone()[0]
+        rows = conn.execute(
+            "SELECT seq, result FROM job_items"
+            " WHERE job_id = ? AND seq >= ? AND (? IS NULL OR seq < ?) AND status != 'pending'"
+            " ORDER BY seq LIMIT ?",
+            (job_id, offset, first_pending, first_pending, limit)
+        ).fetchall()
+        return [(seq, json.loads(result)) for seq, result in rows]
+
+
+class JobRunner:
+    """Background thread that works through queued jobs chunk by chunk"""
+
+    def __init__(self, queue, process_fn, executor, chunk_size=32, idle_interval=1.0):
+        self.queue = queue
+        self.process_fn = process_fn
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.idle_interval = idle_interval
+        self._wakeup = threading.Event()
+        self._outage_chunks = 0
+        self._pause_until = 0.0
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Start the worker thread once"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="job-runner", daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the worker up after new work was queued"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            # Back off while whole chunks keep failing (upstream outage)
+            pause = self._pause_until - time.time()
+            if pause > 0:
+                time.sleep(min(pause, self.idle_interval))
+                continue
+            try:
+                job, items = self.queue.next_chunk(self.chunk_size)
+            except sqlite3.Error as e:
+                logger.error(f"❌ Job queue read failed: {e}")
+                job, items = None, []
+            if job is None:
+                self._wakeup.wait(self.idle_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self.run_chunk(job, items)
+            except RuntimeError:
+                # The executor was shut down (interpreter exit), unfinished items stay pending
+                return
+
+    def run_chunk(self, job, items):
+        """Analyze one chunk concurrently and checkpoint its results"""
+        futures = []
+        for seq, item_id, text, safer in items:
+            safer = job["safer"] if safer is None else safer
+            futures.append((seq, item_id, self.executor.submit(self.process_fn, text, safer, job["include_chart"])))
+        results = []
+        for seq, item_id, future in futures:
+            try:
+                result = dict(future.result())
+            except Exception as e:
+                result = {"success": False, "error": str(e), "retryable": True}
+            result["id"] = item_id
+            results.append((seq, result))
+        try:
+            self.queue.checkpoint(job["id"], results)
+        except sqlite3.Error as e:
+            logger.error(f"❌ Job checkpoint failed: {e}")
+            time.sleep(self.idle_interval)
+
+        if results and all(not result.get("success") and result.get("retryable") for _, result in results):
+            self._outage_chunks += 1
+            delay = self.queue.retry_delay(self._outage_chunks)
+            self._pause_until = time.time() + delay
+            logger.warning(f"⏸️ Whole job chunk failed, pausing jobs for {delay:.0f}s")
+        else:
+            self._outage_chunks = 0
@@ -0,0 +1,183 @@
+"""
+Keep-warm scheduler for the upstream Space
+Free Spaces go to sleep after a period without traffic and the next caller
+pays a multi-second cold start. Cheap probes are sent only when there has
+been no real traffic for a while, at an interval learned from when the
+Space was found asleep, and every upstream call is classified as warm or
+cold by its latency so cold-start frequency and cost can be tracked.
+Latencies should cover only the upstream call itself, not local queueing.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class KeepWarm:
+    """Adaptive keep-warm probing with warm/cold classification"""
+
+    def __init__(
+        self,
+        probe_fn,
+        initial_interval=300,
+        min_interval=60,
+        max_interval=3600,
+        cold_min_seconds=3.0,
+        cold_factor=4.0,
+    ):
+        self.probe_fn = probe_fn
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cold_min_seconds = cold_min_seconds
+        self.cold_factor = cold_factor
+        self.interval = float(initial_interval)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_activity = None
+        self.warm_latency = None
+        # Longest idle gap after which the Space was still warm, shortest after which it was cold
+        self.longest_warm_gap = 0.0
+        self.shortest_cold_gap = None
+        self._probe_cold = None
+        self.probes = 0
+        self.probe_failures = 0
+        self.skipped = 0
+        self.warm = 0
+        self.cold = 0
+        self.cold_seconds = 0.0
+
+    def is_cold(self, latency):
+        """Classify a call latency as a cold start"""
+        threshold = self.cold_min_seconds
+        if self.warm_latency is not None:
+            threshold = max(threshold, self.cold_factor * self.warm_latency)
+        return latency >= threshold
+
+    def record(self, latency, started=None, probe=False):
+        """Record one successful upstream call (probe=True for the scheduler's own probes)"""
+        started = time.time() - latency if started is None else started
+        with self._lock:
+            # Overlapping calls (gap <= 0) say nothing about how long the Space stays awake
+            gap = started - self.last_activity if self.last_activity is not None else None
+            if gap is not None and gap <= 0:
+                gap = None
+            cold = self.is_cold(latency)
+            if cold:
+                self.cold += 1
+                self.cold_seconds += latency - (self.warm_latency or 0.0)
+                if gap is not None:
+                    self.shortest_cold_gap = gap if self.shortest_cold_gap is None else min(self.shortest_cold_gap, gap)
+            else:
+                self.warm += 1
+                self.warm_latency = latency if self.warm_latency is None else 0.9 * self.warm_latency + 0.1 * latency
+                if gap is not None:
+                    self.longest_warm_gap = max(self.longest_warm_gap, gap)
+            self.last_activity = started + latency
+            self._adapt(cold, probe)
+            if probe:
+                self._probe_cold = cold
+        if cold:
+            logger.info(f"🥶 Upstream cold start: {latency:.1f}s")
+        return cold
+
+    def _adapt(self, cold, probe):
+        """Move the interval towards just under the learned sleep timeout
+
+        The learned idle gaps apply to any call. Without them only probes, which
+        are sent a full interval after the last activity, test the interval.
+        """
+        if self.shortest_cold_gap is not None and self.shortest_cold_gap > self.longest_warm_gap:
+            # Sleep timeout lies between the two gaps, probe safely inside it
+            target = max(self.longest_warm_gap, 0.8 * self.shortest_cold_gap)
+        elif not probe:
+            return
+        elif cold:
+            target = self.interval * 0.5
+        else:
+            # No cold start seen at this spacing yet, probe less often to save quota
+            target = self.interval * 1.25
+        self.interval = min(self.max_interval, max(self.min_interval, target))
+
+    def seconds_until_probe(self):
+        """Seconds until a probe is due (0 if it is due now)"""
+        with self._lock:
+            if self.last_activity is None:
+                return 0.0
+            return max(0.0, self.last_activity + self.interval - time.time())
+
+    def probe(self):
+        """Send one probe and classify it
+
+        probe_fn may time its upstream call itself and report it with
+        record(..., probe=True), otherwise the whole probe_fn call is timed.
+        """
+        with self._lock:
+            self._probe_cold = None
+        started = time.time()
+        try:
+            self.probe_fn()
+        except Exception as e:
+            with self._lock:
+                self.probes += 1
+                self.probe_failures += 1
+            logger.warning(f"⚠️ Keep-warm probe failed: {e}")
+            return None
+        with self._lock:
+            self.probes += 1
+            cold = self._probe_cold
+        if cold is None:
+            cold = self.record(time.time() - started, started, probe=True)
+        return cold
+
+    def maybe_probe(self):
+        """Probe only if no upstream activity happened within the interval"""
+        if self.seconds_until_probe() > 0:
+            with self._lock:
+                self.skipped += 1
+            return None
+        return self.probe()
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = self.seconds_until_probe()
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+            if self.probe() is None:
+                # Failed probes don't count as activity, back off before retrying
+                self._stop.wait(self.min_interval)
+
+    def start(self):
+        """Start the background scheduler thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="keep-warm", daemon=True)
+            self._thread.start()
+        logger.info(f"🔥 Keep-warm scheduler started (interval {self.interval:.0f}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        """Return probe, warm/cold and interval counters for metrics"""
+        with self._lock:
+            calls = self.warm + self.cold
+            return {
+                "interval_seconds": round(self.interval, 1),
+                "probes": self.probes,
+                "probe_failures": self.probe_failures,
+                "skipped": self.skipped,
+                "warm": self.warm,
+                "cold": self.cold,
+                "cold_rate": round(self.cold / calls, 4) if calls else 0.0,
+                "cold_seconds_total": round(self.cold_seconds, 1),
+                "avg_cold_cost_seconds": round(self.cold_seconds / self.cold, 2) if self.cold else None,
+                "warm_latency_ms": round(self.warm_latency * 1000, 1) if self.warm_latency is not None else None,
+                "longest_warm_gap_seconds": round(self.longest_warm_gap, 1),
+                "shortest_cold_gap_seconds": round(self.shortest_cold_gap, 1) if self.shortest_cold_gap is not None else None,
+                "running": self._thread is not None and not self._stop.is_set(),
+            }
@@ -3,6 +3,8 @@ import os
 import sys
 from io import StringIO
 
+from lambda_wsgi import handle_event, is_http_event
+
 def lambda_handler(event, context):
     """AWS Lambda handler function - Class Project Compliant (Duc Haba Only)"""
     try:
@@ -15,43 +17,19 @@ def lambda_handler(event, context):
         # Import the clean Flask app
         from app import app
         
-        # Handle API Gateway events
-        if 'httpMethod' in event:
-            # Simple WSGI adapter for Lambda
-            method = event['httpMethod']
-            path = event.get('path', '/')
-            headers = event.get('headers', {})
-            query_params = event.get('queryStringParameters') or {}
-            body = event.get('body', '')
-            
-            # Create a test client for the Flask app
-            with app.test_client() as client:
-                # Handle query parameters
-                query_string = '&'.join([f"{k}={v}" for k, v in query_params.items()]) if query_params else ''
-                
-                # Make the request to Flask
-                if method == 'GET':
-                    response = client.get(path, query_string=query_string, headers=headers)
-                elif method == 'POST':
-                    content_type = headers.get('content-type', 'application/json')
-                    if 'application/json' in content_type:
-                        response = client.post(path, json=json.loads(body) if body else {}, headers=headers)
-                    else:
-                        response = client.post(path, data=body, headers=headers)
-                else:
-                    response = client.open(path, method=method, data=body, headers=headers)
-                
-                # Convert Flask response to Lambda response
-                return {
-                    'statusCode': response.status_code,
-                    'headers': {
-                        'Content-Type': response.content_type,
-                        'Access-Control-Allow-Origin': '*',
-                        'Access-Control-Allow-Headers': 'Content-Type',
-                        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS'
-                    },
-                    'body': response.get_data(as_text=True)
-                }
+        # Handle API Gateway events (REST API and HTTP API payloads)
+        if is_http_event(event):
+            # The app sets its own headers, including CORS and the quota headers
+            return handle_event(app, event, context)
+        
+        # Scheduled keep-warm event (EventBridge), probes only if the Space may be idle
+        if event.get('source') == 'aws.events':
+            from app import keep_warm
+            cold = keep_warm.maybe_probe()
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'cold': cold, 'keep_warm': keep_warm.stats()})
+            }
         
         # If not an HTTP event, return error
         return {
@@ -0,0 +1,178 @@
+"""
+API Gateway event <-> WSGI adapter
+Turns REST API (payload v1) and HTTP API (payload v2) events straight into a
+WSGI environ and calls the Flask app like any WSGI server would. The raw
+body is passed through untouched (base64 bodies are decoded once), repeated
+headers and query parameters survive, and the app's own status and headers
+are returned as-is, including several Set-Cookie headers. Binary responses
+(chart PNGs) are base64 encoded, text responses are returned as text.
+"""
+
+import base64
+import io
+import sys
+from urllib.parse import unquote_to_bytes, urlencode
+
+# Response types that can be returned to API Gateway as text
+TEXT_MIMETYPES = ('application/json', 'application/x-ndjson', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+
+def is_http_event(event):
+    """True for API Gateway REST (v1) and HTTP API (v2) proxy events"""
+    return 'httpMethod' in event or 'http' in (event.get('requestContext') or {})
+
+
+def _wsgi_str(value):
+    """Encode text the way PEP 3333 wants it in the environ (bytes as latin-1)"""
+    return value.encode('utf-8').decode('latin-1')
+
+
+def _event_body(event):
+    body = event.get('body') or b''
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    return body.encode('utf-8') if isinstance(body, str) else body
+
+
+def _v1_request(event):
+    """(method, path, query string, [(header, value)], source ip) of a REST API event"""
+    headers = []
+    multi_headers = event.get('multiValueHeaders') or {}
+    for name, values in multi_headers.items():
+        headers.extend((name, value) for value in values or ())
+    for name, value in (event.get('headers') or {}).items():
+        if name not in multi_headers and value is not None:
+            headers.append((name, value))
+
+    params = event.get('multiValueQueryStringParameters')
+    if params:
+        query = urlencode([(name, value) for name, values in params.items() for value in values or ()])
+    else:
+        query = urlencode(event.get('queryStringParameters') or {})
+
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    # REST API hands over the path already decoded
+    return event['httpMethod'], _wsgi_str(event.get('path') or '/'), query, headers, identity.get('sourceIp')
+
+
+def _v2_request(event):
+    """(method, path, query string, [(header, value)], source ip) of an HTTP API event"""
+    http = event['requestContext']['http']
+    # HTTP API joins repeated headers with commas and moves cookies into their own list
+    headers = list((event.get('headers') or {}).items())
+    if event.get('cookies'):
+        headers.append(('cookie', '; '.join(event['cookies'])))
+    path = unquote_to_bytes(event.get('rawPath') or http.get('path') or '/').decode('latin-1')
+    return http['method'], path, event.get('rawQueryString', ''), headers, http.get('sourceIp')
+
+
+def build_environ(event, context=None):
+    """WSGI environ for an API Gateway proxy event"""
+    v2 = 'httpMethod' not in event
+    method, path, query, headers, source_ip = (_v2_request if v2 else _v1_request)(event)
+    body = _event_body(event)
+
+    environ = {
+        'REQUEST_METHOD': method.upper(),
+        'SCRIPT_NAME': '',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'lambda',
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': source_ip or '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'lambda.event': event,
+        'lambda.context': context,
+    }
+    for name, value in headers:
+        key = name.upper().replace('-', '_')
+        if key == 'CONTENT_LENGTH':
+            continue  # the decoded body's length is what the app will read
+        if key != 'CONTENT_TYPE':
+            key = 'HTTP_' + key
+        value = _wsgi_str(str(value))
+        if key in environ:
+            environ[key] += ('; ' if key == 'HTTP_COOKIE' else ', ') + value
+        else:
+            environ[key] = value
+
+    host = environ.get('HTTP_HOST')
+    if host:
+        environ['SERVER_NAME'] = host.split(':')[0]
+    environ['SERVER_PORT'] = environ.get('HTTP_X_FORWARDED_PORT', environ['SERVER_PORT'])
+    environ['wsgi.url_scheme'] = environ.get('HTTP_X_FORWARDED_PROTO', environ['wsgi.url_scheme'])
+    return environ
+
+
+def call_app(app, environ):
+    """Run a WSGI app, returns (status code, [(header, value)], body bytes)"""
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response['status'], response['headers'] = status, headers
+        return lambda data: chunks.append(data)
+
+    chunks = []
+    result = app(environ, start_response)
+    try:
+        chunks.extend(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(response['status'].split(' ', 1)[0]), response['headers'], b''.join(chunks)
+
+
+def _is_text(headers):
+    content_type, encoded = '', False
+    for name, value in headers:
+        lowered = name.lower()
+        if lowered == 'content-type':
+            content_type = value.split(';')[0].strip().lower()
+        elif lowered == 'content-encoding':
+            encoded = True
+    return not encoded and (content_type.startswith('text/') or content_type in TEXT_MIMETYPES)
+
+
+def build_response(event, status, headers, body):
+    """API Gateway proxy response in the event's payload format"""
+    if _is_text(headers):
+        try:
+            text, base64_encoded = body.decode('utf-8'), False
+        except UnicodeDecodeError:
+            text, base64_encoded = base64.b64encode(body).decode('ascii'), True
+    else:
+        text, base64_encoded = base64.b64encode(body).decode('ascii'), True
+    response = {'statusCode': status, 'body': text, 'isBase64Encoded': base64_encoded}
+
+    if 'httpMethod' in event:
+        multi_headers = {}
+        for name, value in headers:
+            multi_headers.setdefault(name, []).append(value)
+        response['multiValueHeaders'] = multi_headers
+    else:
+        single_headers, cookies = {}, []
+        for name, value in headers:
+            if name.lower() == 'set-cookie':
+                cookies.append(value)
+            elif name in single_headers:
+                single_headers[name] += ', ' + value
+            else:
+                single_headers[name] = value
+        response['headers'] = single_headers
+        if cookies:
+            response['cookies'] = cookies
+    return response
+
+
+def handle_event(app, event, context=None):
+    """Serve one API Gateway proxy event with a WSGI app"""
+    status, headers, body = call_app(app, build_environ(event, context))
+    return build_response(event, status, headers, body)
@@ -0,0 +1,118 @@
+"""
+Long-document support for the 5000-character upstream limit
+Text is segmented on paragraph and sentence boundaries into overlapping
+chunks, and per-chunk analyses are aggregated into one document result
+"""
+
+import re
+
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]*(?:[.!?]+[\"')\]]*|\n|$)")
+
+
+def split_sentences(text):
+    """Return (start, end) offsets of the sentences and paragraph lines in text"""
+    spans = []
+    for match in SENTENCE_PATTERN.finditer(text):
+        start, end = match.span()
+        # Trim surrounding whitespace but keep offsets into the original text
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if end > start:
+            spans.append((start, end))
+    return spans
+
+
+def _split_long_span(text, start, end, max_chars):
+    """Hard-split a single over-long sentence at whitespace"""
+    spans = []
+    while end - start > max_chars:
+        cut = text.rfind(" ", start, start + max_chars)
+        if cut <= start:
+            cut = start + max_chars
+        spans.append((start, cut))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if end > start:
+        spans.append((start, end))
+    return spans
+
+
+def chunk_text(text, max_chars=4500, overlap_chars=300):
+    """Split text into overlapping chunks of at most max_chars
+
+    Returns a list of (start, end) offsets. Consecutive chunks share up to
+    overlap_chars worth of whole sentences so content spanning a boundary
+    is still seen in context.
+    """
+    sentences = []
+    for start, end in split_sentences(text):
+        sentences.extend(_split_long_span(text, start, end, max_chars))
+    if not sentences:
+        return []
+
+    chunks = []
+    first = 0
+    while first < len(sentences):
+        last = first
+        while last + 1 < len(sentences) and sentences[last + 1][1] - sentences[first][0] <= max_chars:
+            last += 1
+        chunks.append((sentences[first][0], sentences[last][1]))
+        if last + 1 >= len(sentences):
+            break
+        # Start the next chunk a few sentences back to create the overlap
+        next_first = last + 1
+        while next_first - 1 > first and sentences[last][1] - sentences[next_first - 1][0] <= overlap_chars:
+            next_first -= 1
+        first = next_first
+    return chunks
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def worst_chunk(chunk_analyses):
+    """The ((start, end), analysis) pair with the highest max_value, or None"""
+    usable = [(span, analysis) for span, analysis in chunk_analyses if isinstance(analysis, dict)]
+    if not usable:
+        return None
+    return max(usable, key=lambda pair: pair[1].get("max_value", 0) if _is_number(pair[1].get("max_value")) else 0)
+
+
+def aggregate_analyses(chunk_analyses, safer_value):
+    """Combine per-chunk analyses into one document-level analysis
+
+    chunk_analyses is a list of ((start, end), analysis) pairs. Numeric
+    fields take the maximum over chunks, flags are OR-ed, and other fields
+    (such as max_key) come from the chunk with the highest max_value.
+    Returns (analysis, offending) where offending lists the chunks that
+    reached the safer threshold or raised a flag.
+    """
+    usable = [(span, analysis) for span, analysis in chunk_analyses if isinstance(analysis, dict)]
+    if not usable:
+        return None, []
+
+    aggregated = dict(worst_chunk(usable)[1])
+    offending = []
+    for span, analysis in usable:
+        for key, value in analysis.items():
+            current = aggregated.get(key)
+            if isinstance(value, bool):
+                aggregated[key] = bool(current) or value
+            elif _is_number(value) and _is_number(current):
+                aggregated[key] = max(current, value)
+        max_value = analysis.get("max_value", 0)
+        flagged = any(value is True for value in analysis.values())
+        if flagged or (_is_number(max_value) and max_value >= safer_value):
+            offending.append({
+                "start": span[0],
+                "end": span[1],
+                "max_key": analysis.get("max_key"),
+                "max_value": max_value,
+            })
+
+    offending.sort(key=lambda chunk: chunk["max_value"] if _is_number(chunk["max_value"]) else 0, reverse=True)
+    return aggregated, offending
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the duchaba/Friendly_Text_Moderation Space
+
+Implements the /fetch_toxicity_level contract closely enough for both
+gradio_client.Client and the app's direct transport: /config, /info,
+/api/predict/ and /run/predict, returning the same (chart, json) pair as the
+real Space. Latency, errors, sleep/cold starts and queue saturation are
+configurable so load tests and benchmarks run offline and reproducibly:
+
+    python mock_space.py --port 7860 --latency-median 0.8 --error-rate 0.02 --sleep-after 300
+    UPSTREAM_SPACE=http://127.0.0.1:7860 python app.py
+    python benchmark_transport.py --space http://127.0.0.1:7860
+
+Scores come from a small keyword model, so the same text always gets the
+same result. Request text is never logged.
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import random
+import re
+import struct
+import threading
+import time
+import zlib
+
+from flask import Flask, jsonify, request
+
+CATEGORIES = [
+    "harassment", "harassment_threatening", "hate", "hate_threatening",
+    "self_harm", "self_harm_instructions", "self_harm_intent",
+    "sexual", "sexual_minors", "violence", "violence_graphic",
+]
+
+KEYWORDS = {
+    "harassment": ["stupid", "idiot", "loser", "dumb", "shut up", "ugly", "pathetic"],
+    "harassment_threatening": ["watch your back", "i will find you", "you'll regret"],
+    "hate": ["hate", "disgusting people", "go back to", "subhuman"],
+    "hate_threatening": ["exterminate", "wipe them out"],
+    "self_harm": ["hurt myself", "self harm", "cut myself"],
+    "self_harm_instructions": ["how to overdose"],
+    "self_harm_intent": ["want to die", "end my life"],
+    "sexual": ["sexy", "nude", "explicit"],
+    "sexual_minors": [],
+    "violence": ["kill", "punch", "attack", "shoot", "beat you"],
+    "violence_graphic": ["blood everywhere", "gore"],
+}
+
+CONFIG = {
+    "version": "3.50.2",
+    "mode": "interface",
+    "title": "Friendly Text Moderation (mock)",
+    "enable_queue": False,
+    "components": [
+        {"id": 1, "type": "textbox", "props": {"label": "msg"}, "serializer": "StringSerializable"},
+        {"id": 2, "type": "slider", "props": {"label": "safer", "minimum": 0.005, "maximum": 0.1, "value": 0.02}, "serializer": "NumberSerializable"},
+        {"id": 3, "type": "plot", "props": {"label": "chart"}, "serializer": "SimpleSerializable"},
+        {"id": 4, "type": "textbox", "props": {"label": "json"}, "serializer": "StringSerializable"},
+    ],
+    "dependencies": [
+        {"targets": [5], "trigger": "click", "inputs": [1, 2], "outputs": [3, 4], "backend_fn": True,
+         "api_name": "fetch_toxicity_level", "queue": False, "js": None},
+    ],
+}
+
+INFO = {
+    "named_endpoints": {
+        "/fetch_toxicity_level": {
+            "parameters": [
+                {"label": "msg", "parameter_name": "msg", "type": {"type": "string"},
+                 "python_type": {"type": "str", "description": ""}, "component": "Textbox",
+                 "example_input": "Hello!!", "serializer": "StringSerializable"},
+                {"label": "safer", "parameter_name": "safer", "type": {"type": "number"},
+                 "python_type": {"type": "float", "description": "numeric value between 0.005 and 0.1"},
+                 "component": "Slider", "example_input": 0.02, "serializer": "NumberSerializable"},
+            ],
+            "returns": [
+                {"label": "chart", "type": {"type": "object"}, "python_type": {"type": "Dict[Any, Any]", "description": ""},
+                 "component": "Plot", "serializer": "SimpleSerializable"},
+                {"label": "json", "type": {"type": "string"}, "python_type": {"type": "str", "description": ""},
+                 "component": "Textbox", "serializer": "StringSerializable"},
+            ],
+        }
+    },
+    "unnamed_endpoints": {},
+}
+
+
+def score_text(text):
+    """Deterministic category scores for text"""
+    lowered = text.lower()
+    seed = int(hashlib.sha256(lowered.encode("utf-8")).hexdigest()[:8], 16)
+    noise = random.Random(seed)
+    scores = {}
+    for category in CATEGORIES:
+        hits = sum(lowered.count(word) for word in KEYWORDS[category])
+        base = 1 - 0.35 ** hits if hits else 0.0
+        scores[category] = round(min(0.99, base * 0.9 + noise.uniform(1e-6, 2e-3)), 6)
+    # Shouting and repeated punctuation nudge harassment up a little
+    if re.search(r"[A-Z]{5,}|!!!", text):
+        scores["harassment"] = round(min(0.99, scores["harassment"] + 0.03), 6)
+    return scores
+
+
+def _png(width, height, rows):
+    """Encode RGB rows (bytes per row) as a PNG file"""
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body) & 0xffffffff)
+    raw = b"".join(b"\x00" + row for row in rows)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_chart(scores, safer_value):
+    """Horizontal bar chart of the scores with the safer threshold marked"""
+    width, bar, gap = 400, 18, 6
+    height = len(CATEGORIES) * (bar + gap) + gap
+    threshold_x = int(min(1.0, safer_value * 10) * (width - 1))
+    rows = []
+    for category in CATEGORIES:
+        length = int(min(1.0, scores[category]) * (width - 1))
+        color = b"\xd9\x53\x4f" if scores[category] >= safer_value else b"\x5b\xc0\xde"
+        bar_row = bytearray(color * length + b"\xff\xff\xff" * (width - length))
+        bar_row[threshold_x * 3:threshold_x * 3 + 3] = b"\x33\x33\x33"
+        blank = bytearray(b"\xff\xff\xff" * width)
+        blank[threshold_x * 3:threshold_x * 3 + 3] = b"\x33\x33\x33"
+        rows.extend([bytes(blank)] * gap)
+        rows.extend([bytes(bar_row)] * bar)
+    rows.extend([bytes(blank)] * (height - len(rows)))
+    return "data:image/png;base64," + base64.b64encode(_png(width, height, rows)).decode("ascii")
+
+
+def fetch_toxicity_level(text, safer_value):
+    """Return the (chart, json) pair the real endpoint produces"""
+    scores = score_text(text)
+    max_key = max(scores, key=scores.get)
+    analysis = dict(scores)
+    analysis.update({
+        "max_key": max_key,
+        "max_value": scores[max_key],
+        "sum_value": round(sum(scores.values()), 6),
+        "is_safer_flagged": scores[max_key] >= safer_value,
+        "is_flagged": scores[max_key] > 0.5,
+        "safer_value": safer_value,
+    })
+    chart = {"type": "matplotlib", "plot": render_chart(scores, safer_value)}
+    return chart, json.dumps(analysis)
+
+
+class SpaceBehaviour:
+    """Latency, errors, sleep and queue state shared by all requests"""
+
+    def __init__(self, latency_median=0.8, latency_sigma=0.4, error_rate=0.0, sleep_after=0,
+                 cold_start=8.0, concurrency=4, max_queue=32, seed=None):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.sleep_after = sleep_after
+        self.cold_start = cold_start
+        self.max_queue = max_queue
+        self.random = random.Random(seed)
+        self.slots = threading.Semaphore(concurrency)
+        self.lock = threading.Lock()
+        self.waiting = 0
+        self.last_request = None
+        self.waking_until = 0.0
+        self.stats = {"requests": 0, "errors": 0, "rejected": 0, "cold_starts": 0, "peak_waiting": 0}
+
+    def wake(self):
+        """Block for the cold start if the Space went to sleep"""
+        now = time.time()
+        with self.lock:
+            asleep = self.sleep_after and (self.last_request is None or now - self.last_request > self.sleep_after)
+            if asleep and now >= self.waking_until:
+                self.waking_until = now + self.cold_start
+                self.stats["cold_starts"] += 1
+            delay = max(0.0, self.waking_until - now)
+            self.last_request = now + delay
+        if delay:
+            time.sleep(delay)
+
+    def touch(self):
+        """Count the end of a request as activity too"""
+        with self.lock:
+            self.last_request = max(self.last_request or 0.0, time.time())
+
+    def latency(self):
+        with self.lock:
+            return self.random.lognormvariate(0, self.latency_sigma) * self.latency_median
+
+    def fail(self):
+        with self.lock:
+            return self.random.random() < self.error_rate
+
+
+def create_app(behaviour):
+    app = Flask(__name__)
+
+    @app.before_request
+    def wake_up():
+        behaviour.wake()
+
+    @app.after_request
+    def keep_awake(response):
+        behaviour.touch()
+        return response
+
+    @app.route("/config")
+    def config():
+        return jsonify(CONFIG)
+
+    @app.route("/info")
+    def info():
+        return jsonify(INFO)
+
+    @app.route("/mock/stats")
+    def stats():
+        return jsonify(behaviour.stats)
+
+    @app.route("/run/predict", methods=["POST"])
+    @app.route("/api/predict/", methods=["POST"])
+    @app.route("/api/predict", methods=["POST"])
+    def predict():
+        body = request.get_json(force=True, silent=True)
+        # gradio_client 0.8 posts the payload as a JSON-encoded string
+        if isinstance(body, str):
+            body = json.loads(body)
+        if not isinstance(body, dict) or body.get("fn_index", 0) != 0:
+            return jsonify({"error": "Invalid fn_index"}), 422
+        data = body.get("data") or []
+        if len(data) != 2 or not isinstance(data[0], str):
+            return jsonify({"error": "Expected 2 arguments (msg, safer)"}), 422
+
+        with behaviour.lock:
+            behaviour.stats["requests"] += 1
+            if behaviour.waiting >= behaviour.max_queue:
+                behaviour.stats["rejected"] += 1
+                return jsonify({"error": "Space is at capacity (503), please try again later"}), 503
+            behaviour.waiting += 1
+            behaviour.stats["peak_waiting"] = max(behaviour.stats["peak_waiting"], behaviour.waiting)
+        try:
+            with behaviour.slots:
+                time.sleep(behaviour.latency())
+                if behaviour.fail():
+                    with behaviour.lock:
+                        behaviour.stats["errors"] += 1
+                    return jsonify({"error": "Internal error in fetch_toxicity_level"}), 500
+                chart, analysis = fetch_toxicity_level(data[0], float(data[1]))
+        finally:
+            with behaviour.lock:
+                behaviour.waiting -= 1
+        return jsonify({"data": [chart, analysis], "is_generating": False, "duration": 0.0, "average_duration": 0.0})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local mock of the Duc Haba moderation Space")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7860)
+    parser.add_argument("--latency-median", type=float, default=0.8, help="Median predict latency in seconds (default 0.8)")
+    parser.add_argument("--latency-sigma", type=float, default=0.4, help="Log-normal spread of the latency (default 0.4)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of predicts that fail (default 0)")
+    parser.add_argument("--sleep-after", type=float, default=0, help="Idle seconds before the Space sleeps (default 0, never)")
+    parser.add_argument("--cold-start", type=float, default=8.0, help="Seconds to wake from sleep (default 8)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Predicts served at once (default 4)")
+    parser.add_argument("--max-queue", type=int, default=32, help="Waiting predicts before new ones get 503 (default 32)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducible runs")
+    args = parser.parse_args()
+
+    behaviour = SpaceBehaviour(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        sleep_after=args.sleep_after,
+        cold_start=args.cold_start,
+        concurrency=args.concurrency,
+        max_queue=args.max_queue,
+        seed=args.seed,
+    )
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    print(f"🧪 Mock Space on http://{args.host}:{args.port} (stats at /mock/stats)")
+    create_app(behaviour).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Persistent on-disk result cache backed by SQLite in WAL mode
+Used as an optional second tier under ResultCache so cached results survive
+Lambda cold starts and worker restarts. Like the in-memory tier it only
+stores hashed keys, never the analyzed text.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Refresh access times at most this often to keep reads mostly write-free
+ACCESS_UPDATE_INTERVAL = 60
+
+
+class PersistentCache:
+    """SQLite-backed key/value store with TTL and size-based LRU eviction"""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, ttl=86400):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self.errors = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)")
+            # Running total of entry sizes, kept by triggers so eviction never has to sum the table
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute(
+                "INSERT OR IGNORE INTO meta (name, value)"
+                " SELECT 'total_size', COALESCE(SUM(size), 0) FROM entries"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN"
+                " UPDATE meta SET value = value + NEW.size WHERE name = 'total_size'; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size ON entries BEGIN"
+                " UPDATE meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size'; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN"
+                " UPDATE meta SET value = value - OLD.size WHERE name = 'total_size'; END"
+            )
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        """Return the stored value for key, or None if missing or expired"""
+        now = time.time()
+        try:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, accessed_at = row
+            if expires_at <= now:
+                with self._write_lock:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            if now - accessed_at > ACCESS_UPDATE_INTERVAL:
+                with self._write_lock:
+                    conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+        except (sqlite3.Error, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Persistent cache read failed: {e}")
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Store value under key and evict old entries beyond the size limit"""
+        now = time.time()
+        try:
+            payload = json.dumps(value, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"⚠️ Value not cacheable on disk: {e}")
+            return False
+        size = len(payload)
+        if size > self.max_bytes:
+            return False
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        try:
+            conn = self._connection()
+            with self._write_lock:
+                # One transaction per write so a crash never leaves a partial entry
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    # UPDATE, then INSERT if the key is new: INSERT OR REPLACE would skip the size
+                    # triggers, and ON CONFLICT needs SQLite 3.24 (Amazon Linux 2 ships 3.7)
+                    updated = conn.execute(
+                        "UPDATE entries SET value = ?, size = ?, expires_at = ?, accessed_at = ? WHERE key = ?",
+                        (payload, size, expires_at, now, key)
+                    ).rowcount
+                    if not updated:
+                        conn.execute(
+                            "INSERT INTO entries (key, value, size, expires_at, accessed_at)"
+                            " VALUES (?, ?, ?, ?, ?)",
+                            (key, payload, size, expires_at, now)
+                        )
+                    conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+                    self._evict(conn)
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+            return True
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Persistent cache write failed: {e}")
+            return False
+
+    def _evict(self, conn):
+        """Delete least recently used entries until the total size fits"""
+        total = conn.execute("SELECT value FROM meta WHERE name = 'total_size'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def delete(self, key):
+        """Remove a single entry"""
+        try:
+            with self._write_lock:
+                self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"⚠️ Persistent cache delete failed: {e}")
+
+    def stats(self):
+        """Return size counters for metrics"""
+        try:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), (SELECT value FROM meta WHERE name = 'total_size') FROM entries"
+            ).fetchone()
+        except sqlite3.Error:
+            entries, total = None, None
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "errors": self.errors,
+        }
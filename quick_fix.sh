@@ -34,9 +34,9 @@ echo "==========================================="
 echo "✅ Setup and tests complete!"
 echo ""
 echo "To run the improved app with fallback:"
-echo "  python backend/app_with_fallback.py"
+echo "  python -m backend.app_with_fallback"
 echo ""
 echo "To run the original app:"
-echo "  python backend/app.py"
+echo "  python -m backend.app"
 echo ""
 echo "Then visit: http://localhost:8000"
@@ -0,0 +1,102 @@
+"""
+Cost-based quota accounting
+Requests are charged in abstract cost units instead of counting them: one
+unit per fresh upstream call plus a share for text length, scaled by how
+expensive the backend is, while cache hits cost almost nothing. API keys map
+to tiers with their own budgets; keys are configured and compared as
+SHA-256 digests so the raw keys never need to be kept anywhere.
+"""
+
+import hashlib
+import json
+
+# Relative cost of one call per backend (the upstream Space is the reference)
+BACKEND_WEIGHTS = {
+    "upstream": 1.0,
+    "hf-api": 1.0,
+    "local": 0.25,
+    "rule-based": 0.05,
+}
+
+
+class CostModel:
+    """Turn text length, call counts, backend and cache hits into cost units"""
+
+    def __init__(self, chars_per_unit=1000, cache_hit_cost=0.1, backend_weights=None):
+        self.chars_per_unit = chars_per_unit
+        self.cache_hit_cost = cache_hit_cost
+        self.backend_weights = dict(BACKEND_WEIGHTS, **(backend_weights or {}))
+
+    def cost(self, text_length, calls=1, cached_calls=0, backend="upstream"):
+        """Cost of analyzing text_length characters in calls lookups, cached_calls of them cache hits"""
+        calls = max(1, calls)
+        cached_calls = min(max(0, cached_calls), calls)
+        fresh = calls - cached_calls
+        weight = self.backend_weights.get(backend, 1.0)
+        fresh_chars = text_length * fresh / calls
+        total = weight * (fresh + fresh_chars / self.chars_per_unit) + self.cache_hit_cost * cached_calls
+        return round(max(self.cache_hit_cost, total), 2)
+
+
+def key_digest(api_key):
+    """SHA-256 hex digest under which an API key is configured"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class QuotaTiers:
+    """Per-API-key tiers, each with its own budget per window
+
+    tiers: {"pro": {"limit": 500, "window": 3600}, ...}
+    api_keys: {"<sha256 of key>": "pro", ...}
+    Callers without a (known) key get the default tier.
+    """
+
+    def __init__(self, tiers, api_keys, default_tier="anonymous"):
+        self.tiers = tiers
+        self.default_tier = default_tier
+        unknown = set(api_keys.values()) - set(tiers)
+        if unknown:
+            raise ValueError(f"API keys refer to undefined tiers: {', '.join(sorted(unknown))}")
+        self.api_keys = {digest.lower(): tier for digest, tier in api_keys.items()}
+
+    @classmethod
+    def from_json(cls, tiers_json, api_keys_json, default_tier, default_limit, default_window):
+        """Build tiers from the QUOTA_TIERS / API_KEYS JSON settings"""
+        tiers = json.loads(tiers_json) if tiers_json else {}
+        tiers.setdefault(default_tier, {})
+        for settings in tiers.values():
+            settings.setdefault("limit", default_limit)
+            settings.setdefault("window", default_window)
+        return cls(tiers, json.loads(api_keys_json) if api_keys_json else {}, default_tier)
+
+    def resolve(self, api_key):
+        """Return (tier name, limiter key suffix or None) for a request's API key"""
+        if api_key:
+            digest = key_digest(api_key)
+            tier = self.api_keys.get(digest)
+            if tier is not None:
+                return tier, f"key:{digest[:24]}"
+        return self.default_tier, None
+
+
+class QuotaExceeded(Exception):
+    """Raised when a request's items cost more than the budget reserved for it"""
+
+
+class Budget:
+    """Spend a reservation made up front item by item"""
+
+    def __init__(self, total):
+        self.total = total
+        self.spent = 0.0
+
+    def spend(self, cost):
+        """Take cost from the budget, returning False if it doesn't fit"""
+        if self.spent + cost > self.total + 1e-9:
+            return False
+        self.spent = round(self.spent + cost, 2)
+        return True
+
+    def adjust(self, estimated, actual):
+        """Correct an earlier estimate once the actual cost is known"""
+        self.spent = round(self.spent + actual - estimated, 2)
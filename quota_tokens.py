@@ -0,0 +1,159 @@
+"""
+Stateless HMAC-signed rate-limit tokens
+Lambda containers share no memory, and a network store on every request
+adds latency. Instead the remaining budget travels with the client: each
+response carries a signed token (client hash, window, remaining units,
+nonce) and the next request echoes it back. Any container holding the
+secret can verify and decrement it locally. Each container remembers the
+nonces it has already accepted, so reusing a token against it is caught.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+TOKEN_VERSION = "1"
+
+# allowed, units left, seconds until the call would be allowed (0 when allowed),
+# seconds until the budget is full again, window the replacement token belongs to
+QuotaDecision = namedtuple("QuotaDecision", "allowed remaining retry_after reset window")
+
+
+class InvalidQuotaToken(Exception):
+    """Raised for tokens that are malformed, forged or issued to another client"""
+
+
+class ReplayGuard:
+    """Bounded set of spent nonces, each kept until its token's window has ended"""
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()  # nonce -> expires_at, in insertion order
+        self.replays = 0
+
+    def check_and_add(self, nonce, expires_at):
+        """Record nonce, returning False if it was already spent"""
+        now = time.time()
+        with self._lock:
+            # Expiry order roughly follows insertion order, so only the front needs checking
+            while self._seen and next(iter(self._seen.values())) <= now:
+                self._seen.popitem(last=False)
+            if nonce in self._seen:
+                self.replays += 1
+                return False
+            self._seen[nonce] = expires_at
+            if len(self._seen) > self.max_entries:
+                self._seen.popitem(last=False)
+            return True
+
+    def __len__(self):
+        return len(self._seen)
+
+
+def _b64(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class QuotaTokens:
+    """Issue and spend signed quota tokens for a fixed-window limit"""
+
+    def __init__(self, secret, limit=20, window=3600, replay_entries=100000):
+        if not secret:
+            raise ValueError("A secret is required to sign quota tokens")
+        self._key = secret.encode("utf-8") if isinstance(secret, str) else secret
+        self.limit = limit
+        self.window = window
+        self.replay_guard = ReplayGuard(replay_entries)
+        self._stats_lock = threading.Lock()
+        self.issued = 0
+        self.spent = 0
+        self.exhausted = 0
+        self.invalid = 0
+
+    def _client(self, client_id):
+        return hashlib.sha256(str(client_id).encode("utf-8")).hexdigest()[:16]
+
+    def _sign(self, payload):
+        return _b64(hmac.new(self._key, payload.encode("ascii"), hashlib.sha256).digest()[:16])
+
+    def issue(self, client_id, remaining, window_index=None):
+        """Return a new token granting remaining units in the given (or current) window"""
+        if window_index is None:
+            window_index = int(time.time() // self.window)
+        payload = ".".join([
+            TOKEN_VERSION,
+            self._client(client_id),
+            str(window_index),
+            # Hundredths of a unit, so fractional costs survive the round trip
+            str(max(0, int(round(remaining * 100)))),
+            _b64(os.urandom(9)),
+        ])
+        with self._stats_lock:
+            self.issued += 1
+        return f"{payload}.{self._sign(payload)}"
+
+    def _verify(self, token, client_id):
+        """Return (window_index, remaining, nonce) of a genuine token for client_id"""
+        payload, _, signature = token.rpartition(".")
+        if not hmac.compare_digest(signature, self._sign(payload)):
+            raise InvalidQuotaToken("Bad signature")
+        try:
+            version, client, window_index, remaining, nonce = payload.split(".")
+            window_index, remaining = int(window_index), int(remaining) / 100
+        except ValueError:
+            raise InvalidQuotaToken("Malformed token")
+        if version != TOKEN_VERSION or client != self._client(client_id):
+            raise InvalidQuotaToken("Token was issued to another client")
+        return window_index, remaining, nonce
+
+    def spend(self, token, client_id, cost=1):
+        """Charge cost units against token and return a QuotaDecision
+
+        The token is used up either way; issue() a replacement for the
+        decision's remaining units and window. Raises InvalidQuotaToken for
+        forged, foreign or already spent tokens.
+        """
+        now = time.time()
+        current = int(now // self.window)
+        try:
+            window_index, remaining, nonce = self._verify(token, client_id)
+            if window_index > current:
+                raise InvalidQuotaToken("Token is from the future")
+            if not self.replay_guard.check_and_add(nonce, (window_index + 1) * self.window):
+                raise InvalidQuotaToken("Token was already used")
+        except InvalidQuotaToken:
+            with self._stats_lock:
+                self.invalid += 1
+            raise
+        if window_index < current:
+            # A new window started since the token was issued
+            remaining = self.limit
+        allowed = remaining >= cost
+        if allowed:
+            remaining -= cost
+        with self._stats_lock:
+            if allowed:
+                self.spent += 1
+            else:
+                self.exhausted += 1
+        reset = (current + 1) * self.window - now
+        return QuotaDecision(allowed, round(remaining, 2), 0.0 if allowed else reset, reset, current)
+
+    def stats(self):
+        """Return token counters for metrics"""
+        with self._stats_lock:
+            return {
+                "limit": self.limit,
+                "window_seconds": self.window,
+                "issued": self.issued,
+                "spent": self.spent,
+                "exhausted": self.exhausted,
+                "invalid": self.invalid,
+                "replays": self.replay_guard.replays,
+                "tracked_nonces": len(self.replay_guard),
+            }
@@ -0,0 +1,217 @@
+"""
+Memory-bounded per-client rate limiting
+Each client is tracked with a handful of numbers instead of a list of
+timestamps, so every check is O(1). Keys live in striped LRU maps with a hard
+cap; keys idle for longer than the window are dropped as they age out, which
+can't change any decision because an idle key is as good as a fresh one.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# allowed, configured limit, units left after this call, seconds until the
+# call would be allowed (0 when allowed), seconds until the budget is full again
+RateLimitResult = namedtuple("RateLimitResult", "allowed limit remaining retry_after reset")
+
+
+class SlidingWindowCounter:
+    """Fixed-window counters blended into a sliding window estimate
+
+    State: [window_start, current_count, previous_count]. The previous
+    window's count is weighted by how much of it still overlaps the sliding
+    window, which approximates a true sliding log closely without storing
+    timestamps.
+    """
+
+    name = "sliding_window"
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = float(window)
+
+    def new_state(self, now):
+        return [now - now % self.window, 0.0, 0.0]
+
+    def _roll(self, state, now):
+        start = now - now % self.window
+        if start != state[0]:
+            state[2] = state[1] if start - state[0] == self.window else 0.0
+            state[1] = 0.0
+            state[0] = start
+
+    def _used(self, state, now):
+        overlap = 1.0 - (now - state[0]) / self.window
+        return state[2] * overlap + state[1]
+
+    def _wait(self, state, now, cost):
+        """Seconds until cost more units fit"""
+        if cost > self.limit:
+            return self.window
+        elapsed = now - state[0]
+        if state[1] + cost <= self.limit and state[2] > 0:
+            # Fits in this window once enough of the previous one has slid out
+            needed = self.window * (1.0 - (self.limit - state[1] - cost) / state[2]) - elapsed
+            return max(0.0, needed)
+        # Only fits in the next window, once enough of the current one has slid out
+        into_next = self.window * (1.0 - (self.limit - cost) / state[1]) if state[1] > 0 else 0.0
+        return self.window - elapsed + max(0.0, into_next)
+
+    def consume(self, state, now, cost):
+        self._roll(state, now)
+        used = self._used(state, now)
+        if used + cost > self.limit:
+            return False, max(0.0, self.limit - used), self._wait(state, now, cost)
+        state[1] += cost
+        return True, max(0.0, self.limit - used - cost), 0.0
+
+    def refund(self, state, now, cost):
+        self._roll(state, now)
+        state[1] = max(0.0, state[1] - cost)
+
+    def reset_after(self, state, now):
+        if state[1]:
+            return 2 * self.window - (now - state[0])
+        return self.window - (now - state[0]) if state[2] else 0.0
+
+
+class TokenBucket:
+    """Token bucket holding limit tokens, refilled at limit per window
+
+    State: [tokens, updated_at]. Allows bursts up to the full limit and then
+    a steady limit/window rate.
+    """
+
+    name = "token_bucket"
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = float(window)
+        self.rate = limit / self.window
+
+    def new_state(self, now):
+        return [float(self.limit), now]
+
+    def _refill(self, state, now):
+        state[0] = min(float(self.limit), state[0] + (now - state[1]) * self.rate)
+        state[1] = now
+
+    def consume(self, state, now, cost):
+        self._refill(state, now)
+        if cost > state[0]:
+            wait = (cost - state[0]) / self.rate if cost <= self.limit else self.window
+            return False, state[0], wait
+        state[0] -= cost
+        return True, state[0], 0.0
+
+    def refund(self, state, now, cost):
+        self._refill(state, now)
+        state[0] = min(float(self.limit), state[0] + cost)
+
+    def reset_after(self, state, now):
+        return (self.limit - state[0]) / self.rate
+
+
+ALGORITHMS = {cls.name: cls for cls in (SlidingWindowCounter, TokenBucket)}
+
+
+class _Stripe:
+    """One independently locked LRU segment of the key map"""
+
+    def __init__(self, max_keys):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> [last_seen, state]
+        self.max_keys = max_keys
+        self.expired = 0
+        self.evicted = 0
+
+
+class RateLimiter:
+    """Per-key rate limiter with LRU/idle eviction and a hard cap on keys"""
+
+    def __init__(self, algorithm, max_keys=100000, stripes=16, clock=time.time):
+        self.algorithm = algorithm
+        self.max_keys = max_keys
+        self.clock = clock
+        # A key idle for a full window (two for the sliding counter) carries no history
+        self.idle_seconds = 2 * algorithm.window
+        self._stripes = [_Stripe(max(1, max_keys // stripes)) for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    @property
+    def limit(self):
+        return self.algorithm.limit
+
+    def _stripe_for(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _entry(self, stripe, key, now):
+        """Fetch (or create) the state for key and drop at most one stale key"""
+        entries = stripe.entries
+        entry = entries.get(key)
+        if entry is None:
+            entry = [now, self.algorithm.new_state(now)]
+            entries[key] = entry
+            if len(entries) > stripe.max_keys:
+                # Hard cap: forget the least recently seen client
+                entries.popitem(last=False)
+                stripe.evicted += 1
+        else:
+            entries.move_to_end(key)
+        entry[0] = now
+        oldest_key = next(iter(entries))
+        if oldest_key != key and now - entries[oldest_key][0] > self.idle_seconds:
+            del entries[oldest_key]
+            stripe.expired += 1
+        return entry
+
+    def hit(self, key, cost=1):
+        """Charge cost units to key and return a RateLimitResult"""
+        now = self.clock()
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            state = self._entry(stripe, key, now)[1]
+            allowed, remaining, retry_after = self.algorithm.consume(state, now, cost)
+            reset = self.algorithm.reset_after(state, now)
+        with self._stats_lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+        return RateLimitResult(allowed, self.limit, round(remaining, 2), retry_after, reset)
+
+    def refund(self, key, cost):
+        """Give back units charged by an earlier hit (e.g. a cheaper actual cost)"""
+        now = self.clock()
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None:
+                self.algorithm.refund(entry[1], now, cost)
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def stats(self):
+        """Return key counts and decision counters for metrics"""
+        with self._stats_lock:
+            return {
+                "algorithm": self.algorithm.name,
+                "limit": self.limit,
+                "window_seconds": self.algorithm.window,
+                "tracked_keys": len(self),
+                "max_keys": self.max_keys,
+                "allowed": self.allowed,
+                "limited": self.limited,
+                "expired_keys": sum(stripe.expired for stripe in self._stripes),
+                "evicted_keys": sum(stripe.evicted for stripe in self._stripes),
+            }
+
+
+def create_rate_limiter(algorithm="sliding_window", limit=20, window=3600, max_keys=100000):
+    """Build a RateLimiter for one of the ALGORITHMS by name"""
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Unknown rate limit algorithm {algorithm!r} (choose from {', '.join(ALGORITHMS)})")
+    return RateLimiter(ALGORITHMS[algorithm](limit, window), max_keys=max_keys)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Minimal in-memory server speaking the Redis protocol (RESP)
+
+Implements just the commands the shared rate limiter and its tests need, so
+multi-instance rate limiting can be tried without installing Redis:
+    python redis_standin.py --port 6390
+    RATE_LIMIT_BACKEND=redis RATE_LIMIT_REDIS_URL=redis://127.0.0.1:6390/0 python app.py
+Data is not persisted and there is a single keyspace (SELECT is accepted and ignored).
+"""
+
+import argparse
+import socket
+import socketserver
+import threading
+import time
+
+
+class Keyspace:
+    """Keys with optional expiry, expired lazily on access"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+        self.expires = {}
+
+    def get(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.time():
+            self.values.pop(key, None)
+            self.expires.pop(key, None)
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.expires.pop(key, None)
+        return self.values.pop(key, None) is not None
+
+
+def _format_float(value):
+    text = repr(float(value))
+    return text[:-2] if text.endswith(".0") else text
+
+
+class CommandError(Exception):
+    pass
+
+
+def execute(keyspace, command):
+    """Run one command and return its reply value"""
+    name, args = command[0].upper(), command[1:]
+    with keyspace.lock:
+        if name == "PING":
+            return ("+", args[0] if args else "PONG")
+        if name in ("AUTH", "SELECT", "FLUSHDB", "FLUSHALL"):
+            if name.startswith("FLUSH"):
+                keyspace.values.clear()
+                keyspace.expires.clear()
+            return ("+", "OK")
+        if name == "GET":
+            return keyspace.get(args[0])
+        if name == "MGET":
+            return [keyspace.get(key) for key in args]
+        if name == "SET":
+            keyspace.delete(args[0])
+            keyspace.set(args[0], args[1])
+            if len(args) >= 4 and args[2].upper() in ("EX", "PX"):
+                keyspace.expires[args[0]] = time.time() + float(args[3]) / (1 if args[2].upper() == "EX" else 1000)
+            return ("+", "OK")
+        if name in ("INCR", "DECR", "INCRBY", "DECRBY"):
+            amount = int(args[1]) if len(args) > 1 else 1
+            if name.startswith("DECR"):
+                amount = -amount
+            try:
+                value = int(keyspace.get(args[0]) or 0) + amount
+            except ValueError:
+                raise CommandError("ERR value is not an integer or out of range")
+            keyspace.set(args[0], str(value))
+            return value
+        if name == "INCRBYFLOAT":
+            try:
+                value = float(keyspace.get(args[0]) or 0) + float(args[1])
+            except ValueError:
+                raise CommandError("ERR value is not a valid float")
+            keyspace.set(args[0], _format_float(value))
+            return _format_float(value)
+        if name in ("EXPIRE", "PEXPIRE"):
+            if keyspace.get(args[0]) is None:
+                return 0
+            keyspace.expires[args[0]] = time.time() + float(args[1]) / (1 if name == "EXPIRE" else 1000)
+            return 1
+        if name in ("TTL", "PTTL"):
+            if keyspace.get(args[0]) is None:
+                return -2
+            expires = keyspace.expires.get(args[0])
+            if expires is None:
+                return -1
+            return int((expires - time.time()) * (1 if name == "TTL" else 1000))
+        if name == "DEL":
+            return sum(keyspace.delete(key) for key in args)
+        if name == "DBSIZE":
+            return len(keyspace.values)
+    raise CommandError(f"ERR unknown command '{command[0]}'")
+
+
+def encode(reply):
+    if isinstance(reply, tuple):
+        return f"{reply[0]}{reply[1]}\r\n".encode()
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, int):
+        return f":{reply}\r\n".encode()
+    if isinstance(reply, list):
+        return f"*{len(reply)}\r\n".encode() + b"".join(encode(item) for item in reply)
+    data = str(reply).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def parse_command(buffer):
+    """Split one command off the front of buffer, returning (command, rest) or (None, buffer)"""
+    if not buffer.startswith(b"*"):
+        line, sep, rest = buffer.partition(b"\r\n")
+        return (line.decode().split(), rest) if sep else (None, buffer)
+    header_end = buffer.find(b"\r\n")
+    if header_end < 0:
+        return None, buffer
+    position, args = header_end + 2, []
+    for _ in range(int(buffer[1:header_end])):
+        length_end = buffer.find(b"\r\n", position)
+        if length_end < 0:
+            return None, buffer
+        length = int(buffer[position + 1:length_end])
+        start = length_end + 2
+        if len(buffer) < start + length + 2:
+            return None, buffer
+        args.append(buffer[start:start + length].decode())
+        position = start + length + 2
+    return args, buffer[position:]
+
+
+class RESPHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buffer = b""
+        while True:
+            data = self.request.recv(65536)
+            if not data:
+                return
+            buffer += data
+            # Answer everything that arrived together (a pipeline) in one write
+            replies = []
+            while True:
+                command, buffer = parse_command(buffer)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                if command[0].upper() == "QUIT":
+                    self.request.sendall(b"".join(replies) + b"+OK\r\n")
+                    return
+                try:
+                    replies.append(encode(execute(self.server.keyspace, command)))
+                except (CommandError, IndexError, ValueError) as e:
+                    message = str(e) if isinstance(e, CommandError) else "ERR wrong number or type of arguments"
+                    replies.append(f"-{message}\r\n".encode())
+            if replies:
+                self.request.sendall(b"".join(replies))
+
+
+class RedisStandin(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, RESPHandler)
+        self.keyspace = Keyspace()
+
+    def start(self):
+        """Serve in a background thread (for tests and benchmarks)"""
+        threading.Thread(target=self.serve_forever, name="redis-standin", daemon=True).start()
+        return self
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory Redis protocol stand-in for local testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    server = RedisStandin((args.host, args.port))
+    print(f"🧪 Redis stand-in on {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+In-process result cache for Duc Haba API responses
+Entries are keyed by a SHA-256 hash of the normalized text and safer value,
+so the raw text is never kept in memory
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Normalize text so trivially different copies share a cache entry"""
+    return " ".join(text.split())
+
+
+def text_digest(text):
+    """SHA-256 hex digest of the normalized text"""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def make_cache_key(text, safer_value):
+    """Build the cache key from a hash of the normalized text and safer value"""
+    return f"{text_digest(text)}:{float(safer_value):g}"
+
+
+def make_score_key(text):
+    """Build the safer-independent key under which raw scores are cached"""
+    return f"scores:{text_digest(text)}"
+
+
+def estimate_size(value):
+    """Rough byte size of a cached value (used for the memory bound)"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return len(repr(value))
+
+
+class _Stripe:
+    """One independently locked LRU segment of the cache"""
+
+    def __init__(self, max_bytes):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+
+    def pop(self, key):
+        expires_at, size, value = self.entries.pop(key)
+        self.current_bytes -= size
+        return value
+
+
+class ResultCache:
+    """LRU + TTL cache with lock striping and a total memory bound
+
+    An optional persistent tier (see persistent_cache.PersistentCache) is
+    consulted on memory misses and written through on every set.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=3600, stripes=16, persistent=None):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.persistent = persistent
+        self._stripes = [_Stripe(max(1, max_bytes // stripes)) for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+    def _stripe_for(self, key):
+        return self._stripes[hash(key) % len(self._stripes)]
+
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def get(self, key, count=True):
+        """Return the cached value for key, or None on a miss
+
+        Internal lookups pass count=False so they don't skew hit/miss metrics.
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            if count:
+                self._count("hits")
+            return value
+        if self.persistent is not None:
+            value = self.persistent.get(key)
+            if value is not None:
+                self._set_memory(key, value)
+                if count:
+                    self._count("hits")
+                    self._count("persistent_hits")
+                return value
+        if count:
+            self._count("misses")
+        return None
+
+    def _get_memory(self, key):
+        stripe = self._stripe_for(key)
+        now = time.time()
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None and entry[0] <= now:
+                stripe.pop(key)
+                entry = None
+            if entry is not None:
+                stripe.entries.move_to_end(key)
+        return None if entry is None else entry[2]
+
+    def set(self, key, value, ttl=None):
+        """Store value under key, evicting least recently used entries if needed"""
+        stored = self._set_memory(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
+        return stored
+
+    def _set_memory(self, key, value, ttl=None):
+        stripe = self._stripe_for(key)
+        size = estimate_size(value)
+        if size > stripe.max_bytes:
+            return False
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        evicted = 0
+        with stripe.lock:
+            if key in stripe.entries:
+                stripe.pop(key)
+            while stripe.entries and stripe.current_bytes + size > stripe.max_bytes:
+                stripe.pop(next(iter(stripe.entries)))
+                evicted += 1
+            stripe.entries[key] = (expires_at, size, value)
+            stripe.current_bytes += size
+        if evicted:
+            self._count("evictions", evicted)
+        return True
+
+    def delete(self, key):
+        """Remove a single entry"""
+        stripe = self._stripe_for(key)
+        with stripe.lock:
+            if key in stripe.entries:
+                stripe.pop(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self):
+        """Drop every in-memory entry (counters and the persistent tier are kept)"""
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.entries.clear()
+                stripe.current_bytes = 0
+
+    def record_bypass(self):
+        """Count a request that skipped the cache on purpose"""
+        self._count("bypasses")
+
+    def stats(self):
+        """Return counters and current size for metrics"""
+        entries = 0
+        current_bytes = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                entries += len(stripe.entries)
+                current_bytes += stripe.current_bytes
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "bypasses": self.bypasses,
+                "entries": entries,
+                "bytes": current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+        if self.persistent is not None:
+            stats["persistent"] = self.persistent.stats()
+        return stats
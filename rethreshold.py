@@ -0,0 +1,156 @@
+"""
+Local re-thresholding of Duc Haba API results for new safer values
+The per-category scores returned by /fetch_toxicity_level should not depend
+on the safer value, only the derived flags and the echoed safer field do.
+SaferModel learns which fields behave that way from real upstream
+responses and only allows local derivation once it has seen enough
+evidence, so an upstream change in semantics falls back to real calls.
+"""
+
+import hashlib
+import json
+import threading
+
+
+def parse_analysis(json_output):
+    """Parse the JSON part of an upstream result, returns a dict or None"""
+    if isinstance(json_output, dict):
+        return json_output
+    if not json_output:
+        return None
+    try:
+        parsed = json.loads(json_output)
+    except (TypeError, ValueError):
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def chart_hash(chart_data):
+    """Stable hash of a chart payload so charts can be compared cheaply"""
+    payload = json.dumps(chart_data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _close(a, b):
+    return isinstance(a, (int, float)) and not isinstance(a, bool) and abs(a - b) < 1e-9
+
+
+class SaferModel:
+    """Learn how safer affects upstream results and derive results locally"""
+
+    def __init__(self, min_observations=20, min_pairs=3):
+        self.min_observations = min_observations
+        self.min_pairs = min_pairs
+        self._lock = threading.Lock()
+        self.observations = 0
+        self.pairs_confirmed = 0
+        self.pairs_violated = 0
+        self.echo_fields = None        # fields that always equal safer
+        self.flag_rules = {}           # bool field -> {"ge": ok, "gt": ok, "seen": set()}
+        self.unsafe_fields = set()     # fields seen changing with safer in an unexplained way
+        self.chart_depends_on_safer = False
+        self.derived = 0
+        self.fallbacks = 0
+
+    def observe(self, analysis, safer):
+        """Record one real upstream response for the given safer value"""
+        if not analysis or not isinstance(analysis.get("max_value"), (int, float)):
+            return
+        safer = float(safer)
+        max_value = analysis["max_value"]
+        with self._lock:
+            self.observations += 1
+            echoes = {key for key, value in analysis.items() if _close(value, safer)}
+            self.echo_fields = echoes if self.echo_fields is None else self.echo_fields & echoes
+
+            for key, value in analysis.items():
+                if not isinstance(value, bool):
+                    continue
+                rule = self.flag_rules.setdefault(key, {"ge": True, "gt": True, "seen": set()})
+                rule["ge"] = rule["ge"] and value == (max_value >= safer)
+                rule["gt"] = rule["gt"] and value == (max_value > safer)
+                rule["seen"].add(value)
+
+    def observe_pair(self, first, second):
+        """Compare two real results for the same text at different safer values
+
+        Each argument is a (safer, analysis, chart_hash) tuple.
+        """
+        (safer_a, analysis_a, chart_a), (safer_b, analysis_b, chart_b) = first, second
+        if not analysis_a or not analysis_b or float(safer_a) == float(safer_b):
+            return
+        with self._lock:
+            threshold_fields = self._threshold_fields()
+            echo_fields = self.echo_fields or set()
+            changed = {
+                key for key in set(analysis_a) | set(analysis_b)
+                if key not in echo_fields and analysis_a.get(key) != analysis_b.get(key)
+            }
+            unexplained = changed - threshold_fields
+            if unexplained:
+                self.unsafe_fields |= unexplained
+                self.pairs_violated += 1
+            else:
+                self.pairs_confirmed += 1
+            if chart_a != chart_b:
+                self.chart_depends_on_safer = True
+
+    def _threshold_fields(self):
+        return {
+            key for key, rule in self.flag_rules.items()
+            if (rule["ge"] or rule["gt"]) and len(rule["seen"]) == 2
+        }
+
+    def can_derive(self, include_chart=True):
+        """True once the evidence says local derivation matches the upstream"""
+        with self._lock:
+            ready = (
+                self.observations >= self.min_observations
+                and self.pairs_confirmed >= self.min_pairs
+                and not self.unsafe_fields
+                and not (include_chart and self.chart_depends_on_safer)
+            )
+            if not ready:
+                self.fallbacks += 1
+            return ready
+
+    def derive(self, analysis, safer):
+        """Return a copy of analysis re-thresholded for a new safer value"""
+        safer = float(safer)
+        derived = dict(analysis)
+        max_value = analysis.get("max_value", 0)
+        with self._lock:
+            for key in self.echo_fields or ():
+                derived[key] = safer
+            for key in self._threshold_fields():
+                rule = self.flag_rules[key]
+                derived[key] = max_value >= safer if rule["ge"] else max_value > safer
+            self.derived += 1
+        return derived
+
+    def flags_for(self, analysis, safer_values):
+        """Return flag decisions for several safer values at once"""
+        with self._lock:
+            fields = sorted(self._threshold_fields())
+        results = []
+        for safer in safer_values:
+            derived = self.derive(analysis, safer)
+            entry = {key: derived[key] for key in fields if key in derived}
+            entry["safer"] = float(safer)
+            results.append(entry)
+        return results
+
+    def stats(self):
+        """Return the learned state for metrics"""
+        with self._lock:
+            return {
+                "observations": self.observations,
+                "pairs_confirmed": self.pairs_confirmed,
+                "pairs_violated": self.pairs_violated,
+                "echo_fields": sorted(self.echo_fields or ()),
+                "threshold_fields": sorted(self._threshold_fields()),
+                "unsafe_fields": sorted(self.unsafe_fields),
+                "chart_depends_on_safer": self.chart_depends_on_safer,
+                "derived": self.derived,
+                "fallbacks": self.fallbacks,
+            }
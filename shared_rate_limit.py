@@ -0,0 +1,409 @@
+"""
+Rate-limit state shared between worker processes and instances
+Each gunicorn worker or Lambda container otherwise enforces the limit on
+its own. Counters for a sliding-window limit live in a shared store (SQLite
+for workers on one host, anything speaking the Redis protocol across hosts),
+and each worker leases a few units at a time so most requests are decided
+locally without touching the store. Clients are stored as hashes, never as
+raw IPs or keys.
+"""
+
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from rate_limiter import RateLimitResult, RateLimiter, SlidingWindowCounter
+
+logger = logging.getLogger(__name__)
+
+# Delete expired counters every this many SQLite writes
+SQLITE_SWEEP_EVERY = 1000
+
+
+class RateLimitStoreError(Exception):
+    """Raised when the shared store rejects a command"""
+
+
+class SQLiteRateLimitStore:
+    """Counters in a SQLite file shared by processes on the same host"""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            " key TEXT PRIMARY KEY,"
+            " value REAL NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self):
+        """Return this thread's SQLite connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, key, previous_key, amount, ttl):
+        """Atomically add amount to key and return (key total, previous_key total)"""
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # UPDATE, then INSERT if the key is new (ON CONFLICT needs SQLite 3.24)
+            updated = conn.execute(
+                "UPDATE counters SET value = CASE WHEN expires_at <= ? THEN ? ELSE value + ? END,"
+                " expires_at = ? WHERE key = ?",
+                (now, amount, amount, now + ttl, key),
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    "INSERT INTO counters (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, amount, now + ttl),
+                )
+            rows = dict(conn.execute(
+                "SELECT key, value FROM counters WHERE key IN (?, ?) AND expires_at > ?",
+                (key, previous_key, now),
+            ).fetchall())
+            self._writes += 1
+            if self._writes % SQLITE_SWEEP_EVERY == 0:
+                conn.execute("DELETE FROM counters WHERE expires_at <= ?", (now,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return rows.get(key, 0.0), rows.get(previous_key, 0.0)
+
+    def add(self, key, amount, ttl):
+        """Add amount (possibly negative) to a live counter"""
+        self._connection().execute(
+            "UPDATE counters SET value = MAX(0, value + ?) WHERE key = ? AND expires_at > ?",
+            (amount, key, time.time()),
+        )
+
+
+class RedisRateLimitStore:
+    """Counters in Redis (or anything speaking RESP), over one pipelined connection"""
+
+    name = "redis"
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", timeout=1.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock, self._reader = sock, sock.makefile("rb")
+        setup = ([["AUTH", self.password]] if self.password else []) + ([["SELECT", self.db]] if self.db else [])
+        if setup:
+            self._send(setup)
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._reader = None
+
+    @staticmethod
+    def _encode(command):
+        parts = [f"*{len(command)}\r\n".encode()]
+        for arg in command:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by rate limit store")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return RateLimitStoreError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2].decode()
+        if kind == b"*":
+            length = int(payload)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise RateLimitStoreError(f"Unexpected reply {line[:20]!r}")
+
+    def _send(self, commands):
+        self._sock.sendall(b"".join(self._encode(command) for command in commands))
+        # Read every reply before raising so the connection stays in sync
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RateLimitStoreError):
+                raise reply
+        return replies
+
+    def pipeline(self, commands):
+        """Send commands in one round trip and return their replies (reconnects once)"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    return self._send(commands)
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def reserve(self, key, previous_key, amount, ttl):
+        """Atomically add amount to key and return (key total, previous_key total)"""
+        total, _, previous = self.pipeline([
+            ["INCRBYFLOAT", key, amount],
+            ["PEXPIRE", key, int(ttl * 1000)],
+            ["GET", previous_key],
+        ])
+        return float(total), float(previous or 0.0)
+
+    def add(self, key, amount, ttl):
+        """Add amount (possibly negative) to a counter"""
+        self.pipeline([["INCRBYFLOAT", key, amount], ["PEXPIRE", key, int(ttl * 1000)]])
+
+
+def create_rate_limit_store(backend, sqlite_path=None, redis_url=None):
+    """Build a shared store by name ("sqlite" or "redis")"""
+    if backend == "sqlite":
+        return SQLiteRateLimitStore(sqlite_path)
+    if backend == "redis":
+        return RedisRateLimitStore(redis_url)
+    raise ValueError(f"Unknown rate limit backend {backend!r} (choose from memory, sqlite, redis)")
+
+
+def client_digest(key):
+    """Short hash under which a client is stored in the shared store"""
+    return hashlib.sha256(str(key).encode("utf-8")).hexdigest()[:24]
+
+
+class _Stripe:
+    """One independently locked LRU segment of the lease map"""
+
+    def __init__(self, max_keys):
+        self.lock = threading.Lock()
+        # key -> [last_seen, window_index, leased_units, shared_remaining, denied_until, denied_cost]
+        self.entries = OrderedDict()
+        self.max_keys = max_keys
+
+
+class SharedRateLimiter:
+    """Sliding-window rate limiter over a shared store with local quota leases
+
+    A worker takes up to lease_size units from the shared counter at once and
+    spends them locally; a lease never reserves more than the shared budget
+    has left, so the limit holds across workers. Unspent units are returned
+    when the window rolls over or the lease is evicted. Store calls are made
+    outside the stripe locks. If the store is unreachable decisions fall
+    back to a local RateLimiter.
+    """
+
+    def __init__(self, store, limit=20, window=3600, lease_size=1, max_keys=100000, stripes=16, clock=time.time):
+        self.store = store
+        self.algorithm = SlidingWindowCounter(limit, window)
+        self.window = self.algorithm.window
+        self.lease_size = max(1, lease_size)
+        self.max_keys = max_keys
+        self.clock = clock
+        self.fallback = RateLimiter(SlidingWindowCounter(limit, window), max_keys=max_keys, clock=clock)
+        self._stripes = [_Stripe(max(1, max_keys // stripes)) for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+        self._last_error_log = 0.0
+        self.allowed = 0
+        self.limited = 0
+        self.local_decisions = 0
+        self.store_calls = 0
+        self.store_errors = 0
+
+    @property
+    def limit(self):
+        return self.algorithm.limit
+
+    def _keys(self, digest, index):
+        return f"rl:{digest}:{index}", f"rl:{digest}:{index - 1}"
+
+    def _entry(self, stripe, key, now, index, handbacks):
+        """Fetch (or create) the lease for key in the current window
+
+        Unspent units of rolled-over or evicted leases are added to handbacks,
+        to be returned to the store once the stripe lock is released.
+        """
+        entries = stripe.entries
+        entry = entries.get(key)
+        if entry is None:
+            entry = [now, index, 0.0, float(self.limit), 0.0, 0.0]
+            entries[key] = entry
+            if len(entries) > stripe.max_keys:
+                self._release(*entries.popitem(last=False), index, handbacks)
+        else:
+            entries.move_to_end(key)
+            if entry[1] != index:
+                self._release(key, entry, index, handbacks)
+                entry[1:6] = [index, 0.0, float(self.limit), 0.0, 0.0]
+        entry[0] = now
+        oldest_key = next(iter(entries))
+        if oldest_key != key and now - entries[oldest_key][0] > self.window:
+            self._release(oldest_key, entries.pop(oldest_key), index, handbacks)
+        return entry
+
+    def _release(self, key, entry, index, handbacks):
+        """Queue a lease's unspent units for return while they still count in the sliding window"""
+        if entry[2] and entry[1] >= index - 1:
+            handbacks.append((self._keys(client_digest(key), entry[1])[0], -entry[2]))
+
+    def _hand_back(self, handbacks, now):
+        """Return queued lease units to the store (lost if the store is down)"""
+        for store_key, amount in handbacks:
+            try:
+                self._store_call(self.store.add, store_key, amount, 2 * self.window)
+            except (OSError, ConnectionError, sqlite3.Error, RateLimitStoreError) as e:
+                self._store_error(e, now)
+
+    def _store_call(self, method, *args):
+        with self._stats_lock:
+            self.store_calls += 1
+        return method(*args)
+
+    def _store_error(self, error, now):
+        with self._stats_lock:
+            self.store_errors += 1
+            log = now - self._last_error_log > 60
+            if log:
+                self._last_error_log = now
+        if log:
+            logger.warning(f"⚠️ Shared rate limit store unavailable, limiting locally: {error}")
+
+    def _count(self, allowed, local):
+        with self._stats_lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            if local:
+                self.local_decisions += 1
+
+    def _lease(self, key, now, index, cost, spare):
+        """Reserve cost plus up to spare units from the shared counter
+
+        Returns (granted units, shared remaining, retry_after); nothing is
+        granted when the counter can't cover cost.
+        """
+        current_key, previous_key = self._keys(client_digest(key), index)
+        amount = max(cost, spare)
+        current, previous = self._store_call(self.store.reserve, current_key, previous_key, amount, 2 * self.window)
+        state = [index * self.window, current, previous]
+        used = self.algorithm._used(state, now)
+        excess = min(amount, max(0.0, used - self.limit))
+        granted = amount - excess
+        if granted < cost:
+            # Not enough left for this call, give the partial grant back too
+            excess, granted = amount, 0.0
+        if excess:
+            self._store_call(self.store.add, current_key, -excess, 2 * self.window)
+            state[1] -= excess
+        remaining = max(0.0, self.limit - self.algorithm._used(state, now))
+        if not granted:
+            return 0.0, remaining, self.algorithm._wait(state, now, cost)
+        return granted, remaining, 0.0
+
+    def hit(self, key, cost=1):
+        """Charge cost units to key and return a RateLimitResult"""
+        now = self.clock()
+        index = int(now // self.window)
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        handbacks = []
+        result = None
+        with stripe.lock:
+            entry = self._entry(stripe, key, now, index, handbacks)
+            if entry[2] >= cost:
+                entry[2] -= cost
+                result = RateLimitResult(True, self.limit, round(entry[3] + entry[2], 2), 0.0, self.window)
+            elif entry[4] > now and cost >= entry[5]:
+                # A cheaper request than the one denied may still fit
+                result = RateLimitResult(False, self.limit, round(entry[3] + entry[2], 2), entry[4] - now, self.window)
+            spare = min(self.lease_size, entry[3])
+        self._hand_back(handbacks, now)
+        if result is not None:
+            self._count(result.allowed, True)
+            return result
+
+        try:
+            granted, remaining, retry_after = self._lease(key, now, index, cost, spare)
+        except (OSError, ConnectionError, sqlite3.Error, RateLimitStoreError) as e:
+            self._store_error(e, now)
+            return self.fallback.hit(key, cost)
+
+        handbacks = []
+        with stripe.lock:
+            entry = self._entry(stripe, key, now, index, handbacks)
+            entry[3] = remaining
+            if granted:
+                entry[2] += granted - cost
+                entry[4] = entry[5] = 0.0
+            else:
+                entry[4], entry[5] = now + retry_after, cost
+            local_remaining = entry[3] + entry[2]
+        self._hand_back(handbacks, now)
+        self._count(bool(granted), False)
+        return RateLimitResult(bool(granted), self.limit, round(local_remaining, 2), retry_after, self.window)
+
+    def refund(self, key, cost):
+        """Give back units charged by an earlier hit (kept in the local lease)"""
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        with stripe.lock:
+            entry = stripe.entries.get(key)
+            if entry is not None and entry[1] == int(self.clock() // self.window):
+                entry[2] += cost
+        self.fallback.refund(key, cost)
+
+    def __len__(self):
+        return sum(len(stripe.entries) for stripe in self._stripes)
+
+    def stats(self):
+        """Return decision, lease and store counters for metrics"""
+        with self._stats_lock:
+            decisions = self.allowed + self.limited
+            return {
+                "algorithm": self.algorithm.name,
+                "backend": self.store.name,
+                "limit": self.limit,
+                "window_seconds": self.window,
+                "lease_size": self.lease_size,
+                "tracked_keys": len(self),
+                "max_keys": self.max_keys,
+                "allowed": self.allowed,
+                "limited": self.limited,
+                "local_decision_rate": round(self.local_decisions / decisions, 4) if decisions else 0.0,
+                "store_calls": self.store_calls,
+                "store_errors": self.store_errors,
+            }
@@ -6,6 +6,8 @@ import os
 import sys
 import traceback
 
+from upstream_space import UPSTREAM_SPACE
+
 # Add the current directory to Python path
 sys.path.insert(0, '/Users/evehwang/GitHub/text-moderator-app')
 
@@ -37,7 +39,7 @@ def test_api_connection():
         from gradio_client import Client
         
         print("📡 Connecting to duchaba/Friendly_Text_Moderation...")
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         print("✅ Client created successfully")
         
         # Try to get the API info
@@ -0,0 +1,69 @@
+"""
+Single-flight coalescing for upstream moderation calls
+Concurrent callers with the same key share one in-flight call and all
+receive its result (or its exception)
+"""
+
+import threading
+
+
+class _Call:
+    """One in-flight call that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its outcome"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.requests = 0
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs) unless an identical call is already running"""
+        with self._lock:
+            self.requests += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        """Return counters for metrics"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "upstream_calls": self.executions,
+                "coalesced": self.shared,
+                "coalescing_ratio": round(self.shared / self.requests, 4) if self.requests else 0.0,
+                "in_flight": len(self._calls),
+            }
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+On-disk snapshot of the Gradio Space config and API info
+gradio_client.Client resolves the Space host, checks its runtime state and
+downloads /config and /info before the first predict. The snapshot stores
+what those calls returned so a new process can build a ready client from
+disk, then revalidates it once in the background against the live Space.
+
+sam build bundles a seed for cold Lambda containers (they start with an
+empty /tmp) through the Makefile, which runs:
+    python space_snapshot.py -o space_snapshot.json
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from upstream_space import UPSTREAM_SPACE
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+def snapshot_hash(src, config, api_info):
+    """Content hash used to detect corrupt files and upstream changes"""
+    body = json.dumps({"src": src, "config": config, "api_info": api_info}, sort_keys=True)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def _client_version():
+    try:
+        from gradio_client import __version__
+        return __version__
+    except Exception:
+        return None
+
+
+class SpaceSnapshot:
+    """Load, save and revalidate the snapshot for one Space"""
+
+    def __init__(self, path, space, seed_path=None, on_change=None, revalidate_cooldown=300.0):
+        self.path = path
+        self.space = space
+        self.seed_path = seed_path
+        self.on_change = on_change
+        self.revalidate_cooldown = revalidate_cooldown
+        self._snapshot = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._revalidating = False
+        self._last_revalidation = None
+        self.snapshot_clients = 0
+        self.fresh_clients = 0
+        self.revalidations = 0
+        self.changes = 0
+        self.errors = 0
+
+    def _read(self, path):
+        """Read and verify one snapshot file, returning None if unusable"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable Space snapshot {path}: {e}")
+            return None
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("format") != SNAPSHOT_FORMAT
+            or snapshot.get("space") != self.space
+            or snapshot.get("client_version") != _client_version()
+        ):
+            logger.info(f"🧭 Space snapshot {path} is for another Space or client version")
+            return None
+        if snapshot.get("hash") != snapshot_hash(snapshot.get("src"), snapshot.get("config"), snapshot.get("api_info")):
+            logger.warning(f"⚠️ Space snapshot {path} failed its hash check")
+            return None
+        return snapshot
+
+    def load(self):
+        """Return the current snapshot (local file first, then the bundled seed)"""
+        with self._lock:
+            if not self._loaded:
+                self._snapshot = self._read(self.path) or self._read(self.seed_path)
+                self._loaded = True
+            return self._snapshot
+
+    def save(self, src, config, api_info):
+        """Atomically write a snapshot and return its hash"""
+        digest = snapshot_hash(src, config, api_info)
+        snapshot = {
+            "format": SNAPSHOT_FORMAT,
+            "space": self.space,
+            "client_version": _client_version(),
+            "gradio_version": config.get("version") if isinstance(config, dict) else None,
+            "saved_at": time.time(),
+            "hash": digest,
+            "src": src,
+            "config": config,
+            "api_info": api_info,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write Space snapshot: {e}")
+        with self._lock:
+            self._snapshot = snapshot
+            self._loaded = True
+        return digest
+
+    def capture(self, client):
+        """Snapshot the config and API info of a fully initialized client"""
+        return self.save(client.src, client.config, client._info)
+
+    def create_client(self):
+        """Build a client from the snapshot, or from the live Space if there is none"""
+        from gradio_client import Client
+
+        snapshot = self.load()
+        if snapshot is None:
+            client = Client(self.space)
+            self.capture(client)
+            with self._lock:
+                self.fresh_clients += 1
+                self._last_revalidation = time.monotonic()
+            return client
+
+        class SnapshotClient(Client):
+            """Client whose discovery calls are answered from the snapshot"""
+
+            def _space_name_to_src(self, space):
+                return snapshot["src"]
+
+            def _get_space_state(self):
+                return None
+
+            def _get_config(self):
+                return snapshot["config"]
+
+            def _get_api_info(self):
+                return snapshot["api_info"]
+
+        client = SnapshotClient(self.space)
+        with self._lock:
+            self.snapshot_clients += 1
+        self.revalidate_async()
+        return client
+
+    def revalidate(self):
+        """Fetch the live config and API info, replacing the snapshot if they changed"""
+        from gradio_client import Client
+
+        previous = self.load()
+        try:
+            client = Client(self.space)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            logger.warning(f"⚠️ Space snapshot revalidation failed: {e}")
+            return False
+        digest = self.capture(client)
+        with self._lock:
+            self.revalidations += 1
+        if previous is not None and previous.get("hash") == digest:
+            logger.info("🧭 Space snapshot is up to date")
+            return False
+        with self._lock:
+            self.changes += 1
+        logger.info("🧭 Space config changed, snapshot replaced")
+        if self.on_change is not None:
+            self.on_change()
+        return True
+
+    def revalidate_async(self):
+        """Start a background revalidation unless one is running or ran within the cooldown
+
+        Returns True if a revalidation was started.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._revalidating or (
+                self._last_revalidation is not None and now - self._last_revalidation < self.revalidate_cooldown
+            ):
+                return False
+            self._revalidating = True
+            self._last_revalidation = now
+        threading.Thread(target=self._revalidate_in_background, name="space-snapshot", daemon=True).start()
+        return True
+
+    def _revalidate_in_background(self):
+        try:
+            self.revalidate()
+        except Exception as e:
+            logger.warning(f"⚠️ Space snapshot revalidation failed: {e}")
+        finally:
+            with self._lock:
+                self._revalidating = False
+
+    def stats(self):
+        """Return snapshot counters for metrics"""
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "loaded": snapshot is not None,
+            "hash": snapshot.get("hash") if snapshot else None,
+            "gradio_version": snapshot.get("gradio_version") if snapshot else None,
+            "age_seconds": round(time.time() - snapshot["saved_at"], 1) if snapshot else None,
+            "snapshot_clients": self.snapshot_clients,
+            "fresh_clients": self.fresh_clients,
+            "revalidations": self.revalidations,
+            "changes": self.changes,
+            "errors": self.errors,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a Space config snapshot")
+    parser.add_argument("--space", default=UPSTREAM_SPACE, help="Space id or URL (default: UPSTREAM_SPACE)")
+    parser.add_argument("-o", "--output", default="space_snapshot.json", help="Snapshot file to write")
+    args = parser.parse_args()
+
+    snapshot = SpaceSnapshot(args.output, args.space)
+    snapshot.revalidate()
+    if snapshot.errors:
+        print(f"❌ Could not fetch {args.space}")
+        return 1
+    print(f"✅ Wrote {args.output} ({snapshot.stats()['hash']})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,11 +5,13 @@ This will help us figure out the correct parameter names
 
 from gradio_client import Client
 
+from upstream_space import UPSTREAM_SPACE
+
 def test_api_parameters():
     """Test different parameter combinations to find the right one"""
     
     try:
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         print("✅ Connected to Duc Haba's API")
         
         # Let's inspect the API to see what parameters it expects
@@ -5,9 +5,11 @@ Quick test to verify the API works with the exact documentation example
 
 from gradio_client import Client
 
+from upstream_space import UPSTREAM_SPACE
+
 try:
     print("🔗 Creating client...")
-    client = Client("duchaba/Friendly_Text_Moderation")
+    client = Client(UPSTREAM_SPACE)
     
     print("📡 Testing API...")
     result = client.predict(
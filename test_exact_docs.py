@@ -4,6 +4,8 @@ Simple test using the EXACT documentation example
 
 from gradio_client import Client
 
+from upstream_space import UPSTREAM_SPACE
+
 def test_exact_documentation_example():
     """Test using the exact example from the documentation"""
     
@@ -22,7 +24,7 @@ print(result)
     ''')
     
     try:
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         print("✅ Connected to duchaba/Friendly_Text_Moderation")
         
         result = client.predict(
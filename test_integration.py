@@ -8,6 +8,8 @@ import os
 import sys
 import logging
 
+from upstream_space import UPSTREAM_SPACE
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -18,7 +20,7 @@ def test_api_direct():
         from gradio_client import Client
         
         logger.info("🔗 Creating Duc Haba client...")
-        client = Client("duchaba/Friendly_Text_Moderation")
+        client = Client(UPSTREAM_SPACE)
         logger.info("✅ Client created successfully")
         
         logger.info("📡 Testing API with documentation example...")
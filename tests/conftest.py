@@ -0,0 +1,75 @@
+"""Shared fixtures: the Flask app wired to a fake upstream Space"""
+
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+_state_dir = tempfile.mkdtemp(prefix="text-moderator-tests-")
+os.environ.setdefault("JOBS_DIR", os.path.join(_state_dir, "jobs"))
+os.environ.setdefault("SPACE_SNAPSHOT_PATH", os.path.join(_state_dir, "space_snapshot.json"))
+os.environ.setdefault("UPSTREAM_SPACE", "http://127.0.0.1:9")
+
+_addresses = itertools.count(1)
+
+
+class FakeSpace:
+    """Stands in for a gradio Client, scoring a few keywords like mock_space.py"""
+
+    calls = 0
+    delay = 0.0
+    fail = False
+    lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def predict(self, *args, msg=None, safer=0.02, api_name=None, **kwargs):
+        if args:
+            msg, safer = args[0], args[1]
+        with FakeSpace.lock:
+            FakeSpace.calls += 1
+        time.sleep(FakeSpace.delay)
+        if FakeSpace.fail:
+            raise RuntimeError("upstream down")
+        score = min(0.99, 0.3 * sum(word in msg.lower() for word in ("hate", "stupid", "kill")) + 0.001)
+        analysis = {
+            "harassment": score, "hate": score / 2, "max_key": "harassment", "max_value": score,
+            "sum_value": score * 1.5, "is_safer_flagged": score >= safer, "is_flagged": score > 0.5,
+            "safer_value": safer,
+        }
+        return {"type": "matplotlib", "plot": "data:image/png;base64,iVBORw0KGgo="}, json.dumps(analysis)
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    import app
+
+    monkeypatch.setattr(app.gradio_pool, "factory", FakeSpace)
+    monkeypatch.setattr(FakeSpace, "calls", 0)
+    monkeypatch.setattr(FakeSpace, "delay", 0.0)
+    monkeypatch.setattr(FakeSpace, "fail", False)
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def remote_addr():
+    """A fresh client address per test, so rate limits don't leak between tests"""
+    return {"REMOTE_ADDR": f"10.0.{next(_addresses) // 250}.{next(_addresses) % 250 + 1}"}
+
+
+@pytest.fixture
+def unique_text():
+    """Texts no earlier test has cached"""
+    counter = itertools.count()
+    stamp = f"{time.time_ns()}"
+    return lambda words="hello there": f"{words} {stamp}-{next(counter)}"
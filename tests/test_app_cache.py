@@ -0,0 +1,21 @@
+"""Result cache in front of the upstream for /api/analyze"""
+
+import pytest
+
+from conftest import FakeSpace
+
+
+def test_repeated_text_is_answered_from_the_cache(client, remote_addr, unique_text):
+    text = unique_text()
+    first = client.post("/api/analyze", json={"text": text, "safer": 0.05}, environ_base=remote_addr)
+    second = client.post("/api/analyze", json={"text": text, "safer": 0.05}, environ_base=remote_addr)
+    assert (first.json["cached"], second.json["cached"]) == (False, True)
+    assert FakeSpace.calls == 1
+
+
+@pytest.mark.parametrize("safer", ["abc", "0.05", None, True, [0.05]])
+def test_non_numeric_safer_is_rejected(client, remote_addr, unique_text, safer):
+    response = client.post("/api/analyze", json={"text": unique_text(), "safer": safer}, environ_base=remote_addr)
+    assert response.status_code == 400
+    assert response.json["error"] == "'safer' must be a number"
+    assert FakeSpace.calls == 0
@@ -0,0 +1,23 @@
+"""Chart delivery in analyze responses"""
+
+
+def test_charts_are_inline_by_default(client, remote_addr, unique_text):
+    response = client.post("/api/analyze", json={"text": unique_text()}, environ_base=remote_addr)
+    results = response.json["results"]
+    assert results["chart_data"]["plot"].startswith("data:image/png;base64,")
+    assert "chart_url" not in results
+
+
+def test_include_chart_false_skips_chart(client, remote_addr, unique_text):
+    response = client.post("/api/analyze", json={"text": unique_text(), "include_chart": False}, environ_base=remote_addr)
+    assert response.json["results"]["chart_data"] is None
+
+
+def test_url_delivery_serves_chart_by_hash(client, app_module, monkeypatch, remote_addr, unique_text):
+    monkeypatch.setattr(app_module, "CHART_DELIVERY", "url")
+    response = client.post("/api/analyze", json={"text": unique_text()}, environ_base=remote_addr)
+    chart_url = response.json["results"]["chart_url"]
+    chart = client.get(chart_url)
+    assert chart.status_code == 200
+    assert chart.mimetype == "image/png"
+    assert client.get(chart_url, headers={"If-None-Match": chart.headers["ETag"]}).status_code == 304
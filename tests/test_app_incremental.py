@@ -0,0 +1,44 @@
+"""Incremental mode of /api/analyze"""
+
+import pytest
+
+from conftest import FakeSpace
+
+
+def draft(unique_text, sentences):
+    return [unique_text(f"Sentence {i} is fine as of") + "." for i in range(sentences)]
+
+
+def test_edit_only_analyzes_changed_sentences(client, remote_addr, unique_text):
+    sentences = draft(unique_text, 12)
+    first = client.post("/api/analyze", json={"text": " ".join(sentences), "incremental": True},
+                        environ_base=remote_addr)
+    assert first.status_code == 200
+    assert FakeSpace.calls == 12
+    FakeSpace.calls = 0
+
+    sentences[4] = unique_text("You are stupid as of") + "."
+    edited = " ".join(sentences)
+    response = client.post("/api/analyze", json={"text": edited, "incremental": True}, environ_base=remote_addr)
+    assert response.status_code == 200
+    # Only the changed sentence reaches the upstream
+    assert FakeSpace.calls == 1
+    assert float(response.headers["X-Quota-Cost"]) == pytest.approx(2.1, abs=0.1)
+    results = response.json["results"]
+    # The document score is the highest sentence score
+    assert results["analysis"]["max_value"] == pytest.approx(0.301)
+    assert results["chart_data"]["plot"].startswith("data:image/png")
+    breakdown = results["sentences"]
+    assert breakdown["count"] == 12
+    assert breakdown["analyzed"] == 1
+    assert [edited[item["start"]:item["end"]] for item in breakdown["offending"]] == [sentences[4]]
+
+
+def test_long_drafts_are_analyzed_whole(client, app_module, monkeypatch, remote_addr, unique_text):
+    monkeypatch.setattr(app_module, "INCREMENTAL_MAX_SENTENCES", 10)
+    text = " ".join(draft(unique_text, 11))
+    response = client.post("/api/analyze", json={"text": text, "incremental": True}, environ_base=remote_addr)
+    assert response.status_code == 200
+    assert FakeSpace.calls == 1
+    assert "sentences" not in response.json["results"]
+    assert float(response.headers["X-Quota-Cost"]) == pytest.approx(1, abs=0.5)
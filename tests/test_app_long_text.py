@@ -0,0 +1,43 @@
+"""Long-text mode of /api/analyze"""
+
+import pytest
+
+from conftest import FakeSpace
+
+
+def document(unique_text, offending_at=None):
+    sentences = [unique_text(f"Sentence {i} is fine as of") + "." for i in range(200)]
+    if offending_at is not None:
+        sentences[offending_at] = unique_text("You are stupid as of") + "."
+    return " ".join(sentences), sentences
+
+
+def test_chunks_are_aggregated_with_an_inline_chart(client, remote_addr, unique_text):
+    text, sentences = document(unique_text, offending_at=150)
+    assert len(text) > 5000
+    response = client.post("/api/analyze", json={"text": text, "long_text": True}, environ_base=remote_addr)
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert results["chart_data"]["plot"].startswith("data:image/png")
+    assert results["analysis"]["max_value"] == pytest.approx(0.301)
+    chunks = results["chunks"]
+    assert FakeSpace.calls == chunks["count"] > 1
+    assert len(chunks["offending"]) == 1
+    offending = chunks["offending"][0]
+    assert sentences[150] in text[offending["start"]:offending["end"]]
+
+
+def test_long_text_chart_by_url(client, app_module, monkeypatch, remote_addr, unique_text):
+    monkeypatch.setattr(app_module, "CHART_DELIVERY", "url")
+    text, _ = document(unique_text)
+    response = client.post("/api/analyze", json={"text": text, "long_text": True}, environ_base=remote_addr)
+    chart = client.get(response.json["results"]["chart_url"])
+    assert chart.status_code == 200 and chart.mimetype == "image/png"
+
+
+def test_long_text_without_chart(client, remote_addr, unique_text):
+    text, _ = document(unique_text)
+    response = client.post(
+        "/api/analyze", json={"text": text, "long_text": True, "include_chart": False}, environ_base=remote_addr
+    )
+    assert response.json["results"]["chart_data"] is None
@@ -0,0 +1,68 @@
+"""Quota charging, settling and quota tokens in the Flask app"""
+
+import pytest
+
+from quota_tokens import QuotaTokens
+
+
+@pytest.fixture
+def tokens(app_module, monkeypatch):
+    tokens = QuotaTokens("secret", limit=app_module.RATE_LIMIT_REQUESTS, window=app_module.RATE_LIMIT_WINDOW)
+    monkeypatch.setattr(app_module, "quota_tokens", tokens)
+    return tokens
+
+
+def analyze(client, remote_addr, text, token=None):
+    headers = {"X-Quota-Token": token} if token else {}
+    return client.post("/api/analyze", json={"text": text}, headers=headers, environ_base=remote_addr)
+
+
+def test_cache_hits_are_refunded(client, remote_addr, unique_text):
+    text = unique_text()
+    first = analyze(client, remote_addr, text)
+    second = analyze(client, remote_addr, text)
+    assert float(first.headers["X-Quota-Cost"]) == pytest.approx(1, abs=0.1)
+    assert float(second.headers["X-Quota-Cost"]) == pytest.approx(0.1)
+    assert float(second.headers["X-RateLimit-Remaining"]) == pytest.approx(20 - 1.1, abs=0.1)
+
+
+def test_budget_is_enforced(client, remote_addr, unique_text):
+    statuses = [analyze(client, remote_addr, unique_text()).status_code for _ in range(22)]
+    assert 19 <= statuses.count(200) <= 20 and statuses[-1] == 429
+
+
+def test_tokens_carry_the_budget(client, remote_addr, unique_text, tokens):
+    response = analyze(client, remote_addr, unique_text())
+    token = response.headers["X-Quota-Token"]
+    response = analyze(client, remote_addr, unique_text(), token)
+    assert response.status_code == 200
+    assert float(response.headers["X-RateLimit-Remaining"]) == pytest.approx(18, abs=0.1)
+
+
+def test_missing_token_falls_back_to_instance_usage(client, remote_addr, unique_text, tokens):
+    token = analyze(client, remote_addr, unique_text()).headers["X-Quota-Token"]
+    analyze(client, remote_addr, unique_text(), token)
+    # Dropping the token neither locks the caller out nor resets their quota
+    response = analyze(client, remote_addr, unique_text())
+    assert response.status_code == 200
+    assert response.headers["X-Quota-Token"]
+    assert float(response.headers["X-RateLimit-Remaining"]) == pytest.approx(17, abs=0.1)
+
+
+def test_replayed_token_gets_a_fresh_one(client, remote_addr, unique_text, tokens):
+    token = analyze(client, remote_addr, unique_text()).headers["X-Quota-Token"]
+    assert analyze(client, remote_addr, unique_text(), token).status_code == 200
+    replay = analyze(client, remote_addr, unique_text(), token)
+    assert replay.status_code == 200
+    assert replay.headers["X-Quota-Token"] != token
+    assert float(replay.headers["X-RateLimit-Remaining"]) == pytest.approx(17, abs=0.1)
+
+
+def test_rejected_job_requests_refund_their_reservation(client, remote_addr, unique_text):
+    for body in ({"file": "missing.jsonl"}, {}, {"items": "not a list"}):
+        response = client.post("/api/jobs", json=body, environ_base=remote_addr)
+        assert response.status_code == 400
+        assert float(response.headers["X-Quota-Cost"]) == pytest.approx(0.1)
+    response = analyze(client, remote_addr, unique_text())
+    assert response.status_code == 200
+    assert float(response.headers["X-RateLimit-Remaining"]) == pytest.approx(20 - 0.3 - 1, abs=0.1)
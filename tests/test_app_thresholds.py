@@ -0,0 +1,51 @@
+"""Multi-threshold mode of /api/analyze"""
+
+import pytest
+
+from conftest import FakeSpace
+
+
+@pytest.fixture(autouse=True)
+def upstream_thresholds(app_module, monkeypatch):
+    """Earlier requests may have taught the safer model enough to derive thresholds locally"""
+    monkeypatch.setattr(app_module.safer_model, "can_derive", lambda include_chart=True: False)
+
+
+def test_upstream_thresholds_are_charged_per_call(client, remote_addr, unique_text):
+    safer_values = [0.05 * i for i in range(1, 11)]
+    response = client.post(
+        "/api/analyze", json={"text": unique_text(), "safer_values": safer_values}, environ_base=remote_addr
+    )
+    assert response.status_code == 200
+    assert response.json["threshold_mode"] == "upstream"
+    assert len(response.json["thresholds"]) == 10
+    # One call for the default safer value, one per threshold
+    assert FakeSpace.calls == 11
+    assert float(response.headers["X-Quota-Cost"]) == pytest.approx(11, abs=0.1)
+
+
+def test_repeated_thresholds_share_one_call(client, remote_addr, unique_text):
+    safer_values = [0.3, 0.1, 0.3]
+    response = client.post(
+        "/api/analyze", json={"text": unique_text("you are stupid"), "safer_values": safer_values}, environ_base=remote_addr
+    )
+    assert [decision["safer"] for decision in response.json["thresholds"]] == safer_values
+    assert [decision["is_safer_flagged"] for decision in response.json["thresholds"]] == [True, True, True]
+    assert FakeSpace.calls == 3
+
+
+def test_thresholds_rejected_with_combined_modes(client, remote_addr, unique_text):
+    for flag in ("long_text", "incremental"):
+        response = client.post(
+            "/api/analyze", json={"text": unique_text(), "safer_values": [0.1], flag: True}, environ_base=remote_addr
+        )
+        assert response.status_code == 400
+
+
+def test_too_many_thresholds_for_budget_are_refused(client, remote_addr, unique_text):
+    safer_values = [0.01 * i for i in range(1, 21)]
+    for _ in range(2):
+        response = client.post(
+            "/api/analyze", json={"text": unique_text(), "safer_values": safer_values}, environ_base=remote_addr
+        )
+    assert response.status_code == 429
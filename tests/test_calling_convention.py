@@ -0,0 +1,109 @@
+"""Calling convention resolution and per-call deadlines for /fetch_toxicity_level"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+import calling_convention
+
+
+class KeywordClient:
+    """Client whose API info names the first input"""
+
+    def __init__(self, first_input):
+        self.first_input = first_input
+        self.calls = []
+        self.api_reads = 0
+
+    def view_api(self, print_info=False, return_format="dict"):
+        self.api_reads += 1
+        return {"named_endpoints": {"/fetch_toxicity_level": {"parameters": [
+            {"parameter_name": self.first_input}, {"parameter_name": "safer"}
+        ]}}}
+
+    def predict(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return "result"
+
+
+class PositionalClient:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, text, safer, api_name=None):
+        self.calls.append((text, safer, api_name))
+        return "result"
+
+
+def test_text_convention_is_resolved_once():
+    client = KeywordClient("text")
+    for _ in range(3):
+        assert calling_convention.predict(client, "hello", 0.1) == "result"
+    assert client.api_reads == 1
+    assert client.calls == [((), {"text": "hello", "safer": 0.1, "api_name": "/fetch_toxicity_level"})] * 3
+
+
+def test_documented_msg_convention():
+    client = KeywordClient("msg")
+    calling_convention.predict(client, "hello", 0.1)
+    assert client.calls == [((), {"msg": "hello", "safer": 0.1, "api_name": "/fetch_toxicity_level"})]
+
+
+def test_clients_without_keywords_are_called_positionally():
+    client = PositionalClient()
+    calling_convention.predict(client, "hello", 0.1)
+    assert client.calls == [("hello", 0.1, "/fetch_toxicity_level")]
+
+
+def test_forgotten_convention_is_probed_again():
+    client = KeywordClient("msg")
+    calling_convention.predict(client, "hello", 0.1)
+    calling_convention.forget_convention(client)
+    client.first_input = "text"
+    calling_convention.predict(client, "hello", 0.1)
+    assert client.api_reads == 2
+    assert "text" in client.calls[-1][1]
+
+
+def test_schema_errors_are_recognized():
+    assert calling_convention.is_schema_change(TypeError("unexpected keyword argument 'msg'"))
+    assert calling_convention.is_schema_change(ValueError("Cannot find a function with api_name"))
+    assert not calling_convention.is_schema_change(ConnectionError("connection reset"))
+
+
+class SubmitClient(PositionalClient):
+    def __init__(self):
+        super().__init__()
+        self.jobs = []
+
+    def submit(self, text, safer, api_name=None):
+        # Like a gradio Job, a Future that stays pending until the Space answers
+        job = Future()
+        self.jobs.append(job)
+        return job
+
+
+def test_expired_deadline_cancels_the_job():
+    client = SubmitClient()
+    started = time.time()
+    with pytest.raises(calling_convention.UpstreamTimeout):
+        calling_convention.predict(client, "hello", 0.1, timeout=0.1)
+    assert time.time() - started < 1
+    assert client.jobs[0].cancelled()
+
+
+def test_cancel_event_cancels_the_job():
+    client = SubmitClient()
+    cancel = threading.Event()
+    threading.Timer(0.05, cancel.set).start()
+    with pytest.raises(calling_convention.UpstreamCancelled):
+        calling_convention.predict(client, "hello", 0.1, timeout=5, cancel=cancel)
+    assert client.jobs[0].cancelled()
+
+
+def test_finished_job_returns_its_result():
+    client = SubmitClient()
+    threading.Timer(0.05, lambda: client.jobs[0].set_result("result")).start()
+    assert calling_convention.predict(client, "hello", 0.1, timeout=5) == "result"
@@ -0,0 +1,147 @@
+"""Circuit breaker state transitions and hedged calls"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from hedging import Hedger
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise RuntimeError("upstream down")
+
+
+def breaker(clock, **settings):
+    return CircuitBreaker(
+        window_seconds=30, min_requests=4, error_rate=0.5, slow_call_seconds=10, slow_rate=0.5,
+        open_seconds=30, half_open_probes=2, clock=clock, **settings
+    )
+
+
+def test_failures_open_then_probes_close():
+    clock = Clock()
+    circuit = breaker(clock)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            circuit.call(failing)
+    assert circuit.stats()["state"] == CLOSED
+    with pytest.raises(RuntimeError):
+        circuit.call(failing)
+    assert circuit.stats()["state"] == OPEN
+    with pytest.raises(CircuitOpenError):
+        circuit.call(lambda: "ok")
+
+    clock.now += 30
+    assert circuit.allow() and circuit.allow()
+    assert circuit.stats()["state"] == HALF_OPEN
+    # Only half_open_probes calls get through at once
+    assert not circuit.allow()
+    circuit.record(True, 0.1)
+    circuit.record(True, 0.1)
+    assert circuit.stats()["state"] == CLOSED
+
+
+def test_failed_probe_reopens():
+    clock = Clock()
+    circuit = breaker(clock)
+    for _ in range(4):
+        circuit.record(False, 0.1)
+    clock.now += 30
+    with pytest.raises(RuntimeError):
+        circuit.call(failing)
+    assert circuit.stats()["state"] == OPEN
+    assert circuit.retry_after() == 30
+
+
+def test_slow_calls_open_the_circuit():
+    clock = Clock()
+    circuit = breaker(clock)
+
+    def slow():
+        clock.now += 12
+        return "ok"
+
+    for _ in range(3):
+        circuit.record(True, 12.0)
+    assert circuit.stats()["state"] == CLOSED
+    # Successful but slow calls still open the circuit
+    assert circuit.call(slow) == "ok"
+    assert circuit.stats()["state"] == OPEN
+
+
+def test_old_outcomes_leave_the_window():
+    clock = Clock()
+    circuit = breaker(clock)
+    for _ in range(3):
+        circuit.record(False, 0.1)
+    clock.now += 31
+    circuit.record(False, 0.1)
+    assert circuit.stats()["state"] == CLOSED
+
+
+def test_ignored_exceptions_release_half_open_probes():
+    clock = Clock()
+    circuit = breaker(clock, ignored_exceptions=(TimeoutError,))
+    for _ in range(4):
+        circuit.record(False, 0.1)
+    clock.now += 30
+
+    def shed():
+        raise TimeoutError("no slot")
+
+    for _ in range(3):
+        with pytest.raises(TimeoutError):
+            circuit.call(shed)
+    assert circuit.stats()["state"] == HALF_OPEN
+
+
+def test_losing_hedge_is_cancelled():
+    hedger = Hedger(ThreadPoolExecutor(max_workers=2), min_samples=1, max_hedge_ratio=1.0, min_delay=0.01)
+    hedger._record(0.01)
+    attempts = []
+    cancelled = threading.Event()
+
+    def attempt(cancel):
+        first = not attempts
+        attempts.append(cancel)
+        if first:
+            # The primary stalls until the hedge wins and cancels it
+            if cancel.wait(5):
+                cancelled.set()
+                raise RuntimeError("cancelled")
+        return "hedge"
+
+    assert hedger.run(attempt) == "hedge"
+    assert cancelled.wait(1)
+    stats = hedger.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = Hedger(ThreadPoolExecutor(max_workers=2), min_samples=1, max_hedge_ratio=1.0, min_delay=0.5)
+    hedger._record(0.5)
+    assert hedger.run(lambda cancel: "primary") == "primary"
+    assert hedger.stats()["hedged"] == 0
+
+
+def test_hedges_stay_within_budget():
+    hedger = Hedger(ThreadPoolExecutor(max_workers=2), min_samples=1, max_hedge_ratio=0.1, min_delay=0.01)
+    hedger._record(0.01)
+
+    def slow(cancel):
+        time.sleep(0.05)
+        return "primary"
+
+    assert hedger.run(slow) == "primary"
+    assert hedger.stats()["hedged"] == 0 and hedger.stats()["budget_denied"] == 1
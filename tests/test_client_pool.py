@@ -0,0 +1,60 @@
+"""Pooled upstream clients: checkout, eviction and exhaustion"""
+
+import threading
+
+import pytest
+
+from calling_convention import UpstreamCancelled, UpstreamTimeout
+from client_pool import ClientPool, PoolExhausted
+
+
+class Factory:
+    def __init__(self):
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return f"client-{self.created}"
+
+
+def test_released_clients_are_reused():
+    pool = ClientPool(Factory(), size=1, max_size=2)
+    with pool.client() as first:
+        pass
+    with pool.client() as second:
+        assert second == first
+    stats = pool.stats()
+    assert (stats["created"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+
+
+def test_connection_errors_evict_the_client():
+    factory = Factory()
+    pool = ClientPool(factory, size=1, max_size=1, max_failures=2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            with pool.client():
+                raise ConnectionError("connection reset")
+    assert pool.stats()["evicted"] == 1
+    with pool.client() as client:
+        assert client == "client-2"
+
+
+@pytest.mark.parametrize("error", [UpstreamTimeout("deadline"), UpstreamCancelled("hedge lost"), ValueError("app error")])
+def test_timeouts_and_upstream_errors_keep_the_client(error):
+    pool = ClientPool(Factory(), size=1, max_size=1, max_failures=1)
+    for _ in range(3):
+        with pytest.raises(type(error)):
+            with pool.client():
+                raise error
+    assert pool.stats()["evicted"] == 0
+    with pool.client() as client:
+        assert client == "client-1"
+
+
+def test_exhausted_pool_reports_the_callers_timeout():
+    pool = ClientPool(Factory(), size=1, max_size=1, acquire_timeout=30)
+    held = pool.acquire()
+    with pytest.raises(PoolExhausted, match="after 0.05s"):
+        pool.acquire(timeout=0.05)
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    assert pool.acquire(timeout=2) is held
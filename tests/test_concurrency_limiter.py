@@ -0,0 +1,49 @@
+"""Adaptive concurrency limit under steady, noisy and congested latencies"""
+
+import random
+
+from concurrency_limiter import AdaptiveLimiter
+
+
+def run(limiter, latencies):
+    """Keep the limiter saturated and release each call with the next latency"""
+    for latency in latencies:
+        for _ in range(limiter.limit):
+            limiter.acquire(timeout=0)
+        for _ in range(limiter.limit - 1):
+            limiter.release(latency, True)
+        limiter.release(latency, True)
+
+
+def test_noisy_uncongested_latencies_grow_the_limit():
+    rng = random.Random(7)
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=16)
+    # Latency spread of 0.5-1.5s around a steady 1s
+    run(limiter, [rng.uniform(0.5, 1.5) for _ in range(200)])
+    assert limiter.limit == 16
+    assert limiter.decreases == 0
+
+
+def test_latency_spike_halves_the_limit():
+    rng = random.Random(7)
+    limiter = AdaptiveLimiter(initial_limit=1, max_limit=16)
+    run(limiter, [rng.uniform(0.5, 1.5) for _ in range(200)])
+    run(limiter, [5.0] * 3)
+    assert limiter.decreases >= 1
+    assert limiter.limit < 16
+
+
+def test_neutral_releases_leave_the_limit_alone():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(30.0, None)
+    stats = limiter.stats()
+    assert stats["limit"] == 4 and stats["decreases"] == 0 and stats["baseline_latency_ms"] is None
+
+
+def test_failures_cut_the_limit():
+    limiter = AdaptiveLimiter(initial_limit=8)
+    limiter.acquire()
+    limiter.release(0.1, False)
+    assert limiter.limit == 4
@@ -0,0 +1,124 @@
+"""Tests for the durable job queue and its runner"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from job_queue import JobQueue, JobRunner
+
+
+def items(count, prefix="item"):
+    return [(i, f"{prefix} {i}", None, None) for i in range(count)]
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=3, retry_base=0.05, retry_max=0.2)
+
+
+def test_create_job_stores_items_and_input_errors(queue):
+    job_id = queue.create_job(items(3) + [(3, None, None, "Text cannot be empty")])
+    job = queue.get_job(job_id)
+    assert (job["status"], job["total"], job["failed"]) == ("queued", 4, 1)
+
+
+def test_failed_iteration_stores_nothing(queue):
+    def broken():
+        yield from items(2)
+        raise ValueError("bad line")
+
+    with pytest.raises(ValueError):
+        queue.create_job(broken())
+    assert queue._connection().execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+    assert queue._connection().execute("SELECT COUNT(*) FROM job_items").fetchone()[0] == 0
+
+
+def test_slow_upload_does_not_block_checkpoints(queue):
+    first = queue.create_job(items(2))
+    job, chunk = queue.next_chunk(10)
+    release = threading.Event()
+
+    def slow_items():
+        yield from items(1, "slow")
+        release.wait(5)
+        yield from items(1, "late")
+
+    loader = threading.Thread(target=queue.create_job, args=(slow_items(),))
+    loader.start()
+    try:
+        started = time.time()
+        queue.checkpoint(first, [(seq, {"success": True}) for seq, *_ in chunk])
+        assert time.time() - started < 1
+    finally:
+        release.set()
+        loader.join()
+    assert queue.get_job(first)["completed"] == 2
+
+
+def test_transient_failures_are_retried_with_backoff(queue):
+    job_id = queue.create_job(items(1))
+    job, chunk = queue.next_chunk(10)
+    queue.checkpoint(job_id, [(chunk[0][0], {"success": False, "retryable": True})])
+    assert queue.get_job(job_id)["retrying"] == 1
+    # Backing off: nothing due, but the job isn't finished either
+    assert queue.next_chunk(10) == (None, [])
+    assert queue.get_job(job_id)["status"] == "running"
+    time.sleep(0.06)
+    job, chunk = queue.next_chunk(10)
+    assert len(chunk) == 1
+
+
+def test_items_fail_after_max_attempts(queue):
+    job_id = queue.create_job(items(1))
+    for _ in range(3):
+        deadline = time.time() + 1
+        job, chunk = queue.next_chunk(10)
+        while not chunk and time.time() < deadline:
+            time.sleep(0.02)
+            job, chunk = queue.next_chunk(10)
+        queue.checkpoint(job_id, [(chunk[0][0], {"success": False, "retryable": True})])
+    status = queue.get_job(job_id)
+    assert (status["failed"], status["retrying"]) == (1, 0)
+    queue.next_chunk(10)
+    assert queue.get_job(job_id)["status"] == "finished"
+
+
+def test_non_retryable_failures_fail_at_once(queue):
+    job_id = queue.create_job(items(1))
+    job, chunk = queue.next_chunk(10)
+    queue.checkpoint(job_id, [(chunk[0][0], {"success": False, "error": "Unparseable result"})])
+    assert queue.get_job(job_id)["failed"] == 1
+
+
+def test_runner_pauses_while_whole_chunks_fail(queue):
+    calls = []
+
+    def process(text, safer, include_chart):
+        calls.append(text)
+        return {"success": False, "retryable": True}
+
+    runner = JobRunner(queue, process, ThreadPoolExecutor(2), chunk_size=4)
+    job_id = queue.create_job(items(8))
+    job, chunk = queue.next_chunk(4)
+    runner.run_chunk(job, chunk)
+    assert runner._pause_until > time.time()
+    assert len(calls) == 4
+    assert queue.get_job(job_id)["retrying"] == 4
+
+
+def test_results_stop_before_items_waiting_for_a_retry(queue):
+    job_id = queue.create_job(items(5))
+    job, chunk = queue.next_chunk(10)
+    queue.checkpoint(job_id, [
+        (seq, {"success": False, "retryable": True} if seq == 2 else {"success": True})
+        for seq, *_ in chunk
+    ])
+    assert [seq for seq, _ in queue.get_results(job_id)] == [0, 1]
+    assert queue.get_results(job_id, offset=2) == []
+
+    time.sleep(0.06)
+    job, chunk = queue.next_chunk(10)
+    queue.checkpoint(job_id, [(chunk[0][0], {"success": True})])
+    assert [seq for seq, _ in queue.get_results(job_id, offset=2)] == [2, 3, 4]
@@ -0,0 +1,40 @@
+"""Keep-warm interval adaptation"""
+
+import time
+
+from keep_warm import KeepWarm
+
+
+def test_real_traffic_does_not_stretch_interval():
+    keep_warm = KeepWarm(lambda: None, initial_interval=300)
+    now = time.time()
+    for i in range(5):
+        keep_warm.record(0.2, now + i)
+    assert keep_warm.interval == 300
+
+
+def test_warm_probe_stretches_interval():
+    keep_warm = KeepWarm(lambda: None, initial_interval=300)
+    assert keep_warm.probe() is False
+    assert keep_warm.interval == 375
+
+
+def test_probe_uses_reported_upstream_latency():
+    def probe_fn():
+        # Slow local setup before the call must not look like a cold start
+        time.sleep(0.05)
+        keep_warm.record(0.01, time.time() - 0.01, probe=True)
+
+    keep_warm = KeepWarm(probe_fn, cold_min_seconds=0.03)
+    assert keep_warm.probe() is False
+    assert keep_warm.stats()["warm"] == 1
+
+
+def test_learned_gaps_apply_to_real_traffic():
+    keep_warm = KeepWarm(lambda: None, initial_interval=300, min_interval=60, cold_min_seconds=3)
+    now = time.time()
+    keep_warm.record(0.2, now - 1000)
+    keep_warm.record(0.2, now - 800)
+    keep_warm.record(10, now)
+    # Warm after 200 s idle, cold after ~800 s: probe at 80% of the cold gap
+    assert 600 <= keep_warm.interval <= 800
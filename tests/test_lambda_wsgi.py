@@ -0,0 +1,77 @@
+"""API Gateway events through the WSGI adapter"""
+
+import base64
+import json
+
+from flask import Flask, Response, request
+
+from lambda_wsgi import handle_event, is_http_event
+
+app = Flask(__name__)
+
+
+@app.route("/echo", methods=["GET", "POST"])
+def echo():
+    response = Response(json.dumps({
+        "method": request.method,
+        "args": request.args.to_dict(flat=False),
+        "body": request.get_data(as_text=True),
+        "remote_addr": request.remote_addr,
+        "accept": request.headers.get("Accept"),
+    }), mimetype="application/json")
+    response.headers.add("Set-Cookie", "a=1")
+    response.headers.add("Set-Cookie", "b=2")
+    return response
+
+
+@app.route("/png")
+def png():
+    return Response(b"\x89PNG\r\n\x1a\n", mimetype="image/png")
+
+
+def rest_event(path, method="GET", body=None, query=None, base64_body=False):
+    return {
+        "httpMethod": method,
+        "path": path,
+        "headers": {"Accept": "application/json"},
+        "multiValueHeaders": {"Accept": ["application/json"]},
+        "multiValueQueryStringParameters": query,
+        "requestContext": {"identity": {"sourceIp": "203.0.113.7"}},
+        "body": base64.b64encode(body.encode()).decode() if base64_body and body else body,
+        "isBase64Encoded": base64_body,
+    }
+
+
+def test_rest_event_round_trip():
+    event = rest_event("/echo", "POST", body="héllo", query={"tag": ["a", "b"]}, base64_body=True)
+    assert is_http_event(event)
+    response = handle_event(app, event)
+    body = json.loads(response["body"])
+    assert response["statusCode"] == 200 and not response["isBase64Encoded"]
+    assert body == {"method": "POST", "args": {"tag": ["a", "b"]}, "body": "héllo",
+                    "remote_addr": "203.0.113.7", "accept": "application/json"}
+    assert response["multiValueHeaders"]["Set-Cookie"] == ["a=1", "b=2"]
+
+
+def test_http_api_event_round_trip():
+    event = {
+        "version": "2.0",
+        "rawPath": "/echo",
+        "rawQueryString": "tag=a&tag=b",
+        "headers": {"accept": "application/json"},
+        "requestContext": {"http": {"method": "GET", "path": "/echo", "sourceIp": "198.51.100.1"}},
+        "isBase64Encoded": False,
+    }
+    response = handle_event(app, event)
+    assert json.loads(response["body"])["args"] == {"tag": ["a", "b"]}
+    assert response["cookies"] == ["a=1", "b=2"]
+
+
+def test_binary_responses_are_base64_encoded():
+    response = handle_event(app, rest_event("/png"))
+    assert response["isBase64Encoded"]
+    assert base64.b64decode(response["body"]) == b"\x89PNG\r\n\x1a\n"
+
+
+def test_scheduled_events_are_not_http():
+    assert not is_http_event({"source": "aws.events", "detail-type": "Scheduled Event"})
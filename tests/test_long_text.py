@@ -0,0 +1,57 @@
+"""Chunking and aggregation for long documents"""
+
+import pytest
+
+from long_text import aggregate_analyses, chunk_text, split_sentences
+
+
+def sentences(count):
+    return " ".join(f"Sentence number {i:03d} is here." for i in range(count))
+
+
+def test_split_sentences_keeps_offsets():
+    text = "  First one. Second!\nThird line\n"
+    assert [text[start:end] for start, end in split_sentences(text)] == ["First one.", "Second!", "Third line"]
+
+
+def test_chunks_fit_and_cover_the_text():
+    text = sentences(100)
+    chunks = chunk_text(text, max_chars=200, overlap_chars=0)
+    assert all(end - start <= 200 for start, end in chunks)
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(text)
+    # Without overlap every sentence is in exactly one chunk
+    assert sum(text[start:end].count("Sentence") for start, end in chunks) == 100
+
+
+def test_consecutive_chunks_overlap_by_whole_sentences():
+    text = sentences(100)
+    chunks = chunk_text(text, max_chars=200, overlap_chars=60)
+    for (_, previous_end), (start, _) in zip(chunks, chunks[1:]):
+        assert start < previous_end
+        assert previous_end - start <= 60
+        assert text[start:].startswith("Sentence")
+
+
+def test_overlong_sentences_are_split_at_whitespace():
+    text = " ".join(["word"] * 100)
+    chunks = chunk_text(text, max_chars=50, overlap_chars=0)
+    assert all(end - start <= 50 for start, end in chunks)
+    assert all(text[start:end].split() == ["word"] * len(text[start:end].split()) for start, end in chunks)
+
+
+def test_aggregation_takes_maxima_and_lists_offending_chunks():
+    analyses = [
+        ((0, 10), {"harassment": 0.1, "hate": 0.4, "max_key": "hate", "max_value": 0.4, "is_flagged": False}),
+        ((10, 20), {"harassment": 0.6, "hate": 0.2, "max_key": "harassment", "max_value": 0.6, "is_flagged": True}),
+        ((20, 30), {"harassment": 0.001, "hate": 0.0, "max_key": "harassment", "max_value": 0.001, "is_flagged": False}),
+        ((30, 40), None),
+    ]
+    analysis, offending = aggregate_analyses(analyses, 0.3)
+    assert analysis["harassment"] == 0.6 and analysis["hate"] == 0.4
+    assert analysis["max_key"] == "harassment" and analysis["max_value"] == 0.6
+    assert analysis["is_flagged"] is True
+    assert [(chunk["start"], chunk["max_value"]) for chunk in offending] == [(10, 0.6), (0, 0.4)]
+
+
+def test_aggregation_without_parsed_chunks():
+    assert aggregate_analyses([((0, 5), None)], 0.3) == (None, [])
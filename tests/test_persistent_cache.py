@@ -0,0 +1,42 @@
+"""Tests for the SQLite result cache tier"""
+
+from persistent_cache import PersistentCache
+
+
+def total_size(cache):
+    return cache._connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+def test_round_trip_and_expiry(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"))
+    cache.set("a", {"score": 0.5})
+    cache.set("b", "gone", ttl=-1)
+    assert cache.get("a") == {"score": 0.5}
+    assert cache.get("b") is None
+    assert cache.get("missing") is None
+
+
+def test_running_size_matches_table(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), max_bytes=2000)
+    for i in range(100):
+        cache.set(f"k{i % 30}", "x" * (50 + i))
+    cache.set("expired", "y", ttl=-1)
+    cache.delete("k29")
+    assert cache.stats()["bytes"] == total_size(cache) <= 2000
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.db"), max_bytes=100)
+    cache.set("old", "x" * 40)
+    cache.set("newer", "x" * 40)
+    cache.set("newest", "x" * 40)
+    assert cache.get("old") is None
+    assert cache.get("newest") == "x" * 40
+
+
+def test_size_total_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = PersistentCache(path)
+    cache.set("a", "x" * 100)
+    reopened = PersistentCache(path)
+    assert reopened.stats()["bytes"] == total_size(cache)
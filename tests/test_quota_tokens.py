@@ -0,0 +1,47 @@
+"""Signed quota tokens and cost accounting"""
+
+import pytest
+
+from quota_cost import Budget, CostModel
+from quota_tokens import InvalidQuotaToken, QuotaTokens
+
+
+def test_token_round_trip_decrements_budget():
+    tokens = QuotaTokens("secret", limit=20, window=3600)
+    decision = tokens.spend(tokens.issue("1.2.3.4", 5), "1.2.3.4", cost=1.5)
+    assert decision.allowed and decision.remaining == 3.5
+    decision = tokens.spend(tokens.issue("1.2.3.4", decision.remaining, decision.window), "1.2.3.4", cost=4)
+    assert not decision.allowed and decision.remaining == 3.5 and decision.retry_after > 0
+
+
+def test_spent_forged_and_foreign_tokens_are_rejected():
+    tokens = QuotaTokens("secret", limit=20, window=3600)
+    token = tokens.issue("1.2.3.4", 5)
+    tokens.spend(token, "1.2.3.4")
+    with pytest.raises(InvalidQuotaToken):
+        tokens.spend(token, "1.2.3.4")
+    with pytest.raises(InvalidQuotaToken):
+        tokens.spend(tokens.issue("1.2.3.4", 5), "5.6.7.8")
+    with pytest.raises(InvalidQuotaToken):
+        tokens.spend(QuotaTokens("other", limit=20).issue("1.2.3.4", 20), "1.2.3.4")
+
+
+def test_new_window_restores_full_budget():
+    tokens = QuotaTokens("secret", limit=20, window=3600)
+    decision = tokens.spend(tokens.issue("1.2.3.4", 0, window_index=1), "1.2.3.4")
+    assert decision.allowed and decision.remaining == 19
+
+
+def test_cost_model_charges_fresh_calls_and_characters():
+    model = CostModel(chars_per_unit=5000, cache_hit_cost=0.1)
+    assert model.cost(5000) == 2
+    assert model.cost(5000, calls=2, cached_calls=1) == 1.6
+    assert model.cost(10, calls=3, cached_calls=3) == pytest.approx(0.3)
+
+
+def test_budget_refuses_overspend():
+    budget = Budget(3)
+    assert budget.spend(2)
+    assert not budget.spend(1.5)
+    budget.adjust(2, 0.5)
+    assert budget.spend(1.5)
@@ -0,0 +1,48 @@
+"""Per-process rate limiter algorithms and key bounds"""
+
+from rate_limiter import RateLimiter, SlidingWindowCounter, TokenBucket
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_window_charges_cost_and_refunds():
+    clock = Clock()
+    limiter = RateLimiter(SlidingWindowCounter(10, 60), clock=clock)
+    assert limiter.hit("client", cost=7).allowed
+    denied = limiter.hit("client", cost=4)
+    assert not denied.allowed and denied.retry_after > 0
+    limiter.refund("client", 2)
+    assert limiter.hit("client", cost=4).allowed
+    assert limiter.hit("client", cost=1).remaining == 0
+
+
+def test_sliding_window_frees_units_as_the_previous_window_slides_out():
+    clock = Clock(600.0)
+    limiter = RateLimiter(SlidingWindowCounter(10, 60), clock=clock)
+    assert limiter.hit("client", cost=10).allowed
+    clock.now += 60
+    assert not limiter.hit("client").allowed
+    clock.now += 30
+    assert limiter.hit("client", cost=5).allowed
+
+
+def test_token_bucket_refills():
+    clock = Clock()
+    limiter = RateLimiter(TokenBucket(10, 60), clock=clock)
+    assert limiter.hit("client", cost=10).allowed
+    assert not limiter.hit("client").allowed
+    clock.now += 6
+    assert limiter.hit("client").allowed
+
+
+def test_key_count_is_capped():
+    limiter = RateLimiter(SlidingWindowCounter(10, 60), max_keys=32, stripes=4)
+    for i in range(1000):
+        limiter.hit(f"client-{i}")
+    assert len(limiter) <= 32
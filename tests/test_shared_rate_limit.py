@@ -0,0 +1,85 @@
+"""Rate limits shared between workers through SQLite or the Redis stand-in"""
+
+import threading
+
+import pytest
+
+from redis_standin import RedisStandin
+from shared_rate_limit import SharedRateLimiter, SQLiteRateLimitStore, RedisRateLimitStore
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def store_factory(request, tmp_path):
+    if request.param == "sqlite":
+        path = str(tmp_path / "limits.sqlite3")
+        yield lambda: SQLiteRateLimitStore(path)
+    else:
+        server = RedisStandin(("127.0.0.1", 0)).start()
+        yield lambda: RedisRateLimitStore(server.url)
+        server.shutdown()
+        server.server_close()
+
+
+def test_limit_holds_across_workers(store_factory):
+    clock = Clock()
+    workers = [SharedRateLimiter(store_factory(), limit=10, window=60, lease_size=3, clock=clock) for _ in range(3)]
+    allowed = sum(workers[i % 3].hit("client").allowed for i in range(30))
+    assert allowed == 10
+
+
+def test_evicted_lease_is_handed_back(store_factory):
+    clock = Clock()
+    worker = SharedRateLimiter(store_factory(), limit=10, window=60, lease_size=5, max_keys=1, stripes=1, clock=clock)
+    assert worker.hit("a").allowed
+    # Evicts "a", whose 4 unspent leased units go back to the shared counter
+    assert worker.hit("b").allowed
+    other = SharedRateLimiter(store_factory(), limit=10, window=60, clock=clock)
+    assert sum(other.hit("a").allowed for _ in range(10)) == 9
+
+
+def test_cached_denial_does_not_block_cheaper_calls(store_factory):
+    clock = Clock()
+    worker = SharedRateLimiter(store_factory(), limit=10, window=60, clock=clock)
+    assert worker.hit("client", cost=8).allowed
+    assert not worker.hit("client", cost=5).allowed
+    assert not worker.hit("client", cost=6).allowed
+    assert worker.hit("client", cost=1).allowed
+
+
+class BlockingStore(SQLiteRateLimitStore):
+    """Reserve blocks for one key until released"""
+
+    def __init__(self, path, blocked_digest_prefix):
+        super().__init__(path)
+        self.blocked = blocked_digest_prefix
+        self.release = threading.Event()
+
+    def reserve(self, key, previous_key, amount, ttl):
+        if key.startswith(self.blocked):
+            self.release.wait(5)
+        return super().reserve(key, previous_key, amount, ttl)
+
+
+def test_store_io_runs_outside_the_stripe_lock(tmp_path):
+    from shared_rate_limit import client_digest
+
+    store = BlockingStore(str(tmp_path / "limits.sqlite3"), f"rl:{client_digest('slow')}")
+    worker = SharedRateLimiter(store, limit=10, window=60, stripes=1)
+    slow = threading.Thread(target=worker.hit, args=("slow",))
+    slow.start()
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (worker.hit("fast"), done.set()), daemon=True).start()
+        # Same stripe, but the fast key doesn't wait for the slow key's store call
+        assert done.wait(2)
+    finally:
+        store.release.set()
+        slow.join()
@@ -0,0 +1,47 @@
+"""Background revalidation of the Space snapshot"""
+
+import threading
+import time
+
+from space_snapshot import SpaceSnapshot
+
+
+def blocking_snapshot(tmp_path, cooldown):
+    snapshot = SpaceSnapshot(str(tmp_path / "snapshot.json"), "owner/space", revalidate_cooldown=cooldown)
+    snapshot.release = threading.Event()
+    snapshot.started = 0
+
+    def revalidate():
+        snapshot.started += 1
+        snapshot.release.wait(5)
+
+    snapshot.revalidate = revalidate
+    return snapshot
+
+
+def wait_idle(snapshot):
+    deadline = time.time() + 5
+    while snapshot._revalidating and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_one_revalidation_in_flight(tmp_path):
+    snapshot = blocking_snapshot(tmp_path, cooldown=0)
+    assert snapshot.revalidate_async()
+    assert not any(snapshot.revalidate_async() for _ in range(50))
+    snapshot.release.set()
+    wait_idle(snapshot)
+    assert snapshot.started == 1
+    # Once finished, the next schema change may revalidate again
+    assert snapshot.revalidate_async()
+    wait_idle(snapshot)
+    assert snapshot.started == 2
+
+
+def test_cooldown_skips_repeats(tmp_path):
+    snapshot = blocking_snapshot(tmp_path, cooldown=60)
+    snapshot.release.set()
+    assert snapshot.revalidate_async()
+    wait_idle(snapshot)
+    assert not snapshot.revalidate_async()
+    assert snapshot.started == 1
@@ -0,0 +1,48 @@
+"""Checkpointing of the bulk moderation CLI"""
+
+import json
+
+import text_moderator
+
+
+def write_input(path, count):
+    path.write_text("".join(json.dumps({"id": f"c{i}", "text": f"comment {i}"}) + "\n" for i in range(count)))
+
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def run(tmp_path, monkeypatch, analyze, *extra):
+    monkeypatch.setattr(text_moderator, "make_analyzer", lambda backend, include_chart=False: analyze)
+    return text_moderator.main([
+        "bulk", str(tmp_path / "in.jsonl"), "-o", str(tmp_path / "out.jsonl"), "--concurrency", "2", *extra
+    ])
+
+
+def test_rerun_skips_done_items_and_retries_failed_on_request(tmp_path, monkeypatch):
+    write_input(tmp_path / "in.jsonl", 6)
+    run(tmp_path, monkeypatch, lambda text, safer: {"success": not text.endswith(("1", "4"))})
+    assert sum(not r["success"] for r in read_output(tmp_path / "out.jsonl")) == 2
+
+    seen = []
+    def succeed(text, safer):
+        seen.append(text)
+        return {"success": True}
+
+    run(tmp_path, monkeypatch, succeed)
+    assert seen == []
+
+    run(tmp_path, monkeypatch, succeed, "--retry-failed")
+    assert sorted(seen) == ["comment 1", "comment 4"]
+    results = read_output(tmp_path / "out.jsonl")
+    assert sorted(r["index"] for r in results) == list(range(6))
+    assert all(r["success"] for r in results)
+
+
+def test_partial_last_line_is_truncated(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text(json.dumps({"index": 0, "success": True}) + "\n" + '{"index": 1, "succ')
+    done, failed = text_moderator.load_checkpoint(str(output))
+    assert (done, failed) == ({0}, 0)
+    assert output.read_text().count("\n") == 1
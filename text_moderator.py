@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Text Moderator command-line tool
+
+Usage:
+    python text_moderator.py bulk comments.jsonl -o results.jsonl
+    python text_moderator.py bulk export.csv -o results.jsonl --backend rule-based --concurrency 16
+
+Input is streamed line by line (JSONL) or row by row (CSV), so corpora of any
+size can be processed. The output file doubles as the checkpoint: re-running
+the same command after a crash skips every item already written to it, and
+--retry-failed re-runs the items that failed (upstream outages, timeouts).
+Only item ids and results are written, never the analyzed text.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+BACKENDS = ["duc-haba", "auto", "hf-api", "local", "rule-based"]
+
+
+def read_items(path, text_field="text", id_field="id"):
+    """Yield (index, item_id, text) from a JSONL or CSV file without loading it"""
+    is_csv = path.lower().endswith(".csv")
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f) if is_csv else f
+        index = 0
+        for row in rows:
+            if not is_csv:
+                row = row.strip()
+                if not row:
+                    continue
+                try:
+                    row = json.loads(row)
+                except ValueError:
+                    yield index, index, None
+                    index += 1
+                    continue
+                if isinstance(row, str):
+                    row = {text_field: row}
+            text = row.get(text_field) if isinstance(row, dict) else None
+            item_id = row.get(id_field, index) if isinstance(row, dict) else index
+            yield index, item_id, text
+            index += 1
+
+
+def load_checkpoint(output_path, retry_failed=False):
+    """Return (indices already in the output file, number of failed ones among them)
+
+    A partially written last line (from a killed run) is truncated away.
+    With retry_failed, failed results are dropped from the file so those
+    items are analyzed again.
+    """
+    done = set()
+    failed = 0
+    if not os.path.exists(output_path):
+        return done, failed
+    with open(output_path, "rb+") as f:
+        valid_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                result = json.loads(line)
+                done.add(result["index"])
+            except (ValueError, KeyError):
+                break
+            if not result.get("success"):
+                failed += 1
+            valid_end += len(line)
+        f.truncate(valid_end)
+    if retry_failed and failed:
+        done = drop_failed(output_path)
+    return done, failed
+
+
+def drop_failed(output_path):
+    """Rewrite the output file without failed results, returns the indices kept"""
+    done = set()
+    directory = os.path.dirname(os.path.abspath(output_path))
+    with open(output_path, "rb") as source, tempfile.NamedTemporaryFile("wb", dir=directory, delete=False) as target:
+        for line in source:
+            result = json.loads(line)
+            if result.get("success"):
+                target.write(line)
+                done.add(result["index"])
+    os.replace(target.name, output_path)
+    return done
+
+
+def make_analyzer(backend, include_chart=False):
+    """Return a function text, safer -> result dict for the chosen backend"""
+    if backend == "duc-haba":
+        # Reuse the server's upstream client, result cache and single-flight layer
+        from app import analyze_item
+
+        def analyze(text, safer):
+            return analyze_item(text, safer, include_chart)
+        return analyze
+
+    from alternative_moderator import AlternativeTextModerator
+    moderator = AlternativeTextModerator(os.getenv("HUGGINGFACE_TOKEN"))
+    method = {
+        "auto": moderator.analyze_text,
+        "hf-api": lambda text, safer: moderator.analyze_text_hf_api(text),
+        "local": lambda text, safer: moderator.analyze_text_local(text),
+        "rule-based": lambda text, safer: moderator.analyze_text_simple(text),
+    }[backend]
+
+    def analyze(text, safer):
+        success, result = method(text, safer)
+        if not success:
+            return {"success": False, "error": result}
+        return {"success": True, "results": {"analysis": result["analysis"]}}
+    return analyze
+
+
+class Progress:
+    """Thread-safe throughput and latency tracker with a live summary line"""
+
+    def __init__(self, skipped=0, stream=sys.stderr):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.skipped = skipped
+        self.latencies = deque(maxlen=10000)
+        self.stream = stream
+        self.last_print = 0
+
+    def record(self, success, latency):
+        with self.lock:
+            self.processed += 1
+            if not success:
+                self.failed += 1
+            self.latencies.append(latency)
+
+    def summary(self):
+        with self.lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            latencies = sorted(self.latencies)
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+        return (
+            f"processed={self.processed} failed={self.failed} skipped={self.skipped} "
+            f"rate={self.processed / elapsed:.1f}/s "
+            f"p50={percentile(0.5):.0f}ms p95={percentile(0.95):.0f}ms p99={percentile(0.99):.0f}ms"
+        )
+
+    def maybe_print(self, force=False):
+        now = time.time()
+        if force or now - self.last_print >= 1.0:
+            self.last_print = now
+            end = "\n" if force else ""
+            print(f"\r📊 {self.summary()}", end=end, file=self.stream, flush=True)
+
+
+def run_bulk(args):
+    """Moderate every item of the input file and append results to the output file"""
+    analyze = make_analyzer(args.backend, args.include_chart)
+    done, failed = load_checkpoint(args.output, args.retry_failed)
+    progress = Progress(skipped=len(done))
+    if args.retry_failed and failed:
+        print(f"🔁 Retrying {failed} failed items from {args.output}", file=sys.stderr)
+    if done:
+        print(f"🔁 Resuming: {len(done)} items already in {args.output}", file=sys.stderr)
+    if failed and not args.retry_failed:
+        print(f"⚠️ {failed} of them failed, re-run with --retry-failed to try them again", file=sys.stderr)
+
+    def work(index, item_id, text):
+        started = time.time()
+        if not isinstance(text, str) or not text.strip():
+            result = {"success": False, "error": "Missing or empty text"}
+        elif len(text) > args.max_length:
+            result = {"success": False, "error": f"Text too long. Maximum {args.max_length} characters allowed."}
+        else:
+            try:
+                result = dict(analyze(text.strip(), args.safer))
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+        progress.record(result.get("success", False), time.time() - started)
+        result["index"] = index
+        result["id"] = item_id
+        return result
+
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        in_flight = set()
+
+        def drain(return_when):
+            finished, _ = wait(in_flight, return_when=return_when)
+            for future in finished:
+                in_flight.discard(future)
+                out.write(json.dumps(future.result()) + "\n")
+            out.flush()
+            progress.maybe_print()
+
+        for index, item_id, text in read_items(args.input, args.text_field, args.id_field):
+            if index in done:
+                continue
+            in_flight.add(executor.submit(work, index, item_id, text))
+            # Keep memory flat: never hold more than 2x concurrency items
+            if len(in_flight) >= args.concurrency * 2:
+                drain(FIRST_COMPLETED)
+        while in_flight:
+            drain(FIRST_COMPLETED)
+
+    progress.maybe_print(force=True)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="text-moderator", description="Text Moderator command-line tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    bulk = subparsers.add_parser("bulk", help="Moderate a JSONL or CSV corpus")
+    bulk.add_argument("input", help="Input .jsonl or .csv file")
+    bulk.add_argument("-o", "--output", required=True, help="Output .jsonl file (also used as checkpoint)")
+    bulk.add_argument("--backend", choices=BACKENDS, default="duc-haba", help="Moderation backend (default: duc-haba)")
+    bulk.add_argument("--concurrency", type=int, default=8, help="Concurrent analyses (default: 8)")
+    bulk.add_argument("--safer", type=float, default=0.02, help="Safer value (default: 0.02)")
+    bulk.add_argument("--text-field", default="text", help="Field or column holding the text (default: text)")
+    bulk.add_argument("--id-field", default="id", help="Field or column holding the item id (default: id)")
+    bulk.add_argument("--max-length", type=int, default=5000, help="Skip texts longer than this (default: 5000)")
+    bulk.add_argument("--include-chart", action="store_true", help="Keep chart references in the output")
+    bulk.add_argument("--retry-failed", action="store_true", help="Analyze items that failed in an earlier run again")
+    bulk.set_defaults(func=run_bulk)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "concurrency", 1) < 1:
+        parser.error("--concurrency must be at least 1")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
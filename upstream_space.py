@@ -0,0 +1,9 @@
+"""
+Space the app and the diagnostic scripts talk to
+Set UPSTREAM_SPACE to a local mock_space.py (e.g. http://127.0.0.1:7860) to
+run everything offline.
+"""
+
+import os
+
+UPSTREAM_SPACE = os.environ.get('UPSTREAM_SPACE', 'duchaba/Friendly_Text_Moderation')